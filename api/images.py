@@ -0,0 +1,44 @@
+import asyncio
+import logging
+from fastapi import APIRouter, HTTPException, Request, Response
+from services.thumbnail_service import ThumbnailService, ThumbnailUnavailableError, IMMUTABLE_CACHE_CONTROL
+from utils.thumbnails import THUMBNAIL_FORMATS
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+thumbnail_service = ThumbnailService()
+
+
+@router.get("/thumbnail", tags=["Images"])
+async def get_thumbnail(request: Request, url: str, width: int, format: str | None = None):
+    """
+    Serves a resized WebP/AVIF thumbnail of a product image.
+
+    - **url**: Full-size product image URL (e.g. from /products/references).
+    - **width**: One of the configured THUMBNAIL_WIDTHS.
+    - **format**: "webp" or "avif"; if omitted, AVIF is served to clients that accept it.
+    """
+    headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    if format is None:
+        format = "avif" if "avif" in THUMBNAIL_FORMATS and "image/avif" in request.headers.get("accept", "") else "webp"
+        headers["Vary"] = "Accept"
+    try:
+        thumbnail = await asyncio.to_thread(
+            thumbnail_service.get_thumbnail, getattr(request.app.state, "redis_client", None), url, width, format.lower(),
+            request.headers.get("if-none-match")
+        )
+    except ThumbnailUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ConnectionError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    except Exception as e:
+        logger.exception("Unexpected error in get_thumbnail endpoint: %s", e)
+        raise HTTPException(status_code=500, detail="An internal server error occurred.")
+
+    headers["ETag"] = thumbnail.etag
+    if thumbnail.body is None:
+        return Response(status_code=304, headers=headers)
+    return Response(content=thumbnail.body, media_type=thumbnail.content_type, headers=headers)
@@ -1,9 +1,15 @@
 from fastapi import APIRouter, HTTPException
 from typing import List
-from models.request_models import SignedUrlRequest
+import asyncio
+import logging
+from models.request_models import (SignedUrlRequest, BulkSignedUrlRequest, BulkSignedUrlResponse, MultipartUploadRequest,
+                                   MultipartUploadResponse, MultipartPartUrl, MultipartPartUrlsRequest,
+                                   CompleteMultipartUploadRequest)
+from utils.multipart_sessions import UploadSessionNotFoundError
 from services.s3_service import S3Service
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 
 s3_service = S3Service()
@@ -16,7 +22,7 @@ async def generate_s3_signed_urls(request: SignedUrlRequest):
 
     - **count**: Number of signed URLs to generate (default: 1).
     """
-    print(request)
+    logger.debug("Signed URL request: %s", request)
     try:
         presigned_urls = s3_service.generate_presigned_urls(count=request.count, content_type=request.content_type)
         return presigned_urls
@@ -29,4 +35,77 @@ async def generate_s3_signed_urls(request: SignedUrlRequest):
     except Exception as e:
         # Catch any other unexpected errors
         print(f"Unexpected error in generate_s3_signed_urls endpoint: {e}")
-        raise HTTPException(status_code=500, detail="An internal server error occurred.") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="An internal server error occurred.")
+
+
+@router.post("/bulk", response_model=BulkSignedUrlResponse, tags=["S3 Signed URLs"])
+async def generate_bulk_s3_signed_urls(request: BulkSignedUrlRequest):
+    """
+    Generates presigned PUT URLs for bulk uploads, one per entry in `content_types`.
+
+    - **content_types**: Content type of each file to upload (up to BULK_SIGNED_URL_MAX_COUNT entries).
+    - **expires_in**: URL lifetime in seconds (default: 3600).
+    """
+    try:
+        # Signing thousands of URLs is CPU-bound; keep it off the event loop
+        urls = await asyncio.to_thread(
+            s3_service.generate_bulk_presigned_urls, request.content_types, request.expires_in
+        )
+        return {"expires_in": request.expires_in, "urls": urls}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.exception("Unexpected error in generate_bulk_s3_signed_urls endpoint: %s", e)
+        raise HTTPException(status_code=500, detail="An internal server error occurred.")
+
+
+async def _run_multipart(fn, *args):
+    """Runs a blocking multipart S3 call in a thread and maps service errors to HTTP errors."""
+    try:
+        return await asyncio.to_thread(fn, *args)
+    except UploadSessionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ConnectionError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    except Exception as e:
+        logger.exception("Unexpected error in multipart upload endpoint: %s", e)
+        raise HTTPException(status_code=500, detail="An internal server error occurred.")
+
+
+@router.post("/multipart", response_model=MultipartUploadResponse, tags=["S3 Signed URLs"])
+async def create_multipart_upload(request: MultipartUploadRequest):
+    """
+    Starts a multipart upload and returns a presigned PUT URL for every part.
+
+    Upload parts concurrently (byte range (n-1)*part_size onwards for part n), keep each
+    response's ETag header, then call /multipart/{upload_id}/complete.
+
+    - **content_type**: Content type of the file.
+    - **size**: Total file size in bytes (determines part_count).
+    - **part_size**: Optional part size in bytes (at least 5 MiB).
+    """
+    return await _run_multipart(
+        s3_service.create_multipart_upload, request.content_type, request.size, request.part_size, request.expires_in
+    )
+
+
+@router.post("/multipart/{upload_id}/parts", response_model=List[MultipartPartUrl], tags=["S3 Signed URLs"])
+async def presign_multipart_parts(upload_id: str, request: MultipartPartUrlsRequest):
+    """Presigns part URLs again, e.g. to resume an upload after the original URLs expired."""
+    return await _run_multipart(s3_service.presign_upload_parts, upload_id, request.part_numbers, request.expires_in)
+
+
+@router.post("/multipart/{upload_id}/complete", tags=["S3 Signed URLs"])
+async def complete_multipart_upload(upload_id: str, request: CompleteMultipartUploadRequest):
+    """Assembles the uploaded parts into the final object."""
+    return await _run_multipart(
+        s3_service.complete_multipart_upload, upload_id, [part.model_dump() for part in request.parts]
+    )
+
+
+@router.delete("/multipart/{upload_id}", status_code=204, tags=["S3 Signed URLs"])
+async def abort_multipart_upload(upload_id: str):
+    """Aborts the upload; S3 discards any parts already uploaded."""
+    await _run_multipart(s3_service.abort_multipart_upload, upload_id)
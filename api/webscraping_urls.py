@@ -1,18 +1,35 @@
-import threading
-from utils.background_tasks import get_recommendations_data
-from fastapi import APIRouter, Request
-from utils.background_tasks import process_recommendations_and_fetch
+import asyncio
+from utils.scrape_engine import get_recommendations_data_async, stream_recommendation_results
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from utils.job_queue import QueueFullError
 
 router = APIRouter()
 
-@router.post("/references-scrape")
+STREAMING_MEDIA_TYPES = ("application/x-ndjson", "text/event-stream")
+
+@router.post("/references-scrape", status_code=202)
 async def webscraping_references(request: Request):
     body = await request.json()
     recommendations = body.get("recommendations")
     gender = body.get("gender")
-    thread = threading.Thread(target=process_recommendations_and_fetch, args=(recommendations, gender))
-    thread.start()
-    return {"message": "Recommendations are being processed in the background"}
+    try:
+        job_id = await asyncio.to_thread(request.app.state.scrape_jobs.submit, recommendations, gender)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    return {
+        "message": "Recommendations are being processed in the background",
+        "job_id": job_id,
+        "status_url": f"/products/jobs/{job_id}"
+    }
+
+@router.get("/jobs/{job_id}")
+async def get_scrape_job(job_id: str, request: Request):
+    """Reports the status, progress and (once completed) results of a /references-scrape job."""
+    job = await request.app.state.scrape_jobs.store.aget(request.app.state.async_redis_client, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired.")
+    return job
 
 @router.post("/references")
 async def webscraping_references(request: Request):
@@ -22,7 +39,18 @@ async def webscraping_references(request: Request):
     recommendations_data = {
         "recommendations": recommendations,
     }
-    return get_recommendations_data(recommendations_data, gender)
+
+    # Stream each item as soon as it's ready when the client asks for NDJSON or SSE
+    accept = request.headers.get("accept", "")
+    media_type = next((m for m in STREAMING_MEDIA_TYPES if m in accept), None)
+    if media_type:
+        return StreamingResponse(
+            stream_recommendation_results(recommendations_data, gender, media_type),
+            media_type=media_type,
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    return await get_recommendations_data_async(recommendations_data, gender)
 
 
 
@@ -0,0 +1,65 @@
+"""
+Micro-benchmark: get_cache / set_cache (and the batched variants) per tier.
+
+Uses an in-process fakeredis by default, so L2 numbers show client-side cost
+only (serialization, pipelining); pass --redis-url for a real server round trip.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_cache [--iterations N] [--num-results N] [--batch N] [--redis-url redis://localhost:6379/15]
+"""
+import argparse
+import timeit
+import redis
+from benchmarks.bench_cache_codec import sample_entry
+from utils.cache import get_cache, set_cache, get_cache_many, set_cache_many, l1_cache
+
+def bench(label, fn, iterations):
+    """Runs fn `iterations` times (best of 5) and prints the per-call time."""
+    best = min(timeit.repeat(fn, number=iterations, repeat=5)) / iterations
+    print(f"{label:<34} {best * 1e6:>10.1f} µs/call")
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--num-results", type=int, default=2)
+    parser.add_argument("--batch", type=int, default=8, help="Keys per get_cache_many/set_cache_many call")
+    parser.add_argument("--redis-url", help="Benchmark against this Redis (its keys bench:* are overwritten)")
+    args = parser.parse_args()
+
+    if args.redis_url:
+        client = redis.StrictRedis.from_url(args.redis_url)
+    else:
+        try:
+            import fakeredis
+        except ImportError:
+            parser.error("fakeredis is not installed: pip install -r requirements-dev.txt, or pass --redis-url")
+        client = fakeredis.FakeStrictRedis()
+    client.ping()
+
+    entry = sample_entry(args.num_results)
+    batch = {f"bench:batch:{i}": entry for i in range(args.batch)}
+    print(f"Redis: {args.redis_url or 'fakeredis (in-process)'}, num_results={args.num_results}, batch={args.batch}\n")
+
+    bench("set_cache (L1 + L2)", lambda: set_cache(client, "bench:key", entry), args.iterations)
+    bench("get_cache, L1 hit", lambda: get_cache(client, "bench:key"), args.iterations)
+
+    def get_from_l2():
+        l1_cache.delete("bench:key")
+        return get_cache(client, "bench:key")
+    bench("get_cache, L2 hit", get_from_l2, args.iterations)
+    bench("get_cache, miss", lambda: get_cache(client, "bench:missing"), args.iterations)
+
+    bench(f"set_cache_many ({args.batch} keys)", lambda: set_cache_many(client, batch), args.iterations)
+    bench("get_cache_many, L1 hits", lambda: get_cache_many(client, list(batch)), args.iterations)
+
+    def get_many_from_l2():
+        for key in batch:
+            l1_cache.delete(key)
+        return get_cache_many(client, list(batch))
+    bench("get_cache_many, L2 hits", get_many_from_l2, args.iterations)
+
+    client.delete("bench:key", *batch)
+
+if __name__ == "__main__":
+    main()
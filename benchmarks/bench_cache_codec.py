@@ -0,0 +1,56 @@
+"""
+Micro-benchmark: binary cache value format vs. the legacy JSON text values.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_cache_codec [--iterations N] [--num-results N]
+"""
+import argparse
+import json
+import time
+import timeit
+from utils.cache import serialize_value, deserialize_value, CACHE_SERIALIZER, CACHE_COMPRESSION
+
+def sample_entry(num_results):
+    """A cache entry shaped like the ones background_tasks writes."""
+    products = [
+        {
+            "name": f"Men Slim Fit Solid Casual Shirt {i}",
+            "image_url": f"https://assets.myntassets.com/h_720,q_90,w_540/v1/assets/images/{20000000 + i}/2023/5/12/"
+                         f"a1b2c3d4-e5f6-7890-abcd-ef1234567890168386{i:04d}-Roadster-Men-Shirts-1.jpg",
+            "brand": "Roadster",
+            "price": 899 + i,
+            "product_id": 20000000 + i,
+        }
+        for i in range(num_results)
+    ]
+    return {"products": products, "status": "ok", "fetched_at": time.time()}
+
+def bench(label, fn, iterations):
+    """Runs fn `iterations` times (best of 5) and prints the per-call time."""
+    best = min(timeit.repeat(fn, number=iterations, repeat=5)) / iterations
+    print(f"{label:<28} {best * 1e6:>10.2f} µs/value")
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--num-results", type=int, default=2)
+    args = parser.parse_args()
+
+    entry = sample_entry(args.num_results)
+    legacy = json.dumps(entry).encode("utf-8")
+    compact = serialize_value(entry)
+    assert deserialize_value(compact) == entry and deserialize_value(legacy) == entry
+    print(f"Serializer: {CACHE_SERIALIZER}, compression: {CACHE_COMPRESSION}, num_results={args.num_results}\n")
+    print(f"{'legacy JSON size':<28} {len(legacy):>10} bytes")
+    print(f"{'binary format size':<28} {len(compact):>10} bytes ({len(compact) / len(legacy):.0%})\n")
+
+    bench("legacy JSON encode", lambda: json.dumps(entry), args.iterations)
+    bench("binary format encode", lambda: serialize_value(entry), args.iterations)
+    # The legacy path also paid for decode_responses=True turning bytes into str first
+    legacy_decode = bench("legacy JSON decode", lambda: json.loads(legacy.decode("utf-8")), args.iterations)
+    compact_decode = bench("binary format decode", lambda: deserialize_value(compact), args.iterations)
+    print(f"\nDecode speedup: {legacy_decode / compact_decode:.1f}x")
+
+if __name__ == "__main__":
+    main()
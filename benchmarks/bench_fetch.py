@@ -0,0 +1,59 @@
+"""
+Micro-benchmark: fetch_myntra_products end to end (HTTP client, rate limiter,
+metrics, parsing) against in-memory responses, per search page size.
+
+No network: responses come from an httpx.MockTransport serving the recorded
+page resized by benchmarks.fake_myntra. Compare with bench_parser to see how
+much of a fetch is parsing.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_fetch [--iterations N] [--page-sizes 10,50,200] [--num-results N]
+"""
+import argparse
+import os
+import timeit
+
+# Keep the per-host politeness limits out of the measurement
+os.environ.setdefault("RATE_LIMIT_REQUESTS_PER_SECOND", "1000000")
+os.environ.setdefault("RATE_LIMIT_BURST", "1000000")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx
+from benchmarks.fake_myntra import build_pages
+from utils.background_tasks import fetch_myntra_products
+from utils.http_client import set_http_client, close_http_client, MYNTRA_HEADERS
+from utils.logging_config import configure_logging
+from utils.myntra_parser import parse_search_page
+
+def bench(label, fn, iterations):
+    """Runs fn `iterations` times (best of 5) and prints the per-call time."""
+    best = min(timeit.repeat(fn, number=iterations, repeat=5)) / iterations
+    print(f"{label:<34} {best * 1e6:>10.1f} µs/call")
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--page-sizes", default="10,50,200")
+    parser.add_argument("--num-results", type=int, default=2)
+    args = parser.parse_args()
+    configure_logging()
+
+    pages = build_pages([int(s) for s in args.page_sizes.split(",")])
+    for size, page in pages.items():
+        transport = httpx.MockTransport(
+            lambda request, page=page: httpx.Response(200, content=page, headers={"content-type": "text/html; charset=utf-8"})
+        )
+        set_http_client(httpx.Client(transport=transport, headers=MYNTRA_HEADERS))
+        assert len(fetch_myntra_products("men white t-shirt", args.num_results)) == args.num_results
+
+        text = page.decode("utf-8")
+        print(f"{size} products ({len(page) / 1024:.0f} KiB), num_results={args.num_results}")
+        fetch = bench("  fetch_myntra_products", lambda: fetch_myntra_products("men white t-shirt", args.num_results),
+                      args.iterations)
+        parse = bench("  parse_search_page only", lambda: parse_search_page(text, args.num_results), args.iterations)
+        print(f"  parsing share of a fetch: {parse / fetch:.0%}\n")
+        close_http_client()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Micro-benchmark: single-pass product extraction vs. the legacy multi-regex scan.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_parser [--fixture PATH] [--iterations N] [--num-results N]
+"""
+import argparse
+import html
+import os
+import re
+import timeit
+from utils.myntra_parser import parse_search_page
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+DEFAULT_FIXTURE = os.path.join(FIXTURE_DIR, "myntra_search_page.html")
+
+def legacy_regex_parse(html_content, num_results=2):
+    """The extraction path fetch_myntra_products used before utils.myntra_parser (debug prints removed)."""
+    "access denied" in html_content.lower() or "blocked" in html_content.lower()
+    "captcha" in html_content.lower()
+    "myntra" not in html_content.lower()
+
+    product_names = re.findall(r'"productName":"(.*?)"', html_content)
+    image_urls = re.findall(r'"searchImage":"(.*?)"', html_content)
+    if not product_names:
+        re.findall(r'"name":"(.*?)"', html_content)
+        re.findall(r'"title":"(.*?)"', html_content)
+    if not image_urls:
+        re.findall(r'"image":"(.*?)"', html_content)
+        re.findall(r'"src":"(.*?)"', html_content)
+    if not product_names or not image_urls:
+        return []
+
+    top_products = []
+    for product_name, img_url in zip(product_names, image_urls):
+        if len(top_products) >= num_results:
+            break
+        decoded_name = html.unescape(product_name).encode('utf-8').decode('unicode_escape')
+        decoded_url = html.unescape(img_url).encode('utf-8').decode('unicode_escape')
+        if decoded_url.startswith('http'):
+            full_url = decoded_url
+        else:
+            full_url = f"https://assets.myntassets.com/{decoded_url.lstrip('/')}"
+        top_products.append({"name": decoded_name, "image_url": full_url})
+    return top_products
+
+def bench(label, fn, iterations):
+    """Runs fn `iterations` times (best of 5) and prints the per-call time."""
+    best = min(timeit.repeat(fn, number=iterations, repeat=5)) / iterations
+    print(f"{label:<28} {best * 1e6:>10.1f} µs/page")
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--num-results", type=int, default=2)
+    args = parser.parse_args()
+
+    with open(args.fixture, encoding="utf-8") as f:
+        page = f.read()
+    print(f"Fixture: {os.path.basename(args.fixture)} ({len(page) / 1024:.0f} KiB), num_results={args.num_results}\n")
+
+    legacy = bench("legacy multi-regex", lambda: legacy_regex_parse(page, args.num_results), args.iterations)
+    single = bench("single-pass parser", lambda: parse_search_page(page, args.num_results), args.iterations)
+    print(f"\nSpeedup: {legacy / single:.1f}x\n")
+
+    for old, new in zip(legacy_regex_parse(page, args.num_results), parse_search_page(page, args.num_results)):
+        print(f"legacy: {old['name']!r}")
+        print(f"parser: {new['name']!r} ({new['brand']}, ₹{new['price']}, id {new['product_id']})")
+
+if __name__ == "__main__":
+    main()
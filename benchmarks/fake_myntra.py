@@ -0,0 +1,162 @@
+"""
+Local stand-in for Myntra search pages, for load tests.
+
+Serves the recorded search page (benchmarks/fixtures) resized to a few product
+counts, with configurable latency, HTTP errors, 403 block pages and captcha pages.
+Point the app at it with MYNTRA_BASE_URL=http://127.0.0.1:<port>.
+
+Usage (from the repo root):
+    python -m benchmarks.fake_myntra [--port 8900] [--latency-ms 150] [--jitter-ms 50]
+        [--error-rate 0.01] [--block-rate 0.01] [--captcha-rate 0.01] [--page-sizes 10,50,200]
+
+GET /__stats returns the number of responses served per outcome.
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "myntra_search_page.html")
+STATE_PREFIX = "window.__myx = "
+
+CAPTCHA_PAGE = "<html><head><title>Myntra</title></head><body><div id='captcha'>Please solve the captcha to continue</div></body></html>"
+BLOCKED_PAGE = "<html><head><title>Access Denied</title></head><body>Access Denied. You don't have permission to access this page.</body></html>"
+
+def load_fixture(path: str = FIXTURE) -> tuple[str, dict, str]:
+    """Splits the recorded page into (HTML before the state, state dict, HTML after it)."""
+    with open(path, encoding="utf-8") as f:
+        page = f.read()
+    start = page.index(STATE_PREFIX) + len(STATE_PREFIX)
+    state, end = json.JSONDecoder().raw_decode(page, start)
+    return page[:start], state, page[end:]
+
+def build_pages(page_sizes: list[int], path: str = FIXTURE) -> dict[int, bytes]:
+    """One search page per product count, repeating the recorded products as needed."""
+    head, state, tail = load_fixture(path)
+    products = state["searchData"]["results"]["products"]
+    pages = {}
+    for size in page_sizes:
+        resized = []
+        for i in range(size):
+            product = dict(products[i % len(products)])
+            product["productId"] = 10_000_000 + i
+            resized.append(product)
+        state["searchData"]["results"]["products"] = resized
+        pages[size] = (head + json.dumps(state, separators=(",", ":")) + tail).encode("utf-8")
+    return pages
+
+class FakeMyntra:
+    """Threaded HTTP server answering every GET with a search page, an error, a block page or a captcha."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 150, jitter_ms: float = 50,
+                 error_rate: float = 0.0, block_rate: float = 0.0, captcha_rate: float = 0.0,
+                 page_sizes: list[int] = (10, 50, 200), seed: int | None = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.block_rate = block_rate
+        self.captcha_rate = captcha_rate
+        self.pages = build_pages(list(page_sizes))
+        self.stats = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _pick(self) -> tuple[int, bytes, str, float]:
+        """(status code, body, outcome, delay in seconds) for one request."""
+        with self._lock:
+            roll = self._random.random()
+            delay = max(0.0, self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            size = self._random.choice(list(self.pages))
+        if roll < self.error_rate:
+            return 503, b"Service Unavailable", "error", delay
+        roll -= self.error_rate
+        if roll < self.block_rate:
+            return 403, BLOCKED_PAGE.encode(), "blocked", delay
+        roll -= self.block_rate
+        if roll < self.captcha_rate:
+            return 200, CAPTCHA_PAGE.encode(), "captcha", delay
+        return 200, self.pages[size], f"page_{size}", delay
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # Keep-alive, like the real site
+
+            def do_GET(self):
+                if self.path == "/__stats":
+                    with fake._lock:
+                        body = json.dumps(dict(fake.stats)).encode()
+                    return self._respond(200, body, "application/json")
+                status, body, outcome, delay = fake._pick()
+                time.sleep(delay)
+                with fake._lock:
+                    fake.stats[outcome] += 1
+                self._respond(status, body, "text/html; charset=utf-8")
+
+            def _respond(self, status: int, body: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "FakeMyntra":
+        self._thread = threading.Thread(target=self.server.serve_forever, name="fake-myntra", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Fake server options, shared with benchmarks.loadtest."""
+    parser.add_argument("--latency-ms", type=float, default=150, help="Mean response latency")
+    parser.add_argument("--jitter-ms", type=float, default=50, help="Latency varies uniformly by +/- this")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of 503 responses")
+    parser.add_argument("--block-rate", type=float, default=0.0, help="Share of 403 block pages")
+    parser.add_argument("--captcha-rate", type=float, default=0.0, help="Share of captcha pages")
+    parser.add_argument("--page-sizes", default="10,50,200", help="Products per page, picked at random per request")
+    parser.add_argument("--seed", type=int, default=None)
+
+def from_arguments(args, port: int = 0) -> FakeMyntra:
+    return FakeMyntra(port=port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                      block_rate=args.block_rate, captcha_rate=args.captcha_rate,
+                      page_sizes=[int(s) for s in args.page_sizes.split(",")], seed=args.seed)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8900)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    fake = from_arguments(args, args.port)
+    sizes = ", ".join(f"{size} products = {len(page) / 1024:.0f} KiB" for size, page in fake.pages.items())
+    print(f"Fake Myntra on {fake.url} ({sizes})")
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(dict(fake.stats)))
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,38 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from api import signed_urls, webscraping_urls
 from dotenv import load_dotenv
-from utils.cache import get_redis_client
-from utils.background_tasks import set_redis_client
+
+# Load .env once, before any module reads its settings at import time
+load_dotenv()
+
+from fastapi import FastAPI, Response
+from fastapi.middleware.cors import CORSMiddleware
+from api import signed_urls, webscraping_urls, images
+from utils.cache import get_redis_client, get_async_redis_client, get_cache_stats
+from utils.background_tasks import set_redis_client, host_rate_limiters, fetch_circuit
+from utils.http_client import create_http_client, set_http_client, close_http_client
+from utils.scrape_engine import set_async_redis_client
+from utils.job_queue import ScrapeJobQueue
+from utils.cache_warmer import CacheWarmer, CACHE_WARMING_ENABLED
+from utils.catalog_index import catalog_index
+from utils.catalog_crawler import CatalogCrawler, CATALOG_CRAWLER_ENABLED
+from utils.query_normalizer import get_normalization_stats
+from utils.metrics import MetricsMiddleware, render_metrics, mark_process_dead, update_background_threads
+from utils.logging_config import configure_logging, RequestIdMiddleware
+from utils.debug_capture import debug_captures
+from utils.sigv4 import shutdown_signing_pool
+from utils.thumbnails import shutdown_thumbnail_pool
+from utils.signed_url_cache import presigned_url_cache
+from utils.multipart_sessions import multipart_sessions
+from utils.s3_client import create_s3_client, set_s3_client, close_s3_client, S3_CLIENT_EAGER_INIT
 from contextlib import asynccontextmanager
+import asyncio
+import logging
 import redis
 import requests
 import os
 
 
-load_dotenv()
+configure_logging()
+logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -21,22 +43,78 @@ async def lifespan(app: FastAPI):
         # Set the Redis client for background tasks
         if app.state.redis_client:
             set_redis_client(app.state.redis_client)
-            print("✅ Redis client set for background tasks")
+            presigned_url_cache.set_redis_client(app.state.redis_client)
+            multipart_sessions.set_redis_client(app.state.redis_client)
+            logger.info("Redis client set for background tasks")
         else:
-            print("⚠️ Redis client not available, continuing without it")
+            logger.warning("Redis client not available, continuing without it")
     except Exception as e:
-        print(f"⚠️ Failed to connect to Redis: {e}. App will continue without Redis.")
+        logger.warning("Failed to connect to Redis: %s. App will continue without Redis.", e)
         app.state.redis_client = None
 
+    # Async Redis client (own connection pool) for request handlers
+    app.state.async_redis_client = await get_async_redis_client()
+    set_async_redis_client(app.state.async_redis_client)
+
+    # Shared pooled HTTP client for scraping (used by request handlers and background tasks)
+    app.state.http_client = create_http_client()
+    set_http_client(app.state.http_client)
+
+    # Shared S3 client: created here if S3_CLIENT_EAGER_INIT, otherwise on first use
+    if S3_CLIENT_EAGER_INIT:
+        set_s3_client(await asyncio.to_thread(create_s3_client))
+
+    # Background writer for sampled pages that failed to scrape
+    debug_captures.start()
+
+    # Bounded worker pool for /products/references-scrape jobs
+    app.state.scrape_jobs = ScrapeJobQueue()
+    app.state.scrape_jobs.start()
+
+    # Popularity-driven cache warming (optional)
+    app.state.cache_warmer = CacheWarmer() if CACHE_WARMING_ENABLED else None
+    if app.state.cache_warmer:
+        app.state.cache_warmer.start()
+
+    # Background crawler filling the local catalog index (optional)
+    app.state.catalog_crawler = CatalogCrawler() if CATALOG_CRAWLER_ENABLED and catalog_index.enabled else None
+    if app.state.catalog_crawler:
+        app.state.catalog_crawler.start()
+
+    update_background_threads() # First sample for this worker; MetricsMiddleware keeps it current
     yield
 
-    # Shutdown: close Redis connection
+    # Shutdown: stop background scraping, then close pooled HTTP connections
+    if app.state.cache_warmer:
+        await app.state.cache_warmer.stop()
+    if app.state.catalog_crawler:
+        await app.state.catalog_crawler.stop()
+    await asyncio.to_thread(app.state.scrape_jobs.stop)
+    debug_captures.stop()
+    shutdown_signing_pool()
+    shutdown_thumbnail_pool()
+    close_s3_client()
+    close_http_client()
+    catalog_index.close()
+
+    # Shutdown: close Redis connections
+    if getattr(app.state, 'async_redis_client', None):
+        set_async_redis_client(None)
+        try:
+            await app.state.async_redis_client.aclose(close_connection_pool=True)
+            logger.info("Async Redis connection pool closed.")
+        except redis.exceptions.RedisError as e:
+            logger.warning("Error closing async Redis connection pool: %s", e)
+
     if hasattr(app.state, 'redis_client') and app.state.redis_client:
         try:
             app.state.redis_client.close()
-            print("🔌 Redis connection closed.")
+            app.state.redis_client.connection_pool.disconnect()
+            logger.info("Redis connection closed.")
         except redis.exceptions.RedisError as e:
-            print(f"⚠️ Error closing Redis connection: {e}")
+            logger.warning("Error closing Redis connection: %s", e)
+
+    mark_process_dead()
     # Add other cleanup if needed here
 
 app = FastAPI(lifespan=lifespan)
@@ -50,10 +128,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency histograms for /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Request ids for log records (outermost, so every log line of a request carries it)
+app.add_middleware(RequestIdMiddleware)
+
 # Include API routers
 
 app.include_router(signed_urls.router, prefix="/generate-signed-urls", tags=["S3 Signed URLs"])
 app.include_router(webscraping_urls.router, prefix="/products", tags=["Products"])
+app.include_router(images.router, prefix="/images", tags=["Images"])
 
 @app.get("/health")
 async def health():
@@ -64,13 +149,45 @@ async def health():
 async def readiness():
     """Readiness check that includes Redis connectivity"""
     try:
-        # Check if Redis is available (optional)
-        if hasattr(app.state, 'redis_client') and app.state.redis_client:
-            app.state.redis_client.ping()
+        # Check if Redis is available (optional) without blocking the event loop
+        if getattr(app.state, 'async_redis_client', None):
+            await app.state.async_redis_client.ping()
         return {"status": "ready", "redis": "connected"}
     except Exception as e:
         return {"status": "not_ready", "redis": "disconnected", "error": str(e)}
 
+@app.get("/health/cache")
+async def cache_stats():
+    """Per-tier (in-process L1 / Redis L2) cache hit and miss counters, plus query normalization and presigned URL cache stats"""
+    return {**get_cache_stats(), "normalization": get_normalization_stats(), "presigned_urls": presigned_url_cache.stats()}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics (aggregated across uvicorn workers when PROMETHEUS_MULTIPROC_DIR is set)"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/health/debug-captures")
+async def debug_capture_index(query: str | None = None, failure_mode: str | None = None,
+                              status_code: int | None = None, limit: int = 100):
+    """Index of captured failed pages (newest first), filterable by query, failure mode and status code"""
+    return {
+        **debug_captures.stats(),
+        "entries": debug_captures.entries(query, failure_mode, status_code, min(limit, 1000)),
+    }
+
+@app.get("/health/catalog")
+async def catalog_stats():
+    """Local catalog index size, freshness and hit counters, plus the crawler's last cycle"""
+    stats = await asyncio.to_thread(catalog_index.stats)
+    crawler = getattr(app.state, "catalog_crawler", None)
+    return {**stats, "crawler": crawler.stats() if crawler else None}
+
+@app.get("/health/scraper")
+async def scraper_stats():
+    """Circuit breaker state, plus the adaptive concurrency limit and in-flight requests per scraped host"""
+    return {"circuit": fetch_circuit.snapshot(), "hosts": host_rate_limiters.snapshot()}
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
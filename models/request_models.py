@@ -1,4 +1,5 @@
 from pydantic import BaseModel
+from pydantic import Field
 from typing import List
 
 class FashionRequest(BaseModel):
@@ -11,6 +12,50 @@ class SignedUrlRequest(BaseModel):
     count: int = 1
     content_type: List[str]  
 
+# Model for bulk Signed URL generation (one upload URL per content type)
+class BulkSignedUrlRequest(BaseModel):
+    content_types: List[str] = Field(..., min_length=1)
+    expires_in: int = 3600
+
+class BulkSignedUrl(BaseModel):
+    key: str
+    url: str
+    content_type: str
+
+class BulkSignedUrlResponse(BaseModel):
+    expires_in: int
+    urls: List[BulkSignedUrl]
+
+# Models for multipart uploads (large files uploaded in parallel parts)
+class MultipartUploadRequest(BaseModel):
+    content_type: str
+    size: int = Field(..., gt=0) # Total bytes to upload
+    part_size: int | None = None
+    expires_in: int = 3600
+
+class MultipartPartUrl(BaseModel):
+    part_number: int
+    url: str
+
+class MultipartUploadResponse(BaseModel):
+    upload_id: str
+    key: str
+    part_size: int
+    part_count: int
+    expires_in: int
+    parts: List[MultipartPartUrl]
+
+class MultipartPartUrlsRequest(BaseModel):
+    part_numbers: List[int] = Field(..., min_length=1)
+    expires_in: int = 3600
+
+class CompletedPart(BaseModel):
+    part_number: int
+    etag: str
+
+class CompleteMultipartUploadRequest(BaseModel):
+    parts: List[CompletedPart] = Field(..., min_length=1)
+
 class ImageURLRequest(BaseModel):
     image_url: str
 
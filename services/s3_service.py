@@ -1,37 +1,48 @@
-import boto3
+import logging
+import math
 import os
+import time
 import uuid
-from dotenv import load_dotenv
 from typing import List
+from utils.multipart_sessions import (multipart_sessions, UploadSessionNotFoundError, MULTIPART_PART_SIZE,
+                                      MULTIPART_MIN_PART_SIZE, MULTIPART_MAX_PARTS, MULTIPART_MAX_UPLOAD_BYTES)
+from utils.s3_client import get_s3_client, get_presigner, get_bucket_name
 from utils.s3_utils import generate_signed_urls
+from utils.sigv4 import presign_many, MAX_EXPIRES_IN
 
-# Load environment variables
-load_dotenv()
+logger = logging.getLogger(__name__)
+
+BULK_SIGNED_URL_MAX_COUNT = int(os.getenv("BULK_SIGNED_URL_MAX_COUNT", 5000)) # URLs per bulk request
+
+# Upload content types accepted by the bulk endpoint -> object key extension
+UPLOAD_CONTENT_TYPE_EXTENSIONS = {
+    "image/jpeg": "jpg",
+    "image/jpg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp",
+    "image/heic": "heic",
+    "image/heif": "heif",
+    "image/avif": "avif",
+}
 
 class S3Service:
-    def __init__(self):
-        self.aws_access_key_id = os.getenv("AWS_ACCESS_KEY_ID")
-        self.aws_secret_access_key = os.getenv("AWS_SECRET_ACCESS_KEY")
-        self.aws_region = os.getenv("AWS_REGION")
-        self.s3_bucket_name = os.getenv("S3_BUCKET_NAME")
-        self.s3_client = self._create_s3_client()
-
-    def _create_s3_client(self):
-        if not all([self.aws_access_key_id, self.aws_secret_access_key, self.aws_region, self.s3_bucket_name]):
-            print("Warning: AWS credentials or S3 bucket name not fully configured. S3 operations will fail.")
-            return None
-        try:
-            return boto3.client(
-                's3',
-                aws_access_key_id=self.aws_access_key_id,
-                aws_secret_access_key=self.aws_secret_access_key,
-                region_name=self.aws_region,
-                config=boto3.session.Config(signature_version='s3v4')
-            )
-        except Exception as e:
-            print(f"Error creating S3 client: {e}")
-            return None
-           
+    """
+    Presigned URL generation on top of the shared, lazily created S3 client
+    (utils.s3_client), so constructing the service costs nothing at import time.
+    """
+
+    @property
+    def s3_client(self):
+        return get_s3_client()
+
+    @property
+    def presigner(self):
+        return get_presigner()
+
+    @property
+    def s3_bucket_name(self):
+        return get_bucket_name()
+
     def generate_presigned_urls(self, count: int, content_type: List[str] = None) -> List[str]:
         if self.s3_client is None or self.s3_bucket_name is None:
             raise ValueError("S3 client is not configured due to missing environment variables.")
@@ -73,3 +84,160 @@ class S3Service:
             print(f"Error generating presigned PUT URLs: {e}")
             raise ConnectionError("Could not generate signed URLs.")
 
+    def generate_bulk_presigned_urls(self, content_types: List[str], expires_in: int = 3600) -> List[dict]:
+        """
+        Generates one presigned PUT URL per content type, signed locally (no boto3 call per URL).
+
+        Every content type is validated before anything is signed; a ValueError lists
+        the indices of all unsupported ones. Large batches are signed in a process pool.
+        """
+        if self.presigner is None or self.s3_bucket_name is None:
+            raise ValueError("S3 client is not configured due to missing environment variables.")
+
+        if not content_types:
+            raise ValueError("At least one content type is required.")
+
+        if len(content_types) > BULK_SIGNED_URL_MAX_COUNT:
+            raise ValueError(f"Cannot request more than {BULK_SIGNED_URL_MAX_COUNT} URLs at a time.")
+
+        if not 1 <= expires_in <= MAX_EXPIRES_IN:
+            raise ValueError(f"expires_in must be between 1 and {MAX_EXPIRES_IN} seconds.")
+
+        stripped = [ct.strip() for ct in content_types]
+        invalid = [i for i, ct in enumerate(stripped) if ct.lower() not in UPLOAD_CONTENT_TYPE_EXTENSIONS]
+        if invalid:
+            shown = ", ".join(str(i) for i in invalid[:20]) + (" ..." if len(invalid) > 20 else "")
+            raise ValueError(
+                f"Unsupported content type at {len(invalid)} index(es): {shown}. "
+                f"Allowed: {', '.join(sorted(UPLOAD_CONTENT_TYPE_EXTENSIONS))}."
+            )
+
+        # The signed Content-Type is the one the client said it will send, as given
+        items = [(f"Recommendations/{uuid.uuid4()}.{UPLOAD_CONTENT_TYPE_EXTENSIONS[ct.lower()]}", ct) for ct in stripped]
+        urls = presign_many(self.presigner, "PUT", self.s3_bucket_name, items, expires_in)
+        return [{"key": key, "url": url, "content_type": ct} for (key, ct), url in zip(items, urls)]
+
+    # --- Multipart uploads ---
+
+    def _require_s3(self):
+        if self.s3_client is None or self.presigner is None or self.s3_bucket_name is None:
+            raise ValueError("S3 client is not configured due to missing environment variables.")
+
+    def _presign_parts(self, session: dict, part_numbers: List[int], expires_in: int) -> List[dict]:
+        if not 1 <= expires_in <= MAX_EXPIRES_IN:
+            raise ValueError(f"expires_in must be between 1 and {MAX_EXPIRES_IN} seconds.")
+        invalid = [n for n in part_numbers if not 1 <= n <= session["part_count"]]
+        if invalid:
+            raise ValueError(f"Part numbers must be between 1 and {session['part_count']} (got {invalid[:20]}).")
+        return [
+            {
+                "part_number": n,
+                "url": self.presigner.presign("PUT", session["bucket"], session["key"], expires_in,
+                                              params={"partNumber": n, "uploadId": session["upload_id"]}),
+            }
+            for n in part_numbers
+        ]
+
+    def create_multipart_upload(self, content_type: str, size: int, part_size: int | None = None,
+                                expires_in: int = 3600) -> dict:
+        """
+        Starts an S3 multipart upload for `size` bytes and presigns an upload_part URL for every part.
+
+        Parts can be uploaded concurrently and individually retried; the client then
+        calls complete_multipart_upload with each part's ETag.
+        """
+        self._require_s3()
+        extension = UPLOAD_CONTENT_TYPE_EXTENSIONS.get(content_type.strip().lower())
+        if extension is None:
+            raise ValueError(f"Unsupported content type. Allowed: {', '.join(sorted(UPLOAD_CONTENT_TYPE_EXTENSIONS))}.")
+        if not 1 <= size <= MULTIPART_MAX_UPLOAD_BYTES:
+            raise ValueError(f"size must be between 1 and {MULTIPART_MAX_UPLOAD_BYTES} bytes.")
+        if not 1 <= expires_in <= MAX_EXPIRES_IN:
+            raise ValueError(f"expires_in must be between 1 and {MAX_EXPIRES_IN} seconds.")
+
+        # Never below the S3 minimum, and large enough to stay within the part limit
+        part_size = max(part_size or MULTIPART_PART_SIZE, MULTIPART_MIN_PART_SIZE, math.ceil(size / MULTIPART_MAX_PARTS))
+        part_count = math.ceil(size / part_size)
+        key = f"Recommendations/{uuid.uuid4()}.{extension}"
+        from botocore.exceptions import BotoCoreError, ClientError # Lazy: keeps botocore out of app startup
+
+        try:
+            response = self.s3_client.create_multipart_upload(
+                Bucket=self.s3_bucket_name, Key=key, ContentType=content_type.strip()
+            )
+        except (BotoCoreError, ClientError) as e:
+            logger.error("Error creating multipart upload: %s", e)
+            raise ConnectionError("Could not create multipart upload.")
+
+        session = {
+            "upload_id": response["UploadId"],
+            "bucket": self.s3_bucket_name,
+            "key": key,
+            "content_type": content_type.strip(),
+            "size": size,
+            "part_size": part_size,
+            "part_count": part_count,
+            "created_at": time.time(),
+        }
+        multipart_sessions.save(session)
+        return {
+            **{k: session[k] for k in ("upload_id", "key", "part_size", "part_count")},
+            "expires_in": expires_in,
+            "parts": self._presign_parts(session, list(range(1, part_count + 1)), expires_in),
+        }
+
+    def presign_upload_parts(self, upload_id: str, part_numbers: List[int], expires_in: int = 3600) -> List[dict]:
+        """Presigns upload_part URLs again (e.g. to resume after the first ones expired)."""
+        self._require_s3()
+        return self._presign_parts(multipart_sessions.get(upload_id), part_numbers, expires_in)
+
+    def complete_multipart_upload(self, upload_id: str, parts: List[dict]) -> dict:
+        """Completes the upload from [{"part_number", "etag"}] and forgets the session."""
+        self._require_s3()
+        session = multipart_sessions.get(upload_id)
+        part_numbers = sorted(p["part_number"] for p in parts)
+        if part_numbers != list(range(1, session["part_count"] + 1)):
+            raise ValueError(f"Expected ETags for parts 1 to {session['part_count']}, each exactly once.")
+        from botocore.exceptions import BotoCoreError, ClientError
+
+        try:
+            self.s3_client.complete_multipart_upload(
+                Bucket=session["bucket"],
+                Key=session["key"],
+                UploadId=upload_id,
+                MultipartUpload={"Parts": [
+                    {"PartNumber": p["part_number"], "ETag": p["etag"]}
+                    for p in sorted(parts, key=lambda p: p["part_number"])
+                ]},
+            )
+        except ClientError as e:
+            code = e.response.get("Error", {}).get("Code")
+            if code == "NoSuchUpload":
+                multipart_sessions.delete(upload_id)
+                raise UploadSessionNotFoundError(f"Upload session '{upload_id}' not found or expired.")
+            if code in ("InvalidPart", "InvalidPartOrder", "EntityTooSmall"):
+                raise ValueError(f"S3 rejected the parts: {code}.")
+            logger.error("Error completing multipart upload %s: %s", upload_id, e)
+            raise ConnectionError("Could not complete multipart upload.")
+        except BotoCoreError as e:
+            logger.error("Error completing multipart upload %s: %s", upload_id, e)
+            raise ConnectionError("Could not complete multipart upload.")
+
+        multipart_sessions.delete(upload_id)
+        return {"upload_id": upload_id, "key": session["key"], "size": session["size"]}
+
+    def abort_multipart_upload(self, upload_id: str):
+        """Aborts the upload (S3 discards the uploaded parts) and forgets the session."""
+        self._require_s3()
+        session = multipart_sessions.get(upload_id)
+        from botocore.exceptions import BotoCoreError, ClientError
+        try:
+            self.s3_client.abort_multipart_upload(Bucket=session["bucket"], Key=session["key"], UploadId=upload_id)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") != "NoSuchUpload":
+                logger.error("Error aborting multipart upload %s: %s", upload_id, e)
+                raise ConnectionError("Could not abort multipart upload.")
+        except BotoCoreError as e:
+            logger.error("Error aborting multipart upload %s: %s", upload_id, e)
+            raise ConnectionError("Could not abort multipart upload.")
+        multipart_sessions.delete(upload_id)
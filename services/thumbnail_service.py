@@ -0,0 +1,158 @@
+import hashlib
+import logging
+import os
+from dataclasses import dataclass
+from urllib.parse import urlparse
+import httpx
+from PIL import Image, UnidentifiedImageError
+from utils.cache import LocalTTLCache, get_cache, set_cache
+from utils.http_client import get_http_client
+from utils.s3_utils import upload_object, download_object
+from utils.singleflight import SingleFlight
+from utils.thumbnails import (THUMBNAIL_FORMATS, THUMBNAIL_WIDTHS, THUMBNAIL_MAX_SOURCE_BYTES,
+                              render_thumbnails_in_pool)
+
+logger = logging.getLogger(__name__)
+
+# --- Thumbnail Proxy Configuration ---
+THUMBNAIL_ALLOWED_HOSTS = {h.strip() for h in os.getenv("THUMBNAIL_ALLOWED_HOSTS", "assets.myntassets.com").split(",") if h.strip()}
+THUMBNAIL_S3_PREFIX = os.getenv("THUMBNAIL_S3_PREFIX", "Thumbnails")
+THUMBNAIL_SOURCE_TTL_SECONDS = int(os.getenv("THUMBNAIL_SOURCE_TTL_SECONDS", 30 * 86400)) # Source URL -> content digest
+THUMBNAIL_L1_MAX_ENTRIES = int(os.getenv("THUMBNAIL_L1_MAX_ENTRIES", 2048))
+THUMBNAIL_L1_MAX_BYTES = int(os.getenv("THUMBNAIL_L1_MAX_BYTES", 32 * 1024 * 1024)) # Default to 32 MiB
+THUMBNAIL_L1_TTL_SECONDS = int(os.getenv("THUMBNAIL_L1_TTL_SECONDS", 3600))
+THUMBNAIL_MAX_REDIRECTS = int(os.getenv("THUMBNAIL_MAX_REDIRECTS", 3)) # Each hop must stay on an allowed host
+
+# Thumbnails are content-addressed, so a given key/ETag never changes
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+class ThumbnailUnavailableError(Exception):
+    """Raised when thumbnails couldn't be rendered in time (the resize pool is busy)."""
+
+@dataclass
+class Thumbnail:
+    etag: str
+    content_type: str
+    body: bytes | None = None # None when the client's If-None-Match already matches
+
+def thumbnail_key(digest: str, width: int, fmt: str) -> str:
+    """S3 key of a thumbnail, addressed by the SHA-256 of the source image bytes."""
+    return f"{THUMBNAIL_S3_PREFIX}/{digest[:2]}/{digest}/{width}.{fmt}"
+
+def thumbnail_etag(digest: str, width: int, fmt: str) -> str:
+    return f'"{digest[:32]}-{width}-{fmt}"'
+
+def _source_cache_key(source_url: str) -> str:
+    return f"thumbnail:source:{hashlib.sha256(source_url.encode('utf-8')).hexdigest()}"
+
+class ThumbnailService:
+    """
+    Resize-and-cache pipeline behind the image proxy.
+
+    The first request for a source image fetches it once, renders every
+    configured width and format in the worker pool, stores them in S3 under
+    content-addressed keys and remembers source URL -> digest in the cache.
+    Later requests are served from an in-process byte cache, then from S3.
+    """
+
+    def __init__(self):
+        self._flight = SingleFlight()
+        self._l1 = LocalTTLCache(THUMBNAIL_L1_MAX_ENTRIES, THUMBNAIL_L1_MAX_BYTES)
+
+    @staticmethod
+    def validate_source_url(source_url: str):
+        parsed = urlparse(source_url)
+        if parsed.scheme not in ("http", "https") or parsed.hostname not in THUMBNAIL_ALLOWED_HOSTS:
+            raise ValueError(f"Only images from {', '.join(sorted(THUMBNAIL_ALLOWED_HOSTS))} can be proxied.")
+
+    @classmethod
+    def validate(cls, source_url: str, width: int, fmt: str):
+        cls.validate_source_url(source_url)
+        if width not in THUMBNAIL_WIDTHS:
+            raise ValueError(f"Width must be one of {', '.join(map(str, THUMBNAIL_WIDTHS))}.")
+        if fmt not in THUMBNAIL_FORMATS:
+            raise ValueError(f"Format must be one of {', '.join(THUMBNAIL_FORMATS)}.")
+
+    def get_thumbnail(self, redis_client, source_url: str, width: int, fmt: str,
+                      if_none_match: str | None = None) -> Thumbnail:
+        """
+        Returns the thumbnail of `source_url` at `width` in `fmt` (blocking; run it in a thread).
+
+        Raises ValueError for invalid parameters or a source that isn't an image,
+        ConnectionError if the source image can't be fetched and
+        ThumbnailUnavailableError if rendering timed out.
+        """
+        self.validate(source_url, width, fmt)
+        content_type = THUMBNAIL_FORMATS[fmt][1]
+
+        cached = get_cache(redis_client, _source_cache_key(source_url))
+        digest = cached.get("digest") if isinstance(cached, dict) else None
+        if digest:
+            etag = thumbnail_etag(digest, width, fmt)
+            if if_none_match and etag in if_none_match:
+                return Thumbnail(etag, content_type)
+            key = thumbnail_key(digest, width, fmt)
+            body = self._l1.get(key)
+            if body is None:
+                body = download_object(key)
+                if body is not None:
+                    self._l1.set(key, body, THUMBNAIL_L1_TTL_SECONDS, len(body))
+            if body is not None:
+                return Thumbnail(etag, content_type, body)
+
+        # Unknown source, or its thumbnails are gone from S3: render them (once per source across threads)
+        digest, thumbnails = self._flight.do(source_url, self._render_and_store, redis_client, source_url)
+        return Thumbnail(thumbnail_etag(digest, width, fmt), content_type, thumbnails[(width, fmt)])
+
+    def _fetch_source(self, source_url: str) -> bytes:
+        """Downloads the source image, following redirects only while they stay on allowed hosts."""
+        url = source_url
+        for _ in range(THUMBNAIL_MAX_REDIRECTS + 1):
+            body, location = self._fetch_source_once(url)
+            if location is None:
+                return body
+            url = location
+            self.validate_source_url(url)
+        raise ConnectionError("Source image redirected too many times.")
+
+    def _fetch_source_once(self, url: str) -> tuple[bytes | None, str | None]:
+        """(image bytes, None), or (None, redirect target) for a redirect."""
+        try:
+            # The shared client follows redirects; here every hop is checked against the allowlist instead
+            with get_http_client().stream("GET", url, follow_redirects=False) as response:
+                if response.is_redirect:
+                    return None, str(response.url.join(response.headers["location"]))
+                if response.status_code != 200:
+                    raise ConnectionError(f"Source image returned HTTP {response.status_code}.")
+                if not response.headers.get("content-type", "image/").startswith("image/"):
+                    raise ValueError("Source URL is not an image.")
+                chunks, size = [], 0
+                for chunk in response.iter_bytes():
+                    size += len(chunk)
+                    if size > THUMBNAIL_MAX_SOURCE_BYTES:
+                        raise ValueError("Source image is too large.")
+                    chunks.append(chunk)
+        except httpx.HTTPError as e:
+            raise ConnectionError(f"Could not fetch source image: {e}") from e
+        return b"".join(chunks), None
+
+    def _render_and_store(self, redis_client, source_url: str) -> tuple[str, dict]:
+        source = self._fetch_source(source_url)
+        digest = hashlib.sha256(source).hexdigest()
+        try:
+            thumbnails = render_thumbnails_in_pool(source)
+        except TimeoutError as e:
+            # Checked first: TimeoutError is an OSError, which otherwise reads as a bad image
+            raise ThumbnailUnavailableError("Rendering the thumbnail timed out, try again later.") from e
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+            raise ValueError(f"Source is not a valid image: {e}") from e
+
+        stored = 0
+        for (width, fmt), body in thumbnails.items():
+            key = thumbnail_key(digest, width, fmt)
+            self._l1.set(key, body, THUMBNAIL_L1_TTL_SECONDS, len(body))
+            stored += upload_object(key, body, THUMBNAIL_FORMATS[fmt][1], cache_control=IMMUTABLE_CACHE_CONTROL)
+        # A variant missing from S3 (failed upload) is simply rendered again by whoever asks for it
+        set_cache(redis_client, _source_cache_key(source_url), {"digest": digest}, THUMBNAIL_SOURCE_TTL_SECONDS)
+        logger.info("Rendered %d thumbnails for %s (%d stored in S3)", len(thumbnails), source_url, stored)
+        return digest, thumbnails
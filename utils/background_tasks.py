@@ -1,323 +1,593 @@
-import requests
+import contextvars
+import httpx
+import logging
+import os
 import re
-import html
 import threading
-from .cache import get_cache, set_cache # Import cache functions
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .cache import get_cache, set_cache, get_cache_many, set_cache_many, record_query_popularity # Import cache functions
+from .cache import CACHE_TTL_SECONDS, CACHE_STALE_TTL_SECONDS, NEGATIVE_CACHE_TTL_SECONDS, FAILURE_CACHE_TTL_SECONDS
+from .cache import LAST_GOOD_CACHE_TTL_SECONDS
+from .http_client import get_http_client
+from .myntra_parser import parse_search_page, detect_failure_mode
+from .query_normalizer import canonical_search_query, raw_search_query, query_cache_key, normalization_stats
+from .singleflight import SingleFlight, RedisSingleFlight, SINGLEFLIGHT_REDIS_ENABLED
+from .rate_limiter import HostRateLimiters, backoff_delay, SCRAPING_MAX_RETRIES
+from .circuit_breaker import CircuitBreaker, CIRCUIT_OPEN
+from .metrics import SCRAPE_DURATION, PARSE_DURATION, BLOCKED_RESPONSES, PRODUCTS_PER_QUERY, SCRAPES_IN_FLIGHT
+from .logging_config import sample_diagnostics
+from .debug_capture import debug_captures, FAILURE_NO_MATCH
+from .catalog_index import catalog_index
+
+logger = logging.getLogger(__name__)
 
 # Global variable to store the Redis client
 redis_client = None
 
+# Site searched for products (point it at a local stand-in for load tests, see benchmarks/fake_myntra.py)
+MYNTRA_BASE_URL = os.getenv("MYNTRA_BASE_URL", "https://www.myntra.com").rstrip("/")
+
+# Worker threads refreshing stale cache entries in the background
+CACHE_REFRESH_WORKERS = int(os.getenv("CACHE_REFRESH_WORKERS", 2))
+
+# Coalesces identical concurrent fetches within this process (and across pods when enabled)
+query_flight = SingleFlight()
+redis_query_flight = None
+
+# Per-host token buckets and adaptive concurrency limits shared by every scraping thread
+host_rate_limiters = HostRateLimiters()
+
+# Stops live fetches while Myntra keeps blocking or timing out (last known results are served instead)
+fetch_circuit = CircuitBreaker("myntra")
+
 def set_redis_client(client):
     """Set the Redis client for background tasks"""
-    global redis_client
+    global redis_client, redis_query_flight
     redis_client = client
-    print(f"[Background Task] Redis client set: {redis_client is not None}")
+    redis_query_flight = RedisSingleFlight(client) if client and SINGLEFLIGHT_REDIS_ENABLED else None
+    host_rate_limiters.set_redis_client(client)
+    logger.info("Redis client set for background tasks: %s", redis_client is not None)
+
+# Outcome of a scrape, stored with cached entries
+FETCH_OK = "ok"             # Products found
+FETCH_EMPTY = "empty"       # Page parsed fine but had no products
+FETCH_BLOCKED = "blocked"   # Access denied / 403 / 429
+FETCH_CAPTCHA = "captcha"   # CAPTCHA page served instead of results
+FETCH_ERROR = "error"       # Network error, timeout or other HTTP failure
+FETCH_UNAVAILABLE = "unavailable" # Not fetched: circuit breaker open (never cached)
+FETCH_THROTTLED = "throttled" # Not fetched: our own rate limiter wait ran out (never cached)
+
+# Results where Myntra was never asked; they say nothing about the query or the site
+NOT_FETCHED_STATUSES = (FETCH_UNAVAILABLE, FETCH_THROTTLED)
+
+# Results that count towards opening the circuit breaker
+CIRCUIT_FAILURE_STATUSES = (FETCH_BLOCKED, FETCH_CAPTCHA, FETCH_ERROR)
 
 def fetch_myntra_products(query, num_results=2):
     """Fetches product details from Myntra based on a query and returns top results."""
+    products, _ = fetch_myntra_products_with_status(query, num_results)
+    return products
+
+def fetch_myntra_products_with_status(query, num_results=2):
+    """
+    Fetches product details from Myntra and reports how the scrape went.
+
+    Requests go through the per-host rate limiter; 429s, 5xx responses and
+    network errors are retried up to SCRAPING_MAX_RETRIES times with jittered
+    exponential backoff. While the circuit breaker is open nothing is fetched
+    and FETCH_UNAVAILABLE is returned; if the rate limiter can't grant a slot
+    in time FETCH_THROTTLED is returned, which doesn't count against the breaker.
+
+    Returns a (products, status) tuple where status is one of the FETCH_* values.
+    """
+    if not fetch_circuit.allow_request():
+        logger.debug("Circuit open, skipping live fetch for '%s'", query)
+        return [], FETCH_UNAVAILABLE
+
+    products, status = [], FETCH_ERROR
+    started = time.perf_counter()
+    SCRAPES_IN_FLIGHT.inc()
+    try:
+        products, status = _fetch_with_retries(query, num_results, sample_diagnostics(logger))
+    finally:
+        SCRAPES_IN_FLIGHT.dec()
+        SCRAPE_DURATION.labels(status).observe(time.perf_counter() - started)
+        if status == FETCH_THROTTLED:
+            fetch_circuit.release()
+        else:
+            fetch_circuit.record(failed=status in CIRCUIT_FAILURE_STATUSES)
+    PRODUCTS_PER_QUERY.observe(len(products))
+    logger.info("Fetched '%s': %s, %d products", query, status, len(products),
+                extra={"query": query, "status": status, "products": len(products),
+                       "duration_ms": round((time.perf_counter() - started) * 1000, 1)})
+    return products, status
+
+def _fetch_with_retries(query, num_results, verbose=False):
+    """Fetches a search page through the rate limiter, retrying transient failures."""
     url_query = query.replace(' ', '-')
     raw_query = query.replace(' ', '%20')
-    url = f"https://www.myntra.com/{url_query}?rawQuery={raw_query}"
-    print(f"[DEBUG] Fetching Myntra results for: '{query}' from {url}")
-
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
-        "Accept-Language": "en-US,en;q=0.9",
-        "Accept-Encoding": "gzip, deflate, br",
-        "DNT": "1",
-        "Connection": "keep-alive",
-        "Upgrade-Insecure-Requests": "1",
-        "Sec-Fetch-Dest": "document",
-        "Sec-Fetch-Mode": "navigate",
-        "Sec-Fetch-Site": "none",
-        "Sec-Fetch-User": "?1",
-        "Cache-Control": "max-age=0",
-        "Referer": "https://www.google.com/"
-    }
-    
+    url = f"{MYNTRA_BASE_URL}/{url_query}?rawQuery={raw_query}"
+    limiter = host_rate_limiters.get(httpx.URL(url).host)
+    products, status = [], FETCH_THROTTLED
+
+    for attempt in range(SCRAPING_MAX_RETRIES + 1):
+        if attempt:
+            delay = backoff_delay(attempt)
+            logger.info("Retrying '%s' in %.2fs (attempt %d/%d)", query, delay, attempt + 1, SCRAPING_MAX_RETRIES + 1)
+            time.sleep(delay)
+
+        permit = limiter.acquire()
+        if permit is None:
+            logger.warning("Rate limiter wait exceeded for '%s'", query)
+            # A retry that can't get a slot keeps the previous attempt's (real) outcome
+            return products, status
+        products, status, retryable = [], FETCH_ERROR, False
+        try:
+            products, status, retryable = _fetch_search_page(query, url, num_results, verbose)
+        finally:
+            limiter.release(permit, throttled=status in (FETCH_BLOCKED, FETCH_CAPTCHA))
+        if not retryable:
+            break
+    return products, status
+
+def _fetch_search_page(query, url, num_results, verbose=False):
+    """
+    One request for a search page. Returns (products, status, retryable).
+
+    `verbose` (sampled per scrape) adds DEBUG diagnostics: headers, HTML head and products.
+    """
+    logger.debug("Fetching Myntra results for '%s' from %s", query, url)
+
     top_products = []
 
     try:
-        print(f"[DEBUG] Making request to: {url}")
-        print(f"[DEBUG] Request headers: {headers}")
-        
-        response = requests.get(url, headers=headers, timeout=10) # Added timeout
-        
-        print(f"[DEBUG] Response status code: {response.status_code}")
-        print(f"[DEBUG] Response headers: {dict(response.headers)}")
-        print(f"[DEBUG] Response URL (after redirects): {response.url}")
-        
+        # Shared pooled client: reuses keep-alive connections and default headers
+        response = get_http_client().get(url)
+
+        if verbose:
+            logger.debug("Response %s for '%s' (final URL %s), headers: %s",
+                         response.status_code, query, response.url, dict(response.headers))
+
+        if response.status_code in (403, 429):
+            logger.warning("Myntra responded with %s for '%s' - likely blocked", response.status_code, query,
+                           extra={"query": query, "status_code": response.status_code})
+            BLOCKED_RESPONSES.labels(f"http_{response.status_code}").inc()
+            debug_captures.capture(query, url, response.status_code, None, response.text)
+            return top_products, FETCH_BLOCKED, response.status_code == 429
+        if response.status_code >= 500:
+            logger.warning("Myntra responded with %s for '%s'", response.status_code, query,
+                           extra={"query": query, "status_code": response.status_code})
+            return top_products, FETCH_ERROR, True
+
         response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
 
         html_content = response.text
-        print(f"[DEBUG] Response content length: {len(html_content)} characters")
-        
-        # Log first 500 characters of HTML content
-        print(f"[DEBUG] First 500 chars of HTML: {html_content[:500]}")
-        
-        # Check if we're getting blocked/redirected
-        if "access denied" in html_content.lower() or "blocked" in html_content.lower():
-            print(f"[DEBUG] ⚠️ Possible blocking detected in HTML content")
-        
-        if "captcha" in html_content.lower():
-            print(f"[DEBUG] ⚠️ CAPTCHA detected in HTML content")
-
-        # Look for specific Myntra indicators
-        if "myntra" not in html_content.lower():
-            print(f"[DEBUG] ⚠️ 'myntra' not found in HTML content - possible redirect/block")
-        
-        # Debug regex patterns
-        print(f"[DEBUG] Searching for product names with pattern: '\"productName\":\"(.*?)\"'")
-        product_names = re.findall(r'"productName":"(.*?)"', html_content)
-        print(f"[DEBUG] Found {len(product_names)} product names: {product_names[:5]}")  # Show first 5
-        
-        print(f"[DEBUG] Searching for image URLs with pattern: '\"searchImage\":\"(.*?)\"'")
-        image_urls = re.findall(r'"searchImage":"(.*?)"', html_content)
-        print(f"[DEBUG] Found {len(image_urls)} image URLs: {image_urls[:5]}")  # Show first 5
-
-        # Alternative regex patterns to try
-        if not product_names:
-            print(f"[DEBUG] Trying alternative product name patterns...")
-            alt_product_names = re.findall(r'"name":"(.*?)"', html_content)
-            print(f"[DEBUG] Alternative pattern found {len(alt_product_names)} names: {alt_product_names[:5]}")
-            
-            title_pattern = re.findall(r'"title":"(.*?)"', html_content)
-            print(f"[DEBUG] Title pattern found {len(title_pattern)} titles: {title_pattern[:5]}")
-
-        if not image_urls:
-            print(f"[DEBUG] Trying alternative image URL patterns...")
-            alt_images = re.findall(r'"image":"(.*?)"', html_content)
-            print(f"[DEBUG] Alternative image pattern found {len(alt_images)} images: {alt_images[:5]}")
-            
-            src_pattern = re.findall(r'"src":"(.*?)"', html_content)
-            print(f"[DEBUG] Src pattern found {len(src_pattern)} sources: {src_pattern[:5]}")
-
-        if not product_names or not image_urls:
-            print(f"[DEBUG] ❌ No product names or images found for '{query}'.")
-            # Save a snippet of HTML for debugging
-            with open(f"/tmp/myntra_debug_{query.replace(' ', '_')}.html", "w", encoding="utf-8") as f:
-                f.write(html_content[:10000])  # Save first 10k chars
-            print(f"[DEBUG] Saved HTML snippet to /tmp/myntra_debug_{query.replace(' ', '_')}.html")
-            return top_products
-
-        count = 0
-        for product_name, img_url in zip(product_names, image_urls):
-            if count >= num_results:
-                break
-                
-            print(f"[DEBUG] Processing product {count + 1}: '{product_name}' with image: '{img_url}'")
-            
-            decoded_name = html.unescape(product_name).encode('utf-8').decode('unicode_escape')
-            decoded_url = html.unescape(img_url).encode('utf-8').decode('unicode_escape')
-
-            print(f"[DEBUG] Decoded name: '{decoded_name}'")
-            print(f"[DEBUG] Decoded URL: '{decoded_url}'")
-
-            # Construct full image URL if necessary
-            if decoded_url.startswith('http'):
-                full_url = decoded_url
+        if verbose:
+            logger.debug("Response content length %d; first 500 chars of HTML: %s", len(html_content), html_content[:500])
+
+        # Single pass over the embedded search state; fields stay paired per product
+        with PARSE_DURATION.time():
+            top_products = parse_search_page(html_content, num_results=num_results)
+
+        if not top_products:
+            failure_mode = detect_failure_mode(html_content)
+            if failure_mode:
+                BLOCKED_RESPONSES.labels(failure_mode).inc()
+            if failure_mode == "captcha":
+                status = FETCH_CAPTCHA
+            elif failure_mode == "blocked":
+                status = FETCH_BLOCKED
             else:
-                full_url = f"https://assets.myntassets.com/{decoded_url.lstrip('/')}"
-            
-            print(f"[DEBUG] Final image URL: '{full_url}'")
-                
-            top_products.append({"name": decoded_name, "image_url": full_url})
-            count += 1
-        
-        print(f"[DEBUG] ✅ Successfully found {len(top_products)} products for '{query}'")
-            
-    except requests.exceptions.RequestException as e:
-        print(f"[DEBUG] ❌ RequestException for '{query}': {e}")
-        print(f"[DEBUG] Exception type: {type(e).__name__}")
-    except Exception as e:
-        print(f"[DEBUG] ❌ Unexpected error for '{query}': {e}")
-        print(f"[DEBUG] Exception type: {type(e).__name__}")
-        import traceback
-        print(f"[DEBUG] Traceback: {traceback.format_exc()}")
-        
-    return top_products
+                status = FETCH_EMPTY
+            failure_mode = failure_mode or FAILURE_NO_MATCH
+            logger.warning("No products found for '%s' (%s)", query, failure_mode,
+                           extra={"query": query, "failure_mode": failure_mode})
+            # Sampled and written off the request path (see utils.debug_capture)
+            debug_captures.capture(query, url, response.status_code, failure_mode, html_content)
+            return top_products, status, False
+
+        if verbose:
+            for product in top_products:
+                logger.debug("Product for '%s': '%s' with image '%s'", query, product['name'], product['image_url'])
+        return top_products, FETCH_OK, False
+
+    except httpx.TransportError as e:
+        # Timeouts, connection resets and other network errors are worth retrying
+        logger.warning("Network error for '%s': %s: %s", query, type(e).__name__, e)
+        return top_products, FETCH_ERROR, True
+    except httpx.HTTPError as e:
+        logger.warning("HTTPError for '%s': %s: %s", query, type(e).__name__, e)
+    except Exception:
+        logger.exception("Unexpected error fetching '%s'", query)
+
+    return top_products, FETCH_ERROR, False
+
+def split_colors(color_str):
+    """Splits a recommendation color like 'Blue or Black' into individual colors."""
+    return [c.strip() for c in re.split(r'\s+or\s+', color_str, flags=re.IGNORECASE)]
+
+def build_search_query(clothing_type, color, gender="unisex"):
+    """Builds the canonical Myntra search query for a single clothing type / color combination."""
+    return canonical_search_query(clothing_type, color, gender)
+
+def plan_recommendation_queries(recommendations_data, gender="unisex"):
+    """
+    Flattens a recommendations payload into the search queries it needs.
+
+    Returns a list of (category, item, search_queries) tuples in payload order.
+    Each valid category starts with a (category, None, []) marker so empty
+    categories still show up in the results; non-list categories are skipped.
+    """
+    plan = []
+    if not recommendations_data or 'recommendations' not in recommendations_data:
+        return plan
+
+    for category, items in recommendations_data['recommendations'].items():
+        if not isinstance(items, list):
+            logger.debug("Skipping category '%s' as its value is not a list.", category)
+            continue
+
+        plan.append((category, None, []))
+
+        for item in items:
+            if not isinstance(item, dict):
+                logger.warning("Skipping item in category '%s' as it is not an object: %r", category, item)
+                continue
+            clothing_type = item.get('Clothing Type')
+            color_str = item.get('Color')
+
+            if not clothing_type or not color_str:
+                logger.debug("Skipping item due to missing 'Clothing Type' or 'Color': %s", item)
+                plan.append((category, item, []))
+                continue
+            if not isinstance(clothing_type, str) or not isinstance(color_str, str):
+                logger.warning("Skipping item with non-string 'Clothing Type' or 'Color': %s", item)
+                plan.append((category, item, []))
+                continue
+
+            search_queries = []
+            for color in split_colors(color_str):
+                search_query = build_search_query(clothing_type, color, gender)
+                normalization_stats.record(raw_search_query(clothing_type, color, gender), search_query)
+                search_queries.append(search_query)
+            plan.append((category, item, search_queries))
+
+    return plan
+
+def build_item_result(item, search_queries, products_by_query):
+    """Builds the result entry (recommendation plus products) for one recommended item."""
+    item_result = {
+        'recommendation': item.copy(),
+        'products': []
+    }
+    for search_query in search_queries:
+        for product in products_by_query.get(search_query) or []:
+            item_result['products'].append({
+                'search_query': search_query,
+                'product': product
+            })
+    return item_result
+
+def build_recommendation_results(plan, products_by_query):
+    """Assembles the results[category] structure from a query plan and fetched products."""
+    results = {}
+    for category, item, search_queries in plan:
+        results.setdefault(category, [])
+        if item is None or not search_queries:
+            continue
+        item_result = build_item_result(item, search_queries, products_by_query)
+        # Add item result to category results if products were found
+        if item_result['products']:
+            results[category].append(item_result)
+    return results
+
+def cache_key_for(search_query, num_results=2):
+    """Redis/L1 cache key for a (canonical) search query and result count."""
+    return query_cache_key(search_query, num_results)
+
+# --- Cached Scrape Entries ---
+# Entries are stored as {"products": [...], "status": FETCH_*, "fetched_at": epoch seconds}.
+# Plain product lists written before entries existed are still accepted as fresh.
+
+def make_cache_entry(products, status):
+    """Wraps scrape results in a cache entry."""
+    return {"products": products, "status": status, "fetched_at": time.time()}
+
+def last_good_key_for(search_query, num_results=2):
+    """Cache key of the last successful entry for a query (kept for LAST_GOOD_CACHE_TTL_SECONDS)."""
+    return f"last-good:{cache_key_for(search_query, num_results)}"
+
+def _mark_stale(products):
+    """Copies products with a "stale": True flag, for results that couldn't be refreshed."""
+    return [{**product, "stale": True} for product in products]
+
+def with_last_known(search_query, entry, num_results=2):
+    """Replaces an entry that has no products because the fetch failed or was skipped with last_known_entry(), if any."""
+    if entry["products"] or entry["status"] not in NOT_FETCHED_STATUSES + CIRCUIT_FAILURE_STATUSES:
+        return entry
+    return last_known_entry(search_query, num_results) or entry
+
+def last_known_entry(search_query, num_results=2):
+    """
+    The last successful result for a query, even if its regular entry expired,
+    as a FETCH_UNAVAILABLE entry with products marked stale. None if there is none.
+    """
+    cached = get_cache(redis_client, last_good_key_for(search_query, num_results))
+    if not isinstance(cached, dict) or not cached.get("products"):
+        return None
+    return {"products": _mark_stale(cached["products"]), "status": FETCH_UNAVAILABLE,
+            "fetched_at": cached.get("fetched_at", 0)}
+
+def cache_entry_ttl(entry):
+    """Redis TTL for an entry: long for results, short for empty or failed scrapes."""
+    if entry["status"] == FETCH_OK:
+        return CACHE_STALE_TTL_SECONDS
+    if entry["status"] == FETCH_EMPTY:
+        return NEGATIVE_CACHE_TTL_SECONDS
+    return FAILURE_CACHE_TTL_SECONDS
+
+def _as_cache_entry(cached):
+    """Normalizes a cached value (entry or legacy product list) to an entry."""
+    if cached is None or isinstance(cached, dict):
+        return cached
+    return {"products": cached, "status": FETCH_OK, "fetched_at": time.time()}
+
+def is_stale(entry):
+    """True once a successful entry is older than the soft TTL (CACHE_TTL_SECONDS)."""
+    return entry["status"] == FETCH_OK and time.time() - entry.get("fetched_at", 0) > CACHE_TTL_SECONDS
+
+# Queries currently being refreshed in the background (stale-while-revalidate)
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+_refresh_executor = ThreadPoolExecutor(max_workers=CACHE_REFRESH_WORKERS, thread_name_prefix="cache-refresh")
+
+def _claim_refresh(cache_key):
+    """Marks a key as being refreshed. Returns False if a refresh is already running."""
+    with _refreshing_lock:
+        if cache_key in _refreshing:
+            return False
+        _refreshing.add(cache_key)
+        return True
+
+def _run_claimed_refresh(search_query, num_results):
+    """Re-scrapes a claimed query; only successful results replace the existing entry."""
+    try:
+        products, status = fetch_myntra_products_with_status(search_query, num_results)
+        record_in_catalog(search_query, products, status)
+        if status == FETCH_OK:
+            cache_entries_many({search_query: make_cache_entry(products, status)}, num_results)
+            return True
+        logger.info("Refresh of '%s' failed (%s); keeping stale entry.", search_query, status)
+        return False
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard(cache_key_for(search_query, num_results))
+
+def refresh_query(search_query, num_results=2):
+    """
+    Re-scrapes a query in the calling thread unless a refresh is already running.
+
+    Returns True if fresh products were cached.
+    """
+    if not _claim_refresh(cache_key_for(search_query, num_results)):
+        return False
+    return _run_claimed_refresh(search_query, num_results)
+
+def schedule_refresh(search_query, num_results=2):
+    """Refreshes a stale query in the background unless a refresh is already running."""
+    if _claim_refresh(cache_key_for(search_query, num_results)):
+        # Keep the request id of the request that found the entry stale in the refresh's logs
+        _refresh_executor.submit(contextvars.copy_context().run, _run_claimed_refresh, search_query, num_results)
+
+def serve_cache_entry(search_query, cached, num_results=2):
+    """
+    Returns a cached value's products, kicking off a background refresh if it's stale.
+
+    While the circuit breaker is open stale products are not refreshed and are marked stale.
+    A cached failure (blocked, captcha, error) serves the last known products instead, if any.
+    """
+    entry = _as_cache_entry(cached)
+    if entry["status"] in CIRCUIT_FAILURE_STATUSES:
+        return with_last_known(search_query, entry, num_results)["products"]
+    if is_stale(entry):
+        if fetch_circuit.state == CIRCUIT_OPEN:
+            return _mark_stale(entry["products"])
+        schedule_refresh(search_query, num_results)
+    return entry["products"]
+
+def _fetch_and_cache(search_query, cache_key, num_results, write_cache=True):
+    """
+    Scrapes Myntra for a query and caches the outcome (including empty/failed results).
+
+    If the fetch failed, or the circuit breaker or the rate limiter skipped it, the
+    last known products are returned instead. Failures are cached right away even
+    with write_cache=False, since the caller's batch only sees the fallback entry.
+    """
+    entry = make_cache_entry(*fetch_myntra_products_with_status(search_query, num_results=num_results))
+    record_in_catalog(search_query, entry["products"], entry["status"])
+    if entry["status"] in NOT_FETCHED_STATUSES:
+        return with_last_known(search_query, entry, num_results)
+    if write_cache or entry["status"] in CIRCUIT_FAILURE_STATUSES:
+        cache_entries_many({search_query: entry}, num_results)
+    return with_last_known(search_query, entry, num_results)
+
+def _fetch_coalesced(search_query, cache_key, num_results, write_cache=True):
+    """Fetches a query, coalescing with other workers through Redis when enabled."""
+    if redis_query_flight is None:
+        return _fetch_and_cache(search_query, cache_key, num_results, write_cache)
+    # Waiters in other processes read the leader's result from the cache, so always write it
+    entry = _as_cache_entry(redis_query_flight.do(
+        cache_key,
+        lambda: _fetch_and_cache(search_query, cache_key, num_results),
+        lambda: get_cache(redis_client, cache_key)
+    ))
+    # Waiters read the leader's cached failure, not its fallback
+    return with_last_known(search_query, entry, num_results) if entry else entry
+
+def record_in_catalog(search_query, products, status):
+    """Adds a live scrape's products to the local catalog index (results and "no results" only)."""
+    if status in (FETCH_OK, FETCH_EMPTY):
+        catalog_index.record(search_query, products)
+
+def get_indexed_products_many(search_queries, num_results=2):
+    """
+    Answers cache misses from the local catalog index (see utils.catalog_index).
+
+    Returns products for the queries it has an exact or full-text match for (an
+    empty list for queries known to have no results); the rest still need a live scrape. Index results aren't written to the cache, but
+    like cached entries, ones older than CACHE_TTL_SECONDS are served while the
+    query is refreshed in the background (which caches and re-indexes it).
+    """
+    if not search_queries:
+        return {}
+    return {
+        q: serve_cache_entry(
+            q, {"products": products, "status": FETCH_OK if products else FETCH_EMPTY, "fetched_at": fetched_at},
+            num_results,
+        )
+        for q, (products, fetched_at) in catalog_index.lookup_many(search_queries, num_results).items()
+    }
+
+def get_cached_products(search_query, num_results=2):
+    """
+    Returns cached products for a search query (L1, then Redis), or None on a miss.
+
+    Negative entries return an empty list; stale entries are served and refreshed in the background.
+    """
+    cached = get_cache(redis_client, cache_key_for(search_query, num_results))
+    if cached is None:
+        return None
+    return serve_cache_entry(search_query, cached, num_results)
+
+def get_cached_products_many(search_queries, num_results=2):
+    """Looks up several search queries in one cache round trip. Returns only the hits."""
+    keys = {q: cache_key_for(q, num_results) for q in search_queries}
+    cached = get_cache_many(redis_client, list(keys.values()))
+    return {q: serve_cache_entry(q, cached[key], num_results) for q, key in keys.items() if key in cached}
+
+def cache_entries_many(entries_by_query, num_results=2):
+    """Caches freshly scraped entries for several queries with one pipelined write."""
+    values, ttls = cache_entry_batch(entries_by_query, num_results)
+    if values:
+        set_cache_many(redis_client, values, ttls=ttls)
+
+def cache_entry_batch(entries_by_query, num_results=2):
+    """
+    Builds the (values, ttls) keyed by cache key for a batch write of scraped entries.
+
+    Successful entries are also saved as the query's last known good result;
+    FETCH_UNAVAILABLE/FETCH_THROTTLED entries (nothing was fetched) are not written at all.
+    """
+    values = {}
+    ttls = {}
+    for search_query, entry in entries_by_query.items():
+        if entry["status"] in NOT_FETCHED_STATUSES:
+            continue
+        cache_key = cache_key_for(search_query, num_results)
+        values[cache_key] = entry
+        ttls[cache_key] = cache_entry_ttl(entry)
+        if entry["status"] == FETCH_OK:
+            values[last_good_key_for(search_query, num_results)] = entry
+            ttls[last_good_key_for(search_query, num_results)] = LAST_GOOD_CACHE_TTL_SECONDS
+    return values, ttls
+
+def scrape_query(search_query, num_results=2, write_cache=True):
+    """
+    Scrapes a search query that missed the cache and returns its cache entry.
+
+    Concurrent scrapes of the same key are coalesced so only one runs and every
+    waiter shares its result. Pass write_cache=False when the caller batches
+    its cache writes with cache_entries_many.
+    """
+    cache_key = cache_key_for(search_query, num_results)
+    return query_flight.do(cache_key, _fetch_coalesced, search_query, cache_key, num_results, write_cache)
+
+def get_products_for_query(search_query, num_results=2):
+    """Returns products for a search query, checking the cache and catalog index first and scraping on a miss."""
+    cached_products = get_cached_products(search_query, num_results)
+    if cached_products is not None:
+        return cached_products
+    indexed_products = get_indexed_products_many([search_query], num_results)
+    if search_query in indexed_products:
+        return indexed_products[search_query]
+    return scrape_query(search_query, num_results)["products"]
+
+def get_products_for_queries(search_queries, num_results=2, progress_callback=None):
+    """
+    Returns products for several search queries.
+
+    All cache lookups happen in one round trip up front; misses the local
+    catalog index can't answer are scraped one by one and written back in a
+    single pipelined batch. `progress_callback`,
+    if given, is called as progress_callback(done, total) after each query.
+    """
+    unique_queries = list(dict.fromkeys(search_queries))
+    record_query_popularity(redis_client, unique_queries)
+    products_by_query = get_cached_products_many(unique_queries, num_results)
+    products_by_query.update(get_indexed_products_many(
+        [q for q in unique_queries if q not in products_by_query], num_results
+    ))
+
+    total = len(unique_queries)
+    done = len(products_by_query)
+    if progress_callback:
+        progress_callback(done, total)
+
+    scraped = {}
+    for search_query in unique_queries:
+        if search_query in products_by_query:
+            continue
+        done += 1
+        try:
+            scraped[search_query] = scrape_query(search_query, num_results, write_cache=False)
+        except Exception:
+            logger.exception("Error processing query '%s'", search_query)
+            scraped[search_query] = make_cache_entry([], FETCH_ERROR)
+        if progress_callback:
+            progress_callback(done, total)
+
+    cache_entries_many(scraped, num_results)
+    products_by_query.update({q: entry["products"] for q, entry in scraped.items()})
+    return products_by_query
 
 def process_recommendations_and_fetch(recommendations_data, gender="unisex"):
     """Processes recommendations and fetches top 2 Myntra products for each item."""
-    global redis_client
-    # print("[Background Task] Starting recommendation processing...")
     if not recommendations_data or 'recommendations' not in recommendations_data:
-        print("[Background Task] No recommendations data found to process.")
+        logger.info("No recommendations data found to process.")
         return
 
-    parsed_recommendations = recommendations_data['recommendations']
+    plan = plan_recommendation_queries(recommendations_data, gender)
+    products_by_query = get_products_for_queries([q for _, _, queries in plan for q in queries], num_results=2)
+    for search_query, products in products_by_query.items():
+        if not products:
+            logger.info("No results found for '%s'.", search_query)
 
-    for category, items in parsed_recommendations.items():
-        if not isinstance(items, list):
-            print(f"[Background Task] Skipping category '{category}' as its value is not a list.")
-            continue
-            
-        # print(f"[Background Task] Processing category: {category}")
-        for item in items:
-            try:
-                clothing_type = item.get('Clothing Type')
-                color_str = item.get('Color')
-
-                if not clothing_type or not color_str:
-                    print(f"[Background Task] Skipping item due to missing 'Clothing Type' or 'Color': {item}")
-                    continue
-
-                # Split colors if 'or' is present, otherwise treat as a single color
-                colors = [c.strip() for c in re.split(r'\s+or\s+', color_str, flags=re.IGNORECASE)]
-
-                for color in colors:
-                    if color.lower() in clothing_type.lower():
-                        search_query = f"{clothing_type} for {gender}"
-                        # print(f"\n[Background Task] Searching for: {search_query} (color already in type)")
-                    else:
-                        search_query = f"{color} {clothing_type} for {gender}"
-                        # print(f"\n[Background Task] Searching for: {search_query}")
-
-                    # --- Check Cache First ---
-                    cache_key = f"myntra:{search_query}"
-                    
-                    if redis_client:
-                        cached_products = get_cache(redis_client, cache_key)
-                        
-                        if cached_products is not None:
-                            # Use cached results directly
-                            products = cached_products
-                            # print(f"[Background Task] Using cached results for '{search_query}'.")
-                        else:
-                            # Fetch from Myntra if not in cache
-                            products = fetch_myntra_products(search_query, num_results=2)
-                            # Cache the results if found
-                            if products:
-                                set_cache(redis_client, cache_key, products)
-                    else:
-                        # print("[Background Task] Redis client not available, skipping cache")
-                        products = fetch_myntra_products(search_query, num_results=2)
-                    # --- End Cache Check ---
-                        
-                    if products:
-                        pass
-                        # print(f"[Background Task] Top {len(products)} results for '{search_query}':")
-                        # for i, product in enumerate(products, 1):
-                            # print(f"  {i}. Name: {product['name']}")
-                            # print(f"     Image: {product['image_url']}")
-                    else:
-                        print(f"[Background Task] No results found for '{search_query}'.")
-                        
-            except Exception as e:
-                print(f"[Background Task] Error processing item {item}: {e}")
-
-    # print("[Background Task] Finished processing recommendations.")
-
-def get_recommendations_data(recommendations_data , gender="unisex"):
+def get_recommendations_data(recommendations_data , gender="unisex", progress_callback=None):
     """
     Processes recommendations and fetches Myntra products for each item.
-    Checks Redis cache first, scrapes if not available, and returns structured results.
+    Checks Redis cache first, then the local catalog index, scrapes if neither
+    has the products, and returns structured results.
+
+    This is the sequential version used from worker threads; request handlers
+    should use utils.scrape_engine.get_recommendations_data_async instead.
+    `progress_callback(done, total)` reports progress per search query.
     """
-    global redis_client
-    results = {}
-    
-    print(f"[DEBUG] Starting get_recommendations_data with gender: {gender}")
-    print(f"[DEBUG] Redis client available: {redis_client is not None}")
-    
+    logger.debug("Starting get_recommendations_data with gender: %s (Redis available: %s)", gender, redis_client is not None)
+
     if not recommendations_data or 'recommendations' not in recommendations_data:
-        print("[DEBUG] ❌ No recommendations data found to process.")
-        return results
+        logger.info("No recommendations data found to process.")
+        return {}
 
-    parsed_recommendations = recommendations_data['recommendations']
-    print(f"[DEBUG] Processing {len(parsed_recommendations)} categories")
+    plan = plan_recommendation_queries(recommendations_data, gender)
+    products_by_query = get_products_for_queries(
+        [q for _, _, queries in plan for q in queries], num_results=2, progress_callback=progress_callback
+    )
+    results = build_recommendation_results(plan, products_by_query)
+
+    logger.info("Finished processing. Found results for %d categories", len(results),
+                extra={"categories": {cat: len(items) for cat, items in results.items()}})
 
-    for category, items in parsed_recommendations.items():
-        if not isinstance(items, list):
-            print(f"[DEBUG] ⚠️ Skipping category '{category}' as its value is not a list.")
-            continue
-            
-        # Initialize category in results
-        results[category] = []
-        print(f"[DEBUG] Processing category '{category}' with {len(items)} items")
-        
-        for item_idx, item in enumerate(items):
-            try:
-                clothing_type = item.get('Clothing Type')
-                color_str = item.get('Color')
-                
-                print(f"[DEBUG] Item {item_idx + 1}/{len(items)}: {item}")
-
-                if not clothing_type or not color_str:
-                    print(f"[DEBUG] ⚠️ Skipping item due to missing 'Clothing Type' or 'Color': {item}")
-                    continue
-
-                # Create item result with original recommendation
-                item_result = {
-                    'recommendation': item.copy(),
-                    'products': []
-                }
-                
-                # Split colors if 'or' is present, otherwise treat as a single color
-                colors = [c.strip() for c in re.split(r'\s+or\s+', color_str, flags=re.IGNORECASE)]
-                print(f"[DEBUG] Split colors: {colors}")
-
-                for color_idx, color in enumerate(colors):
-                    if color.lower() in clothing_type.lower():
-                        search_query = f"{clothing_type} for {gender}"
-                    else:
-                        search_query = f"{color} {clothing_type} for {gender}"
-                    
-                    print(f"[DEBUG] Color {color_idx + 1}/{len(colors)}: Processing search query: '{search_query}'")
-
-                    # Check Cache First
-                    cache_key = f"myntra:{search_query}"
-                    
-                    if redis_client:
-                        print(f"[DEBUG] Checking cache for key: '{cache_key}'")
-                        cached_products = get_cache(redis_client, cache_key)
-                        
-                        if cached_products is not None:
-                            # Use cached results directly
-                            products = cached_products
-                            print(f"[DEBUG] ✅ Cache HIT for '{search_query}' - found {len(products)} products")
-                        else:
-                            print(f"[DEBUG] 💨 Cache MISS for '{search_query}' - fetching from Myntra")
-                            # Fetch from Myntra if not in cache
-                            products = fetch_myntra_products(search_query, num_results=2)
-                            # Cache the results if found
-                            if products:
-                                print(f"[DEBUG] 💾 Caching {len(products)} products for '{search_query}'")
-                                set_cache(redis_client, cache_key, products)
-                            else:
-                                print(f"[DEBUG] ⚠️ No products to cache for '{search_query}'")
-                    else:
-                        print(f"[DEBUG] ⚠️ Redis client not available, fetching without cache")
-                        # Fetch without cache
-                        products = fetch_myntra_products(search_query, num_results=2)
-                        
-                    # Add products to item result
-                    if products:
-                        print(f"[DEBUG] ✅ Adding {len(products)} products to results for '{search_query}'")
-                        for product in products:
-                            item_result['products'].append({
-                                'search_query': search_query,
-                                'product': product
-                            })
-                    else:
-                        print(f"[DEBUG] ❌ No results found for '{search_query}'.")
-                
-                # Add item result to category results if products were found
-                if item_result['products']:
-                    results[category].append(item_result)
-                    print(f"[DEBUG] ✅ Added item to category '{category}' with {len(item_result['products'])} products")
-                else:
-                    print(f"[DEBUG] ⚠️ Skipping item - no products found")
-                        
-            except Exception as e:
-                print(f"[DEBUG] ❌ Error processing item {item}: {e}")
-                import traceback
-                print(f"[DEBUG] Traceback: {traceback.format_exc()}")
-    
-    print(f"[DEBUG] ✅ Finished processing. Found results for {len(results)} categories:")
-    for cat, items in results.items():
-        print(f"[DEBUG]   - {cat}: {len(items)} items with products")
-    
     return results
 
 # Example usage (optional, for testing)
@@ -1,7 +1,26 @@
 import redis
+import redis.asyncio
+import logging
 import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
 from dotenv import load_dotenv
 import json
+from .metrics import REDIS_DURATION, count_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+try:
+    import msgpack
+except ImportError: # Optional: values are stored as (compressed) JSON without it
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError: # Optional: zlib is used without it
+    zstandard = None
 
 # Load environment variables from .env file
 load_dotenv()
@@ -12,73 +31,509 @@ REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
 REDIS_DB = int(os.getenv("REDIS_DB", 0))
 REDIS_PASSWORD = os.getenv("REDIS_PASSWORD", None) # Add REDIS_PASSWORD to .env if needed
 
+# --- Redis Connection Pools ---
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 50)) # Per pool (sync and async each get one)
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", 5)) # Wait for a free pooled connection
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", 5))
+REDIS_SOCKET_CONNECT_TIMEOUT = float(os.getenv("REDIS_SOCKET_CONNECT_TIMEOUT", 2))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", 30)) # Ping idle connections before reuse
+
 # --- Redis Cache TTL ---
 CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", 3600)) # Default to 1 hour
 
+# --- Stale-while-revalidate / Negative Caching ---
+# Scraped entries are fresh for CACHE_TTL_SECONDS, then served stale (and refreshed in the
+# background) until CACHE_STALE_TTL_SECONDS, when Redis finally expires them.
+CACHE_STALE_TTL_SECONDS = int(os.getenv("CACHE_STALE_TTL_SECONDS", 86400)) # Default to 1 day
+NEGATIVE_CACHE_TTL_SECONDS = int(os.getenv("NEGATIVE_CACHE_TTL_SECONDS", 300)) # Queries with no results
+FAILURE_CACHE_TTL_SECONDS = int(os.getenv("FAILURE_CACHE_TTL_SECONDS", 60)) # Blocked/captcha/failed scrapes
+# Last successful result per query, served (marked stale) while the scraper's circuit breaker is open
+LAST_GOOD_CACHE_TTL_SECONDS = int(os.getenv("LAST_GOOD_CACHE_TTL_SECONDS", 7 * 86400)) # Default to 7 days
+
+# --- In-process L1 Cache (in front of Redis) ---
+L1_CACHE_MAX_ENTRIES = int(os.getenv("L1_CACHE_MAX_ENTRIES", 2048))
+L1_CACHE_MAX_BYTES = int(os.getenv("L1_CACHE_MAX_BYTES", 16 * 1024 * 1024)) # Default to 16 MiB
+L1_CACHE_TTL_SECONDS = int(os.getenv("L1_CACHE_TTL_SECONDS", CACHE_TTL_SECONDS)) # Never longer than the Redis TTL
+
+class LocalTTLCache:
+    """
+    Thread-safe in-process cache with per-entry TTLs and LRU eviction.
+
+    Bounded both by entry count and by the approximate serialized size of the
+    stored values. Values are returned as stored, so callers must not mutate them.
+    """
+
+    def __init__(self, max_entries: int = L1_CACHE_MAX_ENTRIES, max_bytes: int = L1_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict() # key -> (expires_at, value, size)
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        """Returns the cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, ttl_seconds: float, size: int):
+        """Stores a value for ttl_seconds, evicting least recently used entries if over budget."""
+        if ttl_seconds <= 0 or size > self.max_bytes or self.max_entries <= 0:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl_seconds, value, size)
+            self.total_bytes += size
+            while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key: str):
+        _, _, size = self._entries.pop(key)
+        self.total_bytes -= size
+
+l1_cache = LocalTTLCache()
+
+# Per-tier hit/miss counters (see get_cache_stats)
+_cache_stats = {"l1_hits": 0, "l1_misses": 0, "l2_hits": 0, "l2_misses": 0, "l2_errors": 0}
+_cache_stats_lock = threading.Lock()
+
+def _count(stat: str):
+    with _cache_stats_lock:
+        _cache_stats[stat] += 1
+    count_cache_lookup(stat)
+
+def get_cache_stats() -> dict:
+    """Returns per-tier hit/miss counters and current L1 usage."""
+    with _cache_stats_lock:
+        stats = dict(_cache_stats)
+    stats["l1_entries"] = len(l1_cache)
+    stats["l1_bytes"] = l1_cache.total_bytes
+    return stats
+
+# --- Cache Value Format ---
+# Values are stored as a 3-byte header (magic, format version, flags) followed by the payload.
+# Legacy entries are plain JSON text, which can never start with the magic byte (0xC1 is
+# neither valid UTF-8 nor a valid msgpack type), so both formats are readable side by side.
+CACHE_FORMAT_MAGIC = 0xC1
+CACHE_FORMAT_VERSION = 1
+CACHE_SERIALIZER = os.getenv("CACHE_SERIALIZER", "msgpack").lower() # "msgpack" or "json"
+CACHE_COMPRESSION = os.getenv("CACHE_COMPRESSION", "zlib").lower() # "zlib", "zstd" or "none"
+CACHE_COMPRESSION_THRESHOLD = int(os.getenv("CACHE_COMPRESSION_THRESHOLD", 1024)) # Only compress payloads larger than this
+CACHE_COMPRESSION_LEVEL = int(os.getenv("CACHE_COMPRESSION_LEVEL", 3))
+
+_SERIALIZER_JSON = 0x00
+_SERIALIZER_MSGPACK = 0x01
+_SERIALIZER_MASK = 0x0F
+_COMPRESSION_ZLIB = 0x10
+_COMPRESSION_ZSTD = 0x20
+_COMPRESSION_MASK = 0xF0
+
+# Interned string prefixes (msgpack only). Append new prefixes at the end: the index is stored.
+INTERNED_PREFIXES = ("https://assets.myntassets.com/", "http://assets.myntassets.com/")
+_INTERNED_PREFIX_EXT = 1
+
+if CACHE_SERIALIZER == "msgpack" and msgpack is None:
+    logger.warning("CACHE_SERIALIZER is 'msgpack' but the 'msgpack' package is not installed. Falling back to JSON.")
+if CACHE_COMPRESSION == "zstd" and zstandard is None:
+    logger.warning("CACHE_COMPRESSION is 'zstd' but the 'zstandard' package is not installed. Falling back to zlib.")
+
+_zstd_compressor = zstandard.ZstdCompressor(level=CACHE_COMPRESSION_LEVEL) if zstandard else None
+_zstd_decompressor = zstandard.ZstdDecompressor() if zstandard else None
+
+# Low-level decode failures, all reported as ValueError by deserialize_value
+_DECODE_ERRORS = (zlib.error, IndexError, UnicodeDecodeError) + ((msgpack.UnpackException,) if msgpack else ())
+if zstandard:
+    _DECODE_ERRORS += (zstandard.ZstdError,)
+
+def _intern_prefixes(value):
+    """Replaces known string prefixes with compact msgpack extension values."""
+    if isinstance(value, str):
+        for index, prefix in enumerate(INTERNED_PREFIXES):
+            if value.startswith(prefix):
+                return msgpack.ExtType(_INTERNED_PREFIX_EXT, bytes((index,)) + value[len(prefix):].encode("utf-8"))
+        return value
+    if isinstance(value, dict):
+        return {key: _intern_prefixes(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_intern_prefixes(item) for item in value]
+    return value
+
+def _expand_prefix(code: int, data: bytes):
+    if code != _INTERNED_PREFIX_EXT:
+        return msgpack.ExtType(code, data)
+    return INTERNED_PREFIXES[data[0]] + data[1:].decode("utf-8")
+
+def serialize_value(value) -> bytes:
+    """
+    Encodes a cache value: msgpack with interned URL prefixes (or JSON),
+    compressed when larger than CACHE_COMPRESSION_THRESHOLD.
+
+    Raises TypeError if the value can't be serialized.
+    """
+    if CACHE_SERIALIZER == "msgpack" and msgpack is not None:
+        flags = _SERIALIZER_MSGPACK
+        payload = msgpack.packb(_intern_prefixes(value), use_bin_type=True)
+    else:
+        flags = _SERIALIZER_JSON
+        payload = json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+    if CACHE_COMPRESSION != "none" and len(payload) > CACHE_COMPRESSION_THRESHOLD:
+        if CACHE_COMPRESSION == "zstd" and _zstd_compressor is not None:
+            compressed, compression = _zstd_compressor.compress(payload), _COMPRESSION_ZSTD
+        else:
+            compressed, compression = zlib.compress(payload, CACHE_COMPRESSION_LEVEL), _COMPRESSION_ZLIB
+        if len(compressed) < len(payload):
+            payload, flags = compressed, flags | compression
+
+    return bytes((CACHE_FORMAT_MAGIC, CACHE_FORMAT_VERSION, flags)) + payload
+
+def deserialize_value(raw: bytes | str):
+    """
+    Decodes a value written by serialize_value, or a legacy plain-JSON entry.
+
+    Raises ValueError if the value is corrupt or uses an unknown format.
+    """
+    if isinstance(raw, str) or not raw or raw[0] != CACHE_FORMAT_MAGIC:
+        return json.loads(raw) # Legacy JSON entry (json.JSONDecodeError is a ValueError)
+    if len(raw) < 3 or raw[1] != CACHE_FORMAT_VERSION:
+        raise ValueError(f"unsupported cache format version {raw[1] if len(raw) > 1 else None}")
+
+    flags = raw[2]
+    payload = memoryview(raw)[3:]
+    try:
+        compression = flags & _COMPRESSION_MASK
+        if compression == _COMPRESSION_ZLIB:
+            payload = zlib.decompress(payload)
+        elif compression == _COMPRESSION_ZSTD:
+            if _zstd_decompressor is None:
+                raise ValueError("value is zstd-compressed but the 'zstandard' package is not installed")
+            payload = _zstd_decompressor.decompress(payload)
+        elif compression:
+            raise ValueError(f"unknown compression flag {compression:#x}")
+
+        serializer = flags & _SERIALIZER_MASK
+        if serializer == _SERIALIZER_MSGPACK:
+            if msgpack is None:
+                raise ValueError("value is msgpack-encoded but the 'msgpack' package is not installed")
+            return msgpack.unpackb(payload, raw=False, ext_hook=_expand_prefix)
+        if serializer == _SERIALIZER_JSON:
+            return json.loads(bytes(payload))
+        raise ValueError(f"unknown serializer flag {serializer:#x}")
+    except _DECODE_ERRORS as e:
+        raise ValueError(f"corrupt cache value: {e}") from e
+
+def _redis_pool_kwargs() -> dict:
+    """Connection settings shared by the sync and async pools."""
+    return {
+        "host": REDIS_HOST,
+        "port": REDIS_PORT,
+        "db": REDIS_DB,
+        "password": REDIS_PASSWORD,
+        "max_connections": REDIS_MAX_CONNECTIONS,
+        "timeout": REDIS_POOL_TIMEOUT,
+        "socket_timeout": REDIS_SOCKET_TIMEOUT,
+        "socket_connect_timeout": REDIS_SOCKET_CONNECT_TIMEOUT,
+        "health_check_interval": REDIS_HEALTH_CHECK_INTERVAL,
+        "decode_responses": False # Cache values are binary (see serialize_value); decode explicitly where needed
+    }
+
 def get_redis_client() -> redis.StrictRedis | None:
-    """Initializes and returns a Redis client connection."""
+    """
+    Initializes and returns a thread-safe Redis client for background workers.
+
+    Backed by a bounded, blocking connection pool so bursts of worker threads
+    wait for a connection instead of opening unlimited sockets.
+    """
     try:
-        client = redis.StrictRedis(
-            host=REDIS_HOST,
-            port=REDIS_PORT,
-            db=REDIS_DB,
-            password=REDIS_PASSWORD,
-            decode_responses=True # Decode responses to strings automatically
-        )
+        pool = redis.BlockingConnectionPool(**_redis_pool_kwargs())
+        client = redis.StrictRedis(connection_pool=pool)
         client.ping() # Check connection
-        print(f"✅ Attempting Redis connection to {REDIS_HOST}:{REDIS_PORT} (will confirm success in lifespan)")
+        logger.info("Attempting Redis connection to %s:%s (will confirm success in lifespan)", REDIS_HOST, REDIS_PORT)
+        return client
+    except redis.exceptions.ConnectionError as e:
+        logger.error("Failed to connect to Redis at %s:%s - %s", REDIS_HOST, REDIS_PORT, e)
+        return None
+    except Exception as e:
+        logger.error("An unexpected error occurred during Redis connection: %s", e)
+        return None
+
+async def get_async_redis_client() -> redis.asyncio.Redis | None:
+    """Initializes and returns an asyncio Redis client for request handlers."""
+    try:
+        pool = redis.asyncio.BlockingConnectionPool(**_redis_pool_kwargs())
+        client = redis.asyncio.Redis(connection_pool=pool)
+        await client.ping() # Check connection
+        logger.info("Async Redis client connected to %s:%s (pool size: %s)", REDIS_HOST, REDIS_PORT, REDIS_MAX_CONNECTIONS)
         return client
     except redis.exceptions.ConnectionError as e:
-        print(f"❌ Failed to connect to Redis at {REDIS_HOST}:{REDIS_PORT} - {e}")
+        logger.error("Failed to connect async Redis client to %s:%s - %s", REDIS_HOST, REDIS_PORT, e)
         return None
     except Exception as e:
-        print(f"❌ An unexpected error occurred during Redis connection: {e}")
+        logger.error("An unexpected error occurred during async Redis connection: %s", e)
         return None
 
 # Initialize the client globally so it's created once on module import
 # redis_client = get_redis_client()
 
 def set_cache(redis_client: redis.StrictRedis, key: str, value: list | dict, expiration_seconds: int = CACHE_TTL_SECONDS):
-    """Sets a value in the Redis cache with an expiration time."""
+    """Sets a value in the L1 cache and in Redis with an expiration time."""
+    try:
+        serialized_value = serialize_value(value)
+    except TypeError as e:
+         logger.warning("TypeError: Could not serialize value for key '%s' - %s", key, e)
+         return False
+
+    l1_cache.set(key, value, min(expiration_seconds, L1_CACHE_TTL_SECONDS), len(serialized_value))
+
     if not redis_client:
-        print("⚠️ Redis client not available (from app state). Skipping cache set.")
+        logger.debug("Redis client not available (from app state). Skipping cache set.")
         return False
     try:
-        # Serialize the value to JSON string before storing
-        json_value = json.dumps(value)
-        redis_client.setex(key, expiration_seconds, json_value)
-        print(f"💾 Cached data in Redis with key: {key} (TTL: {expiration_seconds}s)")
+        with REDIS_DURATION.labels("set").time():
+            redis_client.setex(key, expiration_seconds, serialized_value)
+        logger.debug("Cached data in Redis with key: %s (TTL: %ss)", key, expiration_seconds)
         return True
     except redis.exceptions.RedisError as e:
-        print(f"⚠️ Redis Error: Failed to set cache for key '{key}' - {e}")
+        logger.warning("Redis Error: Failed to set cache for key '%s' - %s", key, e)
         return False
-    except TypeError as e:
-         print(f"⚠️ TypeError: Could not serialize value for key '{key}' to JSON - {e}")
-         return False
 
 def get_cache(redis_client: redis.StrictRedis, key: str) -> list | dict | None:
-    """Gets a value from the Redis cache."""
+    """Gets a value from the L1 cache, falling back to Redis."""
+    value = l1_cache.get(key)
+    if value is not None:
+        _count("l1_hits")
+        return value
+    _count("l1_misses")
+
     if not redis_client:
-        print("⚠️ Redis client not available (from app state). Skipping cache get.")
+        logger.debug("Redis client not available (from app state). Skipping cache get.")
         return None
     try:
-        cached_value = redis_client.get(key)
+        # GET + PTTL in one round trip so the L1 copy never outlives the Redis entry
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.get(key)
+        pipe.pttl(key)
+        with REDIS_DURATION.labels("get").time():
+            cached_value, ttl_ms = pipe.execute()
         if cached_value:
-            print(f"📦 Cache hit for key: {key}")
-            # Deserialize the JSON string back to Python object
-            return json.loads(cached_value)
+            _count("l2_hits")
+            logger.debug("Cache hit for key: %s", key)
+            value = deserialize_value(cached_value)
+            if ttl_ms and ttl_ms > 0:
+                l1_cache.set(key, value, min(ttl_ms / 1000, L1_CACHE_TTL_SECONDS), len(cached_value))
+            return value
         else:
-            print(f"💨 Cache miss for key: {key}")
+            _count("l2_misses")
+            logger.debug("Cache miss for key: %s", key)
             return None
     except redis.exceptions.RedisError as e:
-        print(f"⚠️ Redis Error: Failed to get cache for key '{key}' - {e}")
+        _count("l2_errors")
+        logger.warning("Redis Error: Failed to get cache for key '%s' - %s", key, e)
         return None
-    except json.JSONDecodeError as e:
-        print(f"⚠️ JSON Error: Could not deserialize cached value for key '{key}' - {e}")
+    except ValueError as e:
+        logger.warning("Cache Error: Could not deserialize cached value for key '%s' - %s", key, e)
         # Optionally delete the invalid key
         # try:
         #     redis_client.delete(key)
         #     print(f"🗑️ Deleted invalid cache key: {key}")
         # except redis.exceptions.RedisError:
         #     pass # Ignore deletion error
-        return None 
\ No newline at end of file
+        return None
+
+def _l1_get_many(keys: list[str]) -> tuple[dict, list[str]]:
+    """Looks keys up in the L1 cache. Returns (found, keys still to fetch from Redis)."""
+    found = {}
+    l2_keys = []
+    for key in dict.fromkeys(keys):
+        value = l1_cache.get(key)
+        if value is not None:
+            _count("l1_hits")
+            found[key] = value
+        else:
+            _count("l1_misses")
+            l2_keys.append(key)
+    return found, l2_keys
+
+def _decode_many(found: dict, l2_keys: list[str], cached_values: list, ttls_ms: list) -> dict:
+    """Decodes an MGET result into `found` and fills the L1 cache."""
+    l2_hits = 0
+    for key, cached_value, ttl_ms in zip(l2_keys, cached_values, ttls_ms):
+        if not cached_value:
+            _count("l2_misses")
+            continue
+        try:
+            value = deserialize_value(cached_value)
+        except ValueError as e:
+            logger.warning("Cache Error: Could not deserialize cached value for key '%s' - %s", key, e)
+            continue
+        _count("l2_hits")
+        l2_hits += 1
+        found[key] = value
+        if ttl_ms and ttl_ms > 0:
+            l1_cache.set(key, value, min(ttl_ms / 1000, L1_CACHE_TTL_SECONDS), len(cached_value))
+
+    logger.debug("Batch cache lookup: %s hits, %s misses", len(found), len(l2_keys) - l2_hits)
+    return found
+
+def _serialize_many(values: dict, expiration_seconds: int, ttls: dict | None) -> tuple[dict, dict]:
+    """Serializes values for a batch write and fills the L1 cache. Returns (serialized, expirations)."""
+    serialized = {}
+    expirations = {}
+    for key, value in values.items():
+        try:
+            serialized[key] = serialize_value(value)
+        except TypeError as e:
+            logger.warning("TypeError: Could not serialize value for key '%s' - %s", key, e)
+            continue
+        expirations[key] = (ttls or {}).get(key, expiration_seconds)
+        l1_cache.set(key, value, min(expirations[key], L1_CACHE_TTL_SECONDS), len(serialized[key]))
+    return serialized, expirations
+
+def get_cache_many(redis_client: redis.StrictRedis, keys: list[str]) -> dict:
+    """
+    Gets several values at once: L1 first, then a single Redis round trip
+    (MGET plus PTTLs in one pipeline) for the rest.
+
+    Returns a dict containing only the keys that were found.
+    """
+    found, l2_keys = _l1_get_many(keys)
+    if not l2_keys:
+        return found
+    if not redis_client:
+        logger.debug("Redis client not available (from app state). Skipping cache get.")
+        return found
+
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.mget(l2_keys)
+        for key in l2_keys:
+            pipe.pttl(key)
+        with REDIS_DURATION.labels("get_many").time():
+            cached_values, *ttls_ms = pipe.execute()
+    except redis.exceptions.RedisError as e:
+        _count("l2_errors")
+        logger.warning("Redis Error: Failed to get cache for %s keys - %s", len(l2_keys), e)
+        return found
+
+    return _decode_many(found, l2_keys, cached_values, ttls_ms)
+
+async def aget_cache_many(redis_client: redis.asyncio.Redis, keys: list[str]) -> dict:
+    """Async version of get_cache_many for request handlers."""
+    found, l2_keys = _l1_get_many(keys)
+    if not l2_keys:
+        return found
+    if not redis_client:
+        logger.debug("Redis client not available (from app state). Skipping cache get.")
+        return found
+
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.mget(l2_keys)
+            for key in l2_keys:
+                pipe.pttl(key)
+            with REDIS_DURATION.labels("get_many").time():
+                cached_values, *ttls_ms = await pipe.execute()
+    except redis.exceptions.RedisError as e:
+        _count("l2_errors")
+        logger.warning("Redis Error: Failed to get cache for %s keys - %s", len(l2_keys), e)
+        return found
+
+    return _decode_many(found, l2_keys, cached_values, ttls_ms)
+
+def set_cache_many(redis_client: redis.StrictRedis, values: dict, expiration_seconds: int = CACHE_TTL_SECONDS,
+                   ttls: dict | None = None) -> bool:
+    """
+    Sets several values in the L1 cache and in Redis with one pipelined SETEX batch.
+
+    `ttls` optionally overrides expiration_seconds per key.
+    """
+    if not values:
+        return True
+
+    serialized, expirations = _serialize_many(values, expiration_seconds, ttls)
+    if not redis_client:
+        logger.debug("Redis client not available (from app state). Skipping cache set.")
+        return False
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for key, serialized_value in serialized.items():
+            pipe.setex(key, expirations[key], serialized_value)
+        with REDIS_DURATION.labels("set_many").time():
+            pipe.execute()
+        logger.debug("Cached %s keys in Redis", len(serialized))
+        return True
+    except redis.exceptions.RedisError as e:
+        logger.warning("Redis Error: Failed to set cache for %s keys - %s", len(serialized), e)
+        return False
+
+async def aset_cache_many(redis_client: redis.asyncio.Redis, values: dict, expiration_seconds: int = CACHE_TTL_SECONDS,
+                          ttls: dict | None = None) -> bool:
+    """Async version of set_cache_many for request handlers."""
+    if not values:
+        return True
+
+    serialized, expirations = _serialize_many(values, expiration_seconds, ttls)
+    if not redis_client:
+        logger.debug("Redis client not available (from app state). Skipping cache set.")
+        return False
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for key, serialized_value in serialized.items():
+                pipe.setex(key, expirations[key], serialized_value)
+            with REDIS_DURATION.labels("set_many").time():
+                await pipe.execute()
+        logger.debug("Cached %s keys in Redis", len(serialized))
+        return True
+    except redis.exceptions.RedisError as e:
+        logger.warning("Redis Error: Failed to set cache for %s keys - %s", len(serialized), e)
+        return False
+
+# --- Query Popularity (feeds the cache warmer) ---
+POPULARITY_KEY = "stats:myntra:popularity" # Sorted set: search query -> request count
+POPULARITY_MAX_TRACKED = int(os.getenv("POPULARITY_MAX_TRACKED", 5000))
+CACHE_WARMING_ENABLED = os.getenv("CACHE_WARMING_ENABLED", "false").lower() == "true" # Popularity is only tracked for the warmer
+
+def record_query_popularity(redis_client: redis.StrictRedis, search_queries: list[str]):
+    """Counts one request for each search query (pipelined ZINCRBY). No-op while cache warming is off."""
+    if not CACHE_WARMING_ENABLED or not redis_client or not search_queries:
+        return
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for search_query in set(search_queries):
+            pipe.zincrby(POPULARITY_KEY, 1, search_query)
+        pipe.execute()
+    except redis.exceptions.RedisError as e:
+        logger.warning("Redis Error: Failed to record query popularity - %s", e)
+
+async def arecord_query_popularity(redis_client: redis.asyncio.Redis, search_queries: list[str]):
+    """Async version of record_query_popularity for request handlers."""
+    if not CACHE_WARMING_ENABLED or not redis_client or not search_queries:
+        return
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for search_query in set(search_queries):
+                pipe.zincrby(POPULARITY_KEY, 1, search_query)
+            await pipe.execute()
+    except redis.exceptions.RedisError as e:
+        logger.warning("Redis Error: Failed to record query popularity - %s", e)
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import os
+import time
+import redis
+from . import background_tasks
+from .background_tasks import build_search_query, cache_key_for
+from .cache import get_cache_many, arecord_query_popularity, CACHE_TTL_SECONDS, POPULARITY_KEY, POPULARITY_MAX_TRACKED
+from .cache import CACHE_WARMING_ENABLED # Defined with the popularity tracking it gates
+
+logger = logging.getLogger(__name__)
+
+# --- Cache Warming Configuration ---
+CACHE_WARM_INTERVAL_SECONDS = int(os.getenv("CACHE_WARM_INTERVAL_SECONDS", 300)) # How often the scheduler runs
+CACHE_WARM_TOP_N = int(os.getenv("CACHE_WARM_TOP_N", 100)) # Most requested queries kept warm
+CACHE_WARM_LEAD_SECONDS = int(os.getenv("CACHE_WARM_LEAD_SECONDS", 600)) # Refresh this long before the soft TTL
+CACHE_WARM_CONCURRENCY = int(os.getenv("CACHE_WARM_CONCURRENCY", 2)) # Parallel warming scrapes
+CACHE_WARM_MAX_PER_CYCLE = int(os.getenv("CACHE_WARM_MAX_PER_CYCLE", 50)) # Scrapes per warming cycle (startup seeding is uncapped)
+CACHE_WARM_SEED_ON_STARTUP = os.getenv("CACHE_WARM_SEED_ON_STARTUP", "true").lower() == "true"
+
+# Common combinations pre-seeded at startup (comma-separated env overrides)
+CACHE_WARM_SEED_CLOTHING_TYPES = os.getenv("CACHE_WARM_SEED_CLOTHING_TYPES", "T-shirt,Shirt,Jeans,Trousers,Sneakers,Dress,Kurta,Jacket").split(",")
+CACHE_WARM_SEED_COLORS = os.getenv("CACHE_WARM_SEED_COLORS", "White,Black,Blue,Navy Blue,Grey,Beige").split(",")
+CACHE_WARM_SEED_GENDERS = os.getenv("CACHE_WARM_SEED_GENDERS", "men,women").split(",")
+
+# Only one pod warms per cycle
+WARMER_LOCK_KEY = "lock:cache-warmer"
+
+# Keep references to fire-and-forget popularity updates so they aren't garbage collected
+_pending_updates = set()
+
+def track_query_popularity(async_redis_client, search_queries):
+    """Records popularity in the background without delaying the response (skipped while warming is off)."""
+    if not CACHE_WARMING_ENABLED:
+        return
+    task = asyncio.create_task(arecord_query_popularity(async_redis_client, search_queries))
+    _pending_updates.add(task)
+    task.add_done_callback(_pending_updates.discard)
+
+def seed_queries():
+    """Clothing type x color x gender combinations to pre-seed at startup."""
+    return list(dict.fromkeys(
+        build_search_query(clothing_type.strip(), color.strip(), gender.strip())
+        for clothing_type in CACHE_WARM_SEED_CLOTHING_TYPES
+        for color in CACHE_WARM_SEED_COLORS
+        for gender in CACHE_WARM_SEED_GENDERS
+    ))
+
+def _needs_warming(cached, now):
+    """True if a query is missing from the cache or its entry is close to going stale."""
+    if cached is None:
+        return True
+    if not isinstance(cached, dict) or cached.get("status") != background_tasks.FETCH_OK:
+        return False # Legacy entries and negative/failed entries expire on their own
+    return now - cached.get("fetched_at", 0) > CACHE_TTL_SECONDS - CACHE_WARM_LEAD_SECONDS
+
+class CacheWarmer:
+    """
+    Background scheduler keeping popular queries warm.
+
+    Every CACHE_WARM_INTERVAL_SECONDS it re-scrapes the top-N requested queries
+    whose entries are missing or about to go stale. On startup it can also
+    pre-seed common clothing type x color x gender combinations.
+    """
+
+    def __init__(self, interval: int = CACHE_WARM_INTERVAL_SECONDS, top_n: int = CACHE_WARM_TOP_N,
+                 concurrency: int = CACHE_WARM_CONCURRENCY, max_per_cycle: int = CACHE_WARM_MAX_PER_CYCLE,
+                 seed_on_startup: bool = CACHE_WARM_SEED_ON_STARTUP):
+        self.interval = interval
+        self.top_n = top_n
+        self.concurrency = concurrency
+        self.max_per_cycle = max_per_cycle
+        self.seed_on_startup = seed_on_startup
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+        logger.info("Cache warmer started (every %ss, top %s queries)", self.interval, self.top_n)
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            logger.info("Cache warmer stopped.")
+
+    async def _run(self):
+        if self.seed_on_startup:
+            try:
+                seeds = seed_queries()
+                await self.warm(seeds, max_scrapes=len(seeds))
+            except Exception as e:
+                logger.warning("Cache seeding failed: %s", e)
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.warm(await asyncio.to_thread(self.top_queries))
+            except Exception as e:
+                logger.warning("Cache warming cycle failed: %s", e)
+
+    def top_queries(self):
+        """Most requested search queries, trimming the tracked set to POPULARITY_MAX_TRACKED."""
+        redis_client = background_tasks.redis_client
+        if not redis_client:
+            return []
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.zrevrange(POPULARITY_KEY, 0, self.top_n - 1)
+            pipe.zremrangebyrank(POPULARITY_KEY, 0, -POPULARITY_MAX_TRACKED - 1)
+            queries, _ = pipe.execute()
+            return [q.decode("utf-8") if isinstance(q, bytes) else q for q in queries]
+        except redis.exceptions.RedisError as e:
+            logger.warning("Redis Error: Failed to read query popularity - %s", e)
+            return []
+
+    def _acquire_cycle_lock(self):
+        """Lets only one pod warm per interval. Without Redis every process warms its own L1."""
+        redis_client = background_tasks.redis_client
+        if not redis_client:
+            return True
+        try:
+            return bool(redis_client.set(WARMER_LOCK_KEY, "1", nx=True, ex=max(1, self.interval - 1)))
+        except redis.exceptions.RedisError:
+            return False
+
+    async def warm(self, search_queries, max_scrapes: int | None = None):
+        """
+        Scrapes the given queries that are missing or close to expiry, up to max_scrapes of them.
+
+        max_scrapes defaults to max_per_cycle; startup seeding passes the whole seed set.
+        Either way at most `concurrency` scrapes run at once.
+        """
+        if max_scrapes is None:
+            max_scrapes = self.max_per_cycle
+        if not search_queries or not await asyncio.to_thread(self._acquire_cycle_lock):
+            return 0
+
+        cached = await asyncio.to_thread(
+            get_cache_many, background_tasks.redis_client, [cache_key_for(q) for q in search_queries]
+        )
+        now = time.time()
+        due = [q for q in search_queries if _needs_warming(cached.get(cache_key_for(q)), now)][:max_scrapes]
+        if not due:
+            return 0
+
+        semaphore = asyncio.Semaphore(max(1, self.concurrency))
+
+        async def refresh(search_query):
+            async with semaphore:
+                return await asyncio.to_thread(background_tasks.refresh_query, search_query)
+
+        refreshed = await asyncio.gather(*(refresh(q) for q in due), return_exceptions=True)
+        warmed = sum(1 for ok in refreshed if ok is True)
+        logger.info("Cache warmer refreshed %s/%s queries", warmed, len(due))
+        return warmed
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import os
+import time
+from . import background_tasks
+from .background_tasks import build_search_query
+from .catalog_index import catalog_index
+
+logger = logging.getLogger(__name__)
+
+# --- Catalog Crawler Configuration ---
+CATALOG_CRAWLER_ENABLED = os.getenv("CATALOG_CRAWLER_ENABLED", "false").lower() == "true"
+CATALOG_CRAWL_INTERVAL_SECONDS = int(os.getenv("CATALOG_CRAWL_INTERVAL_SECONDS", 600)) # How often the crawler runs
+CATALOG_CRAWL_BATCH_SIZE = int(os.getenv("CATALOG_CRAWL_BATCH_SIZE", 30)) # Queries scraped per cycle
+CATALOG_CRAWL_CONCURRENCY = int(os.getenv("CATALOG_CRAWL_CONCURRENCY", 1)) # Parallel crawl scrapes
+CATALOG_CRAWL_RESULTS = int(os.getenv("CATALOG_CRAWL_RESULTS", 20)) # Products stored per crawled query
+CATALOG_REFRESH_AGE_SECONDS = int(os.getenv("CATALOG_REFRESH_AGE_SECONDS", 86400)) # Re-crawl queries older than this
+CATALOG_CRAWL_RETRY_SECONDS = int(os.getenv("CATALOG_CRAWL_RETRY_SECONDS", 3600)) # Wait before retrying a failed query
+
+# The recommendation space crawled into the index (comma-separated env overrides)
+CATALOG_CRAWL_CLOTHING_TYPES = os.getenv(
+    "CATALOG_CRAWL_CLOTHING_TYPES",
+    "T-shirt,Shirt,Polo T-shirt,Jeans,Trousers,Shorts,Sweatshirt,Sweater,Jacket,Blazer,Kurta,Dress,Top,Skirt,"
+    "Sneakers,Shoes,Sandals,Heels,Boots,Loafers"
+).split(",")
+CATALOG_CRAWL_COLORS = os.getenv(
+    "CATALOG_CRAWL_COLORS", "White,Black,Blue,Navy Blue,Grey,Beige,Brown,Green,Olive,Red,Maroon,Pink,Yellow,Cream"
+).split(",")
+CATALOG_CRAWL_GENDERS = os.getenv("CATALOG_CRAWL_GENDERS", "men,women").split(",")
+
+# Scrape outcomes that mean Myntra (or our own rate limiter) is pushing back: end the cycle instead of crawling on
+_STOP_STATUSES = (background_tasks.FETCH_BLOCKED, background_tasks.FETCH_CAPTCHA, background_tasks.FETCH_UNAVAILABLE,
+                  background_tasks.FETCH_THROTTLED)
+
+def crawl_queries():
+    """Clothing type x color x gender combinations kept in the catalog index."""
+    return list(dict.fromkeys(
+        build_search_query(clothing_type.strip(), color.strip(), gender.strip())
+        for clothing_type in CATALOG_CRAWL_CLOTHING_TYPES
+        for color in CATALOG_CRAWL_COLORS
+        for gender in CATALOG_CRAWL_GENDERS
+    ))
+
+class CatalogCrawler:
+    """
+    Background crawler filling the local catalog index (utils.catalog_index).
+
+    Every CATALOG_CRAWL_INTERVAL_SECONDS it scrapes up to batch_size of the
+    crawled combinations that were never fetched or are older than
+    refresh_age_seconds, oldest first, so the index is refreshed incrementally
+    instead of in one burst. Scrapes go through the usual rate limiter and
+    circuit breaker; a block or captcha ends the cycle early.
+    """
+
+    def __init__(self, interval: int = CATALOG_CRAWL_INTERVAL_SECONDS, batch_size: int = CATALOG_CRAWL_BATCH_SIZE,
+                 concurrency: int = CATALOG_CRAWL_CONCURRENCY, num_results: int = CATALOG_CRAWL_RESULTS,
+                 refresh_age_seconds: int = CATALOG_REFRESH_AGE_SECONDS):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.num_results = num_results
+        self.refresh_age_seconds = refresh_age_seconds
+        self.last_cycle = None
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+        logger.info("Catalog crawler started (every %ss, %s queries per cycle)", self.interval, self.batch_size)
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            logger.info("Catalog crawler stopped.")
+
+    async def _run(self):
+        await asyncio.to_thread(catalog_index.add_crawl_queries, crawl_queries())
+        while True:
+            try:
+                await self.crawl()
+                await asyncio.to_thread(catalog_index.prune)
+            except Exception as e:
+                logger.warning("Catalog crawl cycle failed: %s", e)
+            await asyncio.sleep(self.interval)
+
+    def _crawl_query(self, search_query):
+        products, status = background_tasks.fetch_myntra_products_with_status(search_query, self.num_results)
+        if status in (background_tasks.FETCH_OK, background_tasks.FETCH_EMPTY):
+            catalog_index.record(search_query, products)
+        return status
+
+    async def crawl(self):
+        """Scrapes the next due queries into the index. Returns the number refreshed."""
+        due = await asyncio.to_thread(
+            catalog_index.claim_due_queries, self.batch_size, self.refresh_age_seconds, CATALOG_CRAWL_RETRY_SECONDS
+        )
+        if not due:
+            return 0
+
+        started = time.time()
+        semaphore = asyncio.Semaphore(max(1, self.concurrency))
+        stopped = asyncio.Event()
+
+        async def crawl_one(search_query):
+            async with semaphore:
+                if stopped.is_set():
+                    return None
+                status = await asyncio.to_thread(self._crawl_query, search_query)
+                if status in _STOP_STATUSES:
+                    stopped.set()
+                return status
+
+        statuses = await asyncio.gather(*(crawl_one(q) for q in due), return_exceptions=True)
+        refreshed = sum(1 for s in statuses if s in (background_tasks.FETCH_OK, background_tasks.FETCH_EMPTY))
+        self.last_cycle = {"started_at": started, "due": len(due), "refreshed": refreshed, "stopped_early": stopped.is_set()}
+        logger.info("Catalog crawler refreshed %s/%s queries%s", refreshed, len(due),
+                    " (stopped early: Myntra is blocking)" if stopped.is_set() else "")
+        return refreshed
+
+    def stats(self) -> dict:
+        return {"interval_seconds": self.interval, "batch_size": self.batch_size, "last_cycle": self.last_cycle}
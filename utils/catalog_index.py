@@ -0,0 +1,401 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from .metrics import CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+# --- Local Catalog Index ---
+# Scraped products are kept in a local SQLite database (one file per host, shared by its workers)
+# so cache misses for known clothing type x color x gender combinations skip the live scrape.
+CATALOG_INDEX_ENABLED = os.getenv("CATALOG_INDEX_ENABLED", "false").lower() == "true"
+CATALOG_DB_PATH = os.getenv("CATALOG_DB_PATH", "/tmp/myntra-catalog.sqlite3")
+CATALOG_MAX_AGE_SECONDS = int(os.getenv("CATALOG_MAX_AGE_SECONDS", 3 * 86400)) # Products older than this are not served
+CATALOG_RETENTION_SECONDS = int(os.getenv("CATALOG_RETENTION_SECONDS", 14 * 86400)) # Uncrawled queries are pruned after this
+CATALOG_MAX_PRODUCTS_PER_QUERY = int(os.getenv("CATALOG_MAX_PRODUCTS_PER_QUERY", 50))
+
+# Words of a search query that don't have to appear in a matching product
+_STOPWORDS = {"for", "and", "with", "the"}
+_WORD = re.compile(r"\S+")
+_TOKEN = re.compile(r"[0-9a-z]+")
+
+# Column weights for bm25(): product name, brand, search query the product was found for
+_BM25_WEIGHTS = (4.0, 1.0, 2.0)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    product_key TEXT PRIMARY KEY,
+    product_id,
+    name TEXT NOT NULL,
+    brand TEXT,
+    price,
+    image_url TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS queries (
+    query TEXT PRIMARY KEY,
+    product_count INTEGER NOT NULL DEFAULT 0,
+    fetched_at REAL,
+    attempted_at REAL,
+    crawl INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS queries_crawl_due ON queries (crawl, fetched_at);
+CREATE TABLE IF NOT EXISTS query_products (
+    id INTEGER PRIMARY KEY,
+    query TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    product_key TEXT NOT NULL,
+    UNIQUE (query, position)
+);
+CREATE INDEX IF NOT EXISTS query_products_product ON query_products (product_key);
+"""
+
+# One full-text row per (query, product), so every term of a match has to occur
+# in the product's name/brand or in a single query it was found for
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS catalog_fts USING fts5(name, brand, query);
+CREATE TRIGGER IF NOT EXISTS query_products_ai AFTER INSERT ON query_products BEGIN
+    INSERT INTO catalog_fts (rowid, name, brand, query)
+    SELECT new.id, name, coalesce(brand, ''), new.query FROM products WHERE product_key = new.product_key;
+END;
+CREATE TRIGGER IF NOT EXISTS query_products_ad AFTER DELETE ON query_products BEGIN
+    DELETE FROM catalog_fts WHERE rowid = old.id;
+END;
+"""
+
+def match_expression(search_query: str) -> str | None:
+    """
+    FTS5 query requiring every word of a search query, e.g. "white t-shirt for men"
+    -> '"white" "t shirt" "men"'. None if the query has no searchable words.
+    """
+    phrases = []
+    for word in _WORD.findall(search_query.lower()):
+        tokens = _TOKEN.findall(word)
+        if tokens and word not in _STOPWORDS:
+            phrases.append('"' + " ".join(tokens) + '"')
+    return " ".join(dict.fromkeys(phrases)) or None
+
+def product_key(product: dict) -> str:
+    """Stable identity of a scraped product: its Myntra id, else its image URL."""
+    if product.get("product_id") is not None:
+        return f"id:{product['product_id']}"
+    return f"img:{product['image_url']}"
+
+def _product_from_row(row) -> dict:
+    return {"name": row["name"], "image_url": row["image_url"], "brand": row["brand"],
+            "price": row["price"], "product_id": row["product_id"]}
+
+class CatalogIndex:
+    """
+    Local product catalog answering search queries without scraping.
+
+    Every successful scrape (live or by utils.catalog_crawler) is recorded with
+    its fetch time. A lookup first serves the exact query if it was fetched
+    within max_age_seconds, with whatever products it had ("no results"
+    included). Only queries never fetched (or fetched too long ago) fall back
+    to a full-text match ranked by bm25 over product names, brands and the
+    queries products were found for.
+
+    Lookups return the fetch time so callers can refresh old results the way
+    they refresh stale cache entries. Off unless CATALOG_INDEX_ENABLED is set,
+    since every live scrape then also writes to the database.
+
+    Each thread gets its own connection; the database runs in WAL mode so
+    lookups never wait for the crawler's writes. Any SQLite error disables
+    nothing but the failing call: callers just scrape as before.
+    """
+
+    def __init__(self, path: str = CATALOG_DB_PATH, enabled: bool = CATALOG_INDEX_ENABLED,
+                 max_age_seconds: int = CATALOG_MAX_AGE_SECONDS, retention_seconds: int = CATALOG_RETENTION_SECONDS):
+        self.path = path
+        self.enabled = enabled
+        self.max_age_seconds = max_age_seconds
+        self.retention_seconds = retention_seconds
+        self.fts_enabled = False
+        self._initialized = False
+        self._init_lock = threading.Lock()
+        self._local = threading.local()
+        self._connections = []
+        self._stats = {"exact_hits": 0, "match_hits": 0, "misses": 0, "errors": 0}
+        self._stats_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode; writes open their own transactions
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _init_schema(self):
+        """Creates the tables on first use. Disables the index if the database can't be opened."""
+        with self._init_lock:
+            if self._initialized:
+                return
+            self._initialized = True
+            try:
+                connection = self._connect()
+                try:
+                    connection.executescript(_SCHEMA)
+                    try:
+                        connection.executescript(_FTS_SCHEMA)
+                        self.fts_enabled = True
+                    except sqlite3.OperationalError as e:
+                        logger.warning("SQLite FTS5 unavailable (%s); catalog index serves exact queries only", e)
+                finally:
+                    connection.close()
+                logger.info("Catalog index at %s (full-text search: %s)", self.path, self.fts_enabled)
+            except (sqlite3.Error, OSError) as e:
+                logger.warning("Catalog index disabled: cannot open %s - %s", self.path, e)
+                self.enabled = False
+
+    def _connection(self) -> sqlite3.Connection | None:
+        if not self.enabled:
+            return None
+        if not self._initialized:
+            self._init_schema()
+            if not self.enabled:
+                return None
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._connect()
+            self._local.connection = connection
+            with self._init_lock:
+                self._connections.append(connection)
+        return connection
+
+    def _count(self, stat: str):
+        with self._stats_lock:
+            self._stats[stat] += 1
+        if stat != "errors":
+            CACHE_LOOKUPS.labels("catalog", "miss" if stat == "misses" else "hit").inc()
+
+    # --- Lookups ---
+
+    def lookup(self, search_query: str, num_results: int = 2) -> tuple[list[dict], float] | None:
+        """
+        (products, fetched_at) for a search query, or None if the index can't answer it well enough.
+
+        fetched_at is when the products were scraped (the oldest of them for a full-text match).
+        """
+        return self.lookup_many([search_query], num_results).get(search_query)
+
+    def lookup_many(self, search_queries: list[str], num_results: int = 2) -> dict[str, tuple[list[dict], float]]:
+        """Looks up several search queries. Returns (products, fetched_at) for the ones the index can answer."""
+        connection = self._connection()
+        if connection is None:
+            return {}
+        cutoff = time.time() - self.max_age_seconds
+        found = {}
+        try:
+            for search_query in search_queries:
+                products = self._exact(connection, search_query, num_results, cutoff)
+                if products is not None:
+                    self._count("exact_hits")
+                else:
+                    products = self._match(connection, search_query, num_results, cutoff)
+                    self._count("match_hits" if products is not None else "misses")
+                if products is not None:
+                    found[search_query] = products
+        except sqlite3.Error as e:
+            self._count("errors")
+            logger.warning("Catalog index lookup failed - %s", e)
+        return found
+
+    def _exact(self, connection, search_query, num_results, cutoff):
+        # A fresh row is authoritative even with fewer products (or none): Myntra had no more for this query
+        query_row = connection.execute(
+            "SELECT fetched_at FROM queries WHERE query = ? AND fetched_at >= ?", (search_query, cutoff)
+        ).fetchone()
+        if query_row is None:
+            return None
+        rows = connection.execute(
+            "SELECT p.* FROM query_products qp JOIN products p ON p.product_key = qp.product_key "
+            "WHERE qp.query = ? ORDER BY qp.position LIMIT ?",
+            (search_query, num_results),
+        ).fetchall()
+        return [_product_from_row(row) for row in rows], query_row["fetched_at"]
+
+    def _match(self, connection, search_query, num_results, cutoff):
+        expression = match_expression(search_query) if self.fts_enabled else None
+        if expression is None:
+            return None
+        # A product can match through several queries; fetch extra rows and keep its best one
+        rows = connection.execute(
+            "SELECT p.*, q.fetched_at AS query_fetched_at FROM catalog_fts f JOIN query_products qp ON qp.id = f.rowid "
+            "JOIN queries q ON q.query = qp.query JOIN products p ON p.product_key = qp.product_key "
+            "WHERE catalog_fts MATCH ? AND q.fetched_at >= ? "
+            "ORDER BY bm25(catalog_fts, ?, ?, ?), qp.position LIMIT ?",
+            (expression, cutoff, *_BM25_WEIGHTS, num_results * 4),
+        ).fetchall()
+        best_rows = {}
+        for row in rows:
+            best_rows.setdefault(row["product_key"], row)
+        if len(best_rows) < num_results:
+            return None
+        best_rows = list(best_rows.values())[:num_results]
+        return [_product_from_row(row) for row in best_rows], min(row["query_fetched_at"] for row in best_rows)
+
+    # --- Updates ---
+
+    def record(self, search_query: str, products: list[dict], fetched_at: float | None = None):
+        """
+        Stores the result of a successful scrape (an empty list for "no results").
+
+        Products previously stored for the query but missing from a shorter result
+        (a live scrape asks for fewer products than the crawler) are kept after the new ones.
+        """
+        connection = self._connection()
+        if connection is None:
+            return
+        fetched_at = fetched_at or time.time()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._record(connection, search_query, products, fetched_at)
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            self._count("errors")
+            logger.warning("Catalog index update for '%s' failed - %s", search_query, e)
+
+    def _record(self, connection, search_query, products, fetched_at):
+        new_keys = []
+        for product in products[:CATALOG_MAX_PRODUCTS_PER_QUERY]:
+            key = product_key(product)
+            if key in new_keys:
+                continue
+            new_keys.append(key)
+            connection.execute(
+                "INSERT INTO products (product_key, product_id, name, brand, price, image_url, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (product_key) DO UPDATE SET "
+                "name = excluded.name, brand = excluded.brand, price = excluded.price, "
+                "image_url = excluded.image_url, fetched_at = excluded.fetched_at",
+                (key, product.get("product_id"), product["name"], product.get("brand"), product.get("price"),
+                 product["image_url"], fetched_at),
+            )
+
+        keys = new_keys
+        if new_keys:
+            previous = [row[0] for row in connection.execute(
+                "SELECT product_key FROM query_products WHERE query = ? ORDER BY position", (search_query,))]
+            keys = (new_keys + [key for key in previous if key not in new_keys])[:max(len(new_keys), len(previous))]
+
+        connection.execute("DELETE FROM query_products WHERE query = ?", (search_query,))
+        connection.executemany(
+            "INSERT INTO query_products (query, position, product_key) VALUES (?, ?, ?)",
+            [(search_query, position, key) for position, key in enumerate(keys)],
+        )
+        connection.execute(
+            "INSERT INTO queries (query, product_count, fetched_at, attempted_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (query) DO UPDATE SET product_count = excluded.product_count, "
+            "fetched_at = excluded.fetched_at, attempted_at = excluded.attempted_at",
+            (search_query, len(keys), fetched_at, fetched_at),
+        )
+
+    def add_crawl_queries(self, search_queries: list[str]):
+        """Marks queries for the background crawler (adding them if they're new)."""
+        connection = self._connection()
+        if connection is None:
+            return
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.executemany(
+                "INSERT INTO queries (query, crawl) VALUES (?, 1) ON CONFLICT (query) DO UPDATE SET crawl = 1",
+                [(q,) for q in search_queries],
+            )
+            connection.execute("COMMIT")
+        except sqlite3.Error as e:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            logger.warning("Catalog index: failed to add crawl queries - %s", e)
+
+    def claim_due_queries(self, limit: int, refresh_age_seconds: int, retry_seconds: int) -> list[str]:
+        """
+        Crawl queries never fetched or older than refresh_age_seconds, oldest first.
+
+        Claimed queries get their attempt time set, so other workers sharing the
+        database skip them for retry_seconds (also the back-off after a failed crawl).
+        """
+        connection = self._connection()
+        if connection is None or limit <= 0:
+            return []
+        now = time.time()
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                due = [row[0] for row in connection.execute(
+                    "SELECT query FROM queries WHERE crawl = 1 "
+                    "AND (fetched_at IS NULL OR fetched_at < ?) AND (attempted_at IS NULL OR attempted_at < ?) "
+                    "ORDER BY coalesce(fetched_at, 0), coalesce(attempted_at, 0) LIMIT ?",
+                    (now - refresh_age_seconds, now - retry_seconds, limit),
+                )]
+                connection.executemany("UPDATE queries SET attempted_at = ? WHERE query = ?", [(now, q) for q in due])
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            return due
+        except sqlite3.Error as e:
+            logger.warning("Catalog index: failed to claim crawl queries - %s", e)
+            return []
+
+    def prune(self) -> int:
+        """Drops uncrawled queries not fetched within retention_seconds and products no query refers to."""
+        connection = self._connection()
+        if connection is None:
+            return 0
+        cutoff = time.time() - self.retention_seconds
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute(
+                "DELETE FROM query_products WHERE query IN "
+                "(SELECT query FROM queries WHERE crawl = 0 AND fetched_at < ?)", (cutoff,))
+            pruned = connection.execute("DELETE FROM queries WHERE crawl = 0 AND fetched_at < ?", (cutoff,)).rowcount
+            connection.execute(
+                "DELETE FROM products WHERE product_key NOT IN (SELECT product_key FROM query_products)")
+            connection.execute("COMMIT")
+            return pruned
+        except sqlite3.Error as e:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            logger.warning("Catalog index: pruning failed - %s", e)
+            return 0
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stats = {"enabled": self.enabled, "full_text_search": self.fts_enabled, **self._stats}
+        connection = self._connection()
+        if connection is None:
+            return stats
+        cutoff = time.time() - self.max_age_seconds
+        try:
+            row = connection.execute(
+                "SELECT count(*), count(fetched_at >= ? OR NULL), count(crawl = 1 OR NULL), min(fetched_at) FROM queries",
+                (cutoff,),
+            ).fetchone()
+            stats.update({
+                "queries": row[0], "fresh_queries": row[1], "crawl_queries": row[2],
+                "oldest_fetch_age_seconds": round(time.time() - row[3]) if row[3] else None,
+                "products": connection.execute("SELECT count(*) FROM products").fetchone()[0],
+            })
+        except sqlite3.Error as e:
+            logger.warning("Catalog index: failed to read stats - %s", e)
+        return stats
+
+    def close(self):
+        with self._init_lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            try:
+                connection.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+catalog_index = CatalogIndex()
@@ -0,0 +1,94 @@
+import logging
+import os
+import threading
+import time
+
+# --- Circuit Breaker Configuration ---
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", 5)) # Consecutive failures before opening
+CIRCUIT_BREAKER_TIMEOUT_DURATION = float(os.getenv("CIRCUIT_BREAKER_TIMEOUT_DURATION", 300)) # Seconds open before probing
+CIRCUIT_BREAKER_HALF_OPEN_PROBES = int(os.getenv("CIRCUIT_BREAKER_HALF_OPEN_PROBES", 1)) # Concurrent probe requests when half-open
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker.
+
+    Closed: every call is allowed; `failure_threshold` consecutive failures open it.
+    Open: calls are rejected until `reset_timeout` seconds have passed.
+    Half-open: up to `half_open_probes` calls at a time are let through as probes;
+    a successful probe closes the circuit, a failed one opens it again.
+
+    Callers must report the outcome of every allowed call with record().
+    """
+
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = CIRCUIT_BREAKER_TIMEOUT_DURATION,
+                 half_open_probes: int = CIRCUIT_BREAKER_HALF_OPEN_PROBES):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = max(1, half_open_probes)
+        self._state = CIRCUIT_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == CIRCUIT_OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = CIRCUIT_HALF_OPEN
+            self._probes_in_flight = 0
+            logger.info("Circuit '%s' half-open: probing for recovery", self.name)
+        return self._state
+
+    def allow_request(self) -> bool:
+        """True if a call may go ahead (in half-open state this takes a probe slot)."""
+        with self._lock:
+            state = self._current_state()
+            if state == CIRCUIT_CLOSED:
+                return True
+            if state == CIRCUIT_HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+                self._probes_in_flight += 1
+                return True
+            return False
+
+    def record(self, failed: bool):
+        """Reports the outcome of an allowed call."""
+        with self._lock:
+            state = self._current_state()
+            if state == CIRCUIT_HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            if not failed:
+                if state != CIRCUIT_CLOSED:
+                    logger.info("Circuit '%s' closed: upstream recovered", self.name)
+                self._state = CIRCUIT_CLOSED
+                self._failures = 0
+                return
+            self._failures += 1
+            if state == CIRCUIT_HALF_OPEN or (state == CIRCUIT_CLOSED and self._failures >= self.failure_threshold):
+                self._state = CIRCUIT_OPEN
+                self._opened_at = time.monotonic()
+                logger.warning("Circuit '%s' open after %d consecutive failures; skipping live calls for %.0fs",
+                               self.name, self._failures, self.reset_timeout)
+
+    def release(self):
+        """Gives back an allowed call that never reached upstream, without counting it as a success or failure."""
+        with self._lock:
+            if self._current_state() == CIRCUIT_HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            state = self._current_state()
+            retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at)) if state == CIRCUIT_OPEN else 0.0
+            return {"state": state, "consecutive_failures": self._failures, "retry_in_seconds": round(retry_in, 1)}
@@ -0,0 +1,226 @@
+import contextlib
+import fcntl
+import gzip
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from .logging_config import get_request_id
+from .myntra_parser import detect_failure_mode
+
+logger = logging.getLogger(__name__)
+
+# --- Debug Capture Configuration ---
+DEBUG_CAPTURE_ENABLED = os.getenv("DEBUG_CAPTURE_ENABLED", "true").lower() == "true"
+DEBUG_CAPTURE_DIR = os.getenv("DEBUG_CAPTURE_DIR", "/tmp/myntra-debug")
+DEBUG_CAPTURE_SAMPLE_RATE = float(os.getenv("DEBUG_CAPTURE_SAMPLE_RATE", 0.2)) # Share of failed pages captured
+DEBUG_CAPTURE_MAX_BYTES = int(os.getenv("DEBUG_CAPTURE_MAX_BYTES", 50 * 1024 * 1024)) # Compressed total; oldest are rotated out
+DEBUG_CAPTURE_MAX_PAGE_CHARS = int(os.getenv("DEBUG_CAPTURE_MAX_PAGE_CHARS", 512 * 1024)) # Pages are truncated to this
+DEBUG_CAPTURE_QUEUE_SIZE = int(os.getenv("DEBUG_CAPTURE_QUEUE_SIZE", 100)) # Captures beyond this are dropped
+
+# Failure modes captures are indexed by
+FAILURE_CAPTCHA = "captcha"
+FAILURE_BLOCKED = "blocked"
+FAILURE_NO_MATCH = "no-match" # Page looked normal but the parser found no products
+
+INDEX_FILE = "index.jsonl"
+LOCK_FILE = ".lock"
+CAPTURE_SUFFIX = ".html.gz"
+_UNSAFE_FILENAME_CHARS = re.compile(r"[^a-z0-9]+")
+
+class DebugCaptureStore:
+    """
+    Sampled, size-capped store of pages that failed to scrape.
+
+    capture() only samples and enqueues, so it never touches the disk from the
+    request path. A background thread gzips each page into `directory`, appends
+    an entry (query, status code, failure mode, file, size) to index.jsonl and
+    deletes the oldest captures once the total exceeds `max_bytes`.
+
+    The directory is shared by every worker process: the index and the size
+    cap are based on what's on disk (under a file lock), not on per-process state.
+    """
+
+    def __init__(self, directory: str = DEBUG_CAPTURE_DIR, sample_rate: float = DEBUG_CAPTURE_SAMPLE_RATE,
+                 max_bytes: int = DEBUG_CAPTURE_MAX_BYTES, max_queue_size: int = DEBUG_CAPTURE_QUEUE_SIZE,
+                 enabled: bool = DEBUG_CAPTURE_ENABLED):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        if not self.enabled or self._thread:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        try:
+            self._rotate() # Applies the cap and drops index entries whose file is gone
+        except OSError as e:
+            logger.warning("Failed to clean up debug captures in %s - %s", self.directory, e)
+        self._thread = threading.Thread(target=self._run_writer, name="debug-capture-writer", daemon=True)
+        self._thread.start()
+        logger.info("Debug capture started (%s, sample rate %s, cap %d bytes)", self.directory, self.sample_rate, self.max_bytes)
+
+    def stop(self, timeout: float = 5):
+        """Writes out queued captures (up to `timeout` seconds) and stops the writer."""
+        if not self._thread:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self._thread = None
+        logger.info("Debug capture stopped.")
+
+    def capture(self, query: str, url: str, status_code: int | None, failure_mode: str | None, html_content: str) -> bool:
+        """
+        Samples a failed page and queues it for writing. Returns True if it was queued.
+
+        A failure_mode of None is detected from the page by the writer (captcha, else blocked).
+        """
+        if not self._thread or random.random() >= self.sample_rate:
+            return False
+        record = {
+            "query": query,
+            "url": url,
+            "status_code": status_code,
+            "failure_mode": failure_mode,
+            "request_id": get_request_id(),
+            "captured_at": time.time(),
+        }
+        try:
+            self._queue.put_nowait((record, html_content[:DEBUG_CAPTURE_MAX_PAGE_CHARS]))
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+    def entries(self, query: str | None = None, failure_mode: str | None = None,
+                status_code: int | None = None, limit: int = 100) -> list[dict]:
+        """Newest index entries first (from every worker), optionally filtered by query, failure mode and status code."""
+        if not self._thread:
+            return []
+        try:
+            with self._directory_lock():
+                entries = self._read_index()
+        except OSError as e:
+            logger.warning("Failed to read debug capture index - %s", e)
+            return []
+        matches = []
+        for entry in reversed(entries):
+            if query is not None and entry["query"] != query:
+                continue
+            if failure_mode is not None and entry["failure_mode"] != failure_mode:
+                continue
+            if status_code is not None and entry["status_code"] != status_code:
+                continue
+            matches.append(entry)
+            if len(matches) >= limit:
+                break
+        return matches
+
+    def stats(self) -> dict:
+        files = []
+        if self._thread:
+            try:
+                files = self._capture_files()
+            except OSError:
+                pass
+        with self._lock:
+            dropped = self.dropped
+        return {"running": self._thread is not None, "captures": len(files), "bytes": sum(size for _, size in files),
+                "max_bytes": self.max_bytes, "queued": self._queue.qsize(), "dropped": dropped}
+
+    @contextlib.contextmanager
+    def _directory_lock(self):
+        """Exclusive lock on the capture directory, shared with the other worker processes."""
+        with open(os.path.join(self.directory, LOCK_FILE), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _capture_files(self) -> list[tuple[str, int]]:
+        """(file name, size) of every capture on disk, oldest first (names start with the capture time)."""
+        with os.scandir(self.directory) as it:
+            files = [(e.name, e.stat().st_size) for e in it if e.name.endswith(CAPTURE_SUFFIX) and e.is_file()]
+        return sorted(files)
+
+    def _read_index(self) -> list[dict]:
+        entries = []
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE), encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def _run_writer(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            try:
+                self._write(*item)
+            except OSError as e:
+                logger.warning("Failed to write debug capture for '%s' - %s", item[0]["query"], e)
+
+    def _write(self, record: dict, html_content: str):
+        if record["failure_mode"] is None:
+            record["failure_mode"] = detect_failure_mode(html_content) or FAILURE_BLOCKED
+        slug = _UNSAFE_FILENAME_CHARS.sub("-", record["query"].lower()).strip("-")[:60] or "query"
+        file_name = f"{int(record['captured_at'] * 1000):015d}-{os.getpid()}-{record['failure_mode']}-{slug}{CAPTURE_SUFFIX}"
+        data = gzip.compress(html_content.encode("utf-8"), compresslevel=6)
+        with open(os.path.join(self.directory, file_name), "wb") as f:
+            f.write(data)
+
+        entry = {**record, "file": file_name, "bytes": len(data), "page_chars": len(html_content)}
+        with self._directory_lock():
+            with open(os.path.join(self.directory, INDEX_FILE), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        self._rotate()
+
+    def _rotate(self):
+        """
+        Deletes the oldest captures (of any worker) until the total size on disk is
+        under max_bytes, then rewrites the index without entries whose file is gone.
+        """
+        with self._directory_lock():
+            files = self._capture_files()
+            total = sum(size for _, size in files)
+            kept = set()
+            for position, (file_name, size) in enumerate(files):
+                if total > self.max_bytes and position < len(files) - 1:
+                    try:
+                        os.remove(os.path.join(self.directory, file_name))
+                    except FileNotFoundError:
+                        pass
+                    total -= size
+                else:
+                    kept.add(file_name)
+
+            entries = self._read_index()
+            live_entries = [entry for entry in entries if entry.get("file") in kept]
+            if len(live_entries) == len(entries):
+                return
+            index_path = os.path.join(self.directory, INDEX_FILE)
+            with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(entry) + "\n" for entry in live_entries)
+            os.replace(index_path + ".tmp", index_path)
+
+debug_captures = DebugCaptureStore()
@@ -0,0 +1,81 @@
+import httpx
+import importlib.util
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# --- Myntra HTTP Client Configuration ---
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", 10))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 20))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 10))
+HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", 30))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() == "true" # Requires the 'h2' package
+
+# Browser-like headers sent with every Myntra request. Accept-Encoding and
+# Connection are left to httpx so it only advertises encodings it can decode
+# and manages keep-alive itself.
+MYNTRA_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
+    "Accept-Language": "en-US,en;q=0.9",
+    "DNT": "1",
+    "Upgrade-Insecure-Requests": "1",
+    "Sec-Fetch-Dest": "document",
+    "Sec-Fetch-Mode": "navigate",
+    "Sec-Fetch-Site": "none",
+    "Sec-Fetch-User": "?1",
+    "Cache-Control": "max-age=0",
+    "Referer": "https://www.google.com/"
+}
+
+# Shared client used by both request handlers (via worker threads) and background tasks
+_http_client = None
+_http_client_lock = threading.Lock()
+
+def create_http_client() -> httpx.Client:
+    """Creates a pooled, keep-alive HTTP client for scraping Myntra."""
+    http2 = HTTP2_ENABLED
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("HTTP2_ENABLED is set but the 'h2' package is not installed. Falling back to HTTP/1.1.")
+        http2 = False
+
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS
+    )
+    client = httpx.Client(
+        headers=MYNTRA_HEADERS,
+        limits=limits,
+        timeout=HTTP_TIMEOUT_SECONDS,
+        follow_redirects=True,
+        http2=http2
+    )
+    logger.info("HTTP client created (max connections: %s, keep-alive: %s, HTTP/2: %s)", HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE_CONNECTIONS, http2)
+    return client
+
+def set_http_client(client: httpx.Client | None):
+    """Sets the shared HTTP client (called from the app lifespan)."""
+    global _http_client
+    with _http_client_lock:
+        _http_client = client
+
+def get_http_client() -> httpx.Client:
+    """Returns the shared HTTP client, creating one lazily when running outside the app."""
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = create_http_client()
+    return _http_client
+
+def close_http_client():
+    """Closes the shared HTTP client and its pooled connections."""
+    global _http_client
+    with _http_client_lock:
+        client, _http_client = _http_client, None
+    if client is not None:
+        client.close()
+        logger.info("HTTP client closed.")
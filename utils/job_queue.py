@@ -0,0 +1,177 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+import redis
+from . import background_tasks
+from .logging_config import get_request_id, set_request_id
+
+logger = logging.getLogger(__name__)
+
+# --- Scrape Job Queue Configuration ---
+SCRAPE_WORKERS = int(os.getenv("SCRAPE_WORKERS", 4)) # Worker threads processing /references-scrape jobs
+SCRAPE_QUEUE_SIZE = int(os.getenv("SCRAPE_QUEUE_SIZE", 100)) # Jobs waiting beyond this are rejected
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", 3600)) # How long job status/results are kept
+JOB_MEMORY_LIMIT = 1000 # Jobs kept in memory when Redis is unavailable
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+class QueueFullError(Exception):
+    """Raised when the scrape job queue can't accept more jobs."""
+
+def _job_key(job_id: str) -> str:
+    return f"job:{job_id}"
+
+class JobStore:
+    """
+    Stores job status, progress and results in Redis (so any worker/pod can
+    report on them), falling back to a bounded in-memory dict without Redis.
+    """
+
+    def __init__(self, ttl_seconds: int = JOB_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def save(self, job: dict):
+        job["updated_at"] = time.time()
+        redis_client = background_tasks.redis_client
+        if redis_client:
+            try:
+                redis_client.setex(_job_key(job["id"]), self.ttl_seconds, json.dumps(job))
+                return
+            except redis.exceptions.RedisError as e:
+                logger.warning("Redis Error: Failed to save job '%s' - %s", job['id'], e)
+        with self._lock:
+            self._memory[job["id"]] = dict(job)
+            self._memory.move_to_end(job["id"])
+            while len(self._memory) > JOB_MEMORY_LIMIT:
+                self._memory.popitem(last=False)
+
+    def get(self, job_id: str) -> dict | None:
+        redis_client = background_tasks.redis_client
+        if redis_client:
+            try:
+                value = redis_client.get(_job_key(job_id))
+                if value:
+                    return json.loads(value)
+            except redis.exceptions.RedisError as e:
+                logger.warning("Redis Error: Failed to load job '%s' - %s", job_id, e)
+        with self._lock:
+            job = self._memory.get(job_id)
+            return dict(job) if job else None
+
+    async def aget(self, async_redis_client, job_id: str) -> dict | None:
+        """Async lookup for request handlers, using the asyncio Redis client when available."""
+        if async_redis_client:
+            try:
+                value = await async_redis_client.get(_job_key(job_id))
+                if value:
+                    return json.loads(value)
+            except redis.exceptions.RedisError as e:
+                logger.warning("Redis Error: Failed to load job '%s' - %s", job_id, e)
+        with self._lock:
+            job = self._memory.get(job_id)
+            return dict(job) if job else None
+
+class ScrapeJobQueue:
+    """
+    Fixed-size pool of worker threads fed by a bounded queue.
+
+    Replaces one-thread-per-request scraping: submit() returns a job id right
+    away or raises QueueFullError, and workers record progress and results in
+    the JobStore.
+    """
+
+    def __init__(self, workers: int = SCRAPE_WORKERS, max_queue_size: int = SCRAPE_QUEUE_SIZE,
+                 store: JobStore | None = None):
+        self.workers = workers
+        self.store = store or JobStore()
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._submit_lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run_worker, name=f"scrape-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info("Scrape job queue started (%s workers, queue size %s)", self.workers, self._queue.maxsize)
+
+    def stop(self, timeout: float = 5):
+        """
+        Signals workers to exit once the queue drains and waits up to `timeout` seconds in total.
+
+        Blocks the calling thread; from async code use `await asyncio.to_thread(queue.stop)`.
+        """
+        for _ in self._threads:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                break
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self._threads = []
+        logger.info("Scrape job queue stopped.")
+
+    def submit(self, recommendations, gender="unisex") -> str:
+        """Queues a scrape job and returns its id. Raises QueueFullError if the queue is full."""
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": JOB_QUEUED,
+            "progress": {"done": 0, "total": None},
+            "results": None,
+            "error": None,
+            "created_at": time.time(),
+        }
+        # Only submitters put into the queue, so checking under the lock is race-free;
+        # the job is saved before a worker can pick it up and mark it running
+        with self._submit_lock:
+            if self._queue.full():
+                raise QueueFullError("Scrape queue is full, try again later.")
+            self.store.save(job)
+            self._queue.put_nowait((job, recommendations, gender, get_request_id()))
+        return job["id"]
+
+    def queue_size(self) -> int:
+        return self._queue.qsize()
+
+    def _run_worker(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            job, recommendations, gender, request_id = task
+            # Log records of the job carry the id of the request that submitted it
+            set_request_id(request_id)
+            try:
+                self._run_job(job, recommendations, gender)
+            except Exception as e:
+                logger.exception("Job %s failed", job['id'])
+                job["status"] = JOB_FAILED
+                job["error"] = str(e)
+                self.store.save(job)
+            finally:
+                self._queue.task_done()
+
+    def _run_job(self, job, recommendations, gender):
+        job["status"] = JOB_RUNNING
+        self.store.save(job)
+
+        def on_progress(done, total):
+            job["progress"] = {"done": done, "total": total}
+            self.store.save(job)
+
+        job["results"] = background_tasks.get_recommendations_data(
+            {"recommendations": recommendations}, gender, progress_callback=on_progress
+        )
+        job["status"] = JOB_COMPLETED
+        self.store.save(job)
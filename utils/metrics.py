@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+
+# --- Prometheus Metrics ---
+# With several uvicorn workers set PROMETHEUS_MULTIPROC_DIR to an empty, writable directory
+# (wiped on every deploy); each worker then writes its samples there and /metrics aggregates them.
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+if PROMETHEUS_MULTIPROC_DIR:
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client import multiprocess
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+SCRAPE_DURATION = Histogram(
+    "myntra_scrape_duration_seconds", "Time to fetch one Myntra search query, retries included",
+    ["status"], buckets=LATENCY_BUCKETS,
+)
+PARSE_DURATION = Histogram(
+    "myntra_parse_duration_seconds", "Time to extract products from a search page", buckets=FAST_BUCKETS,
+)
+REDIS_DURATION = Histogram(
+    "redis_operation_duration_seconds", "Redis cache round-trip latency", ["operation"], buckets=FAST_BUCKETS,
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "End-to-end request latency, including streamed response bodies",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+CACHE_LOOKUPS = Counter("cache_lookups_total", "Cache lookups by tier and result", ["tier", "result"])
+BLOCKED_RESPONSES = Counter("myntra_blocked_responses_total", "Responses indicating we are blocked", ["reason"])
+PRODUCTS_PER_QUERY = Histogram(
+    "myntra_products_per_query", "Products returned per scraped search query", buckets=(0, 1, 2, 5, 10, 20, 50),
+)
+SCRAPES_IN_FLIGHT = Gauge("myntra_scrapes_in_flight", "Myntra fetches currently running", multiprocess_mode="livesum")
+BACKGROUND_THREADS = Gauge("background_threads", "Live threads per worker process", multiprocess_mode="livesum")
+
+# Cache stat names (see utils.cache._count) -> (tier, result) labels
+_CACHE_STAT_LABELS = {
+    "l1_hits": ("l1", "hit"), "l1_misses": ("l1", "miss"),
+    "l2_hits": ("l2", "hit"), "l2_misses": ("l2", "miss"), "l2_errors": ("l2", "error"),
+}
+
+def count_cache_lookup(stat: str):
+    labels = _CACHE_STAT_LABELS.get(stat)
+    if labels:
+        CACHE_LOOKUPS.labels(*labels).inc()
+
+def update_background_threads():
+    """Refreshes this worker's BACKGROUND_THREADS sample (each worker must write its own in multiprocess mode)."""
+    BACKGROUND_THREADS.set(threading.active_count())
+
+def render_metrics() -> tuple[bytes, str]:
+    """Exposition output and content type for /metrics, aggregated across workers in multiprocess mode."""
+    update_background_threads()
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+def mark_process_dead():
+    """Drops this worker's live gauges on shutdown (multiprocess mode only)."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
+
+def _route_label(scope) -> str:
+    """Path template of the matched route, e.g. /products/jobs/{job_id}, so labels stay low-cardinality."""
+    route = scope.get("route")
+    path_format = getattr(route, "path_format", None)
+    if path_format is None:
+        return "unmatched"
+    # Routes of included routers may not carry the router prefix; recover it from the request path
+    try:
+        matched = path_format.format(**scope.get("path_params", {}))
+    except (KeyError, IndexError, ValueError):
+        return route.path
+    path = scope["path"]
+    prefix = path[:-len(matched)] if matched and path.endswith(matched) else ""
+    return prefix + route.path
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording http_request_duration_seconds.
+
+    Timing stops when the app returns, i.e. after the last chunk of a
+    streaming response was sent. Routes are labeled by their path template.
+    Every request also refreshes this worker's background_threads gauge, so
+    workers that never serve /metrics still report a current value.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUEST_DURATION.labels(
+                scope["method"], _route_label(scope), str(status["code"])
+            ).observe(time.perf_counter() - started)
+            update_background_threads()
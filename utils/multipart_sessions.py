@@ -0,0 +1,79 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+import redis
+
+logger = logging.getLogger(__name__)
+
+# --- Multipart Upload Configuration ---
+MULTIPART_PART_SIZE = int(os.getenv("MULTIPART_PART_SIZE", 8 * 1024 * 1024)) # Default part size (8 MiB)
+MULTIPART_MIN_PART_SIZE = 5 * 1024 * 1024 # S3 minimum for every part but the last
+MULTIPART_MAX_PARTS = 10000 # S3 limit
+MULTIPART_MAX_UPLOAD_BYTES = int(os.getenv("MULTIPART_MAX_UPLOAD_BYTES", 512 * 1024 * 1024)) # Largest upload accepted
+MULTIPART_SESSION_TTL_SECONDS = int(os.getenv("MULTIPART_SESSION_TTL_SECONDS", 24 * 3600)) # Unfinished sessions are forgotten after this
+MULTIPART_MEMORY_LIMIT = 1000 # Sessions kept in memory when Redis is unavailable
+
+class UploadSessionNotFoundError(Exception):
+    """Raised when a multipart upload session doesn't exist or has expired."""
+
+def _session_key(upload_id: str) -> str:
+    return f"multipart:{upload_id}"
+
+class MultipartSessionStore:
+    """
+    Tracks open multipart upload sessions (S3 key, content type, part layout) in
+    Redis so complete/abort work on any worker or pod, falling back to a bounded
+    in-memory dict without Redis.
+    """
+
+    def __init__(self, ttl_seconds: int = MULTIPART_SESSION_TTL_SECONDS, redis_client: redis.StrictRedis | None = None):
+        self.ttl_seconds = ttl_seconds
+        self.redis_client = redis_client
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def set_redis_client(self, redis_client: redis.StrictRedis | None):
+        self.redis_client = redis_client
+
+    def save(self, session: dict):
+        session["updated_at"] = time.time()
+        if self.redis_client:
+            try:
+                self.redis_client.setex(_session_key(session["upload_id"]), self.ttl_seconds, json.dumps(session))
+                return
+            except redis.exceptions.RedisError as e:
+                logger.warning("Redis Error: Failed to save upload session '%s' - %s", session["upload_id"], e)
+        with self._lock:
+            self._memory[session["upload_id"]] = dict(session)
+            self._memory.move_to_end(session["upload_id"])
+            while len(self._memory) > MULTIPART_MEMORY_LIMIT:
+                self._memory.popitem(last=False)
+
+    def get(self, upload_id: str) -> dict:
+        """Returns the session, or raises UploadSessionNotFoundError."""
+        if self.redis_client:
+            try:
+                value = self.redis_client.get(_session_key(upload_id))
+                if value:
+                    return json.loads(value)
+            except redis.exceptions.RedisError as e:
+                logger.warning("Redis Error: Failed to load upload session '%s' - %s", upload_id, e)
+        with self._lock:
+            session = self._memory.get(upload_id)
+        if session is None or time.time() - session["updated_at"] > self.ttl_seconds:
+            raise UploadSessionNotFoundError(f"Upload session '{upload_id}' not found or expired.")
+        return dict(session)
+
+    def delete(self, upload_id: str):
+        if self.redis_client:
+            try:
+                self.redis_client.delete(_session_key(upload_id))
+            except redis.exceptions.RedisError as e:
+                logger.warning("Redis Error: Failed to delete upload session '%s' - %s", upload_id, e)
+        with self._lock:
+            self._memory.pop(upload_id, None)
+
+multipart_sessions = MultipartSessionStore()
@@ -0,0 +1,90 @@
+import html
+import json
+import re
+
+# Myntra embeds the search results state in a script tag: window.__myx = {...}
+STATE_MARKER = "window.__myx"
+_PRODUCTS_ARRAY = re.compile(r'"products"\s*:\s*\[')
+IMAGE_HOST = "https://assets.myntassets.com/"
+
+# One case-insensitive pass over the page instead of lowercasing it per check
+_FAILURE_PATTERN = re.compile(r"captcha|access denied|blocked", re.IGNORECASE)
+_WHITESPACE_AND_COMMAS = re.compile(r"[\s,]*")
+
+_decoder = json.JSONDecoder()
+
+def detect_failure_mode(html_content: str) -> str | None:
+    """Returns 'captcha' or 'blocked' if the page looks like a block page, else None."""
+    match = _FAILURE_PATTERN.search(html_content)
+    if not match:
+        return None
+    return "captcha" if match.group(0).lower() == "captcha" else "blocked"
+
+def _normalize_image_url(image_url: str) -> str:
+    """Makes a Myntra image path absolute."""
+    if image_url.startswith('http'):
+        return image_url
+    return f"{IMAGE_HOST}{image_url.lstrip('/')}"
+
+def _product_from_record(record: dict) -> dict | None:
+    """Maps one search result record to our product shape, keeping its fields paired."""
+    name = record.get("productName") or record.get("product")
+    image_url = record.get("searchImage")
+    if not image_url:
+        images = record.get("images") or []
+        image_url = images[0].get("src") if images and isinstance(images[0], dict) else None
+    if not name or not image_url:
+        return None
+
+    return {
+        "name": html.unescape(name) if "&" in name else name,
+        "image_url": _normalize_image_url(image_url),
+        "brand": record.get("brand"),
+        "price": record.get("price"),
+        "product_id": record.get("productId"),
+    }
+
+def iter_product_records(html_content: str):
+    """
+    Yields raw product records from the embedded search state.
+
+    Records are decoded one at a time straight out of the page, so callers that
+    stop early never decode the rest of the (large) results array.
+    """
+    start = html_content.find(STATE_MARKER)
+    match = _PRODUCTS_ARRAY.search(html_content, start if start != -1 else 0)
+    if not match:
+        return
+
+    position = match.end()
+    length = len(html_content)
+    while position < length:
+        position = _WHITESPACE_AND_COMMAS.match(html_content, position).end()
+        if position >= length or html_content[position] == ']':
+            return
+        try:
+            record, position = _decoder.raw_decode(html_content, position)
+        except json.JSONDecodeError:
+            return
+        if isinstance(record, dict):
+            yield record
+
+def parse_search_page(html_content: str, num_results: int = 2) -> list[dict]:
+    """
+    Extracts the top products from a Myntra search results page.
+
+    Returns up to `num_results` dicts with name, image_url, brand, price and
+    product_id; an empty list if the page has no search state.
+    """
+    products = []
+    if num_results <= 0:
+        return products
+
+    for record in iter_product_records(html_content):
+        product = _product_from_record(record)
+        if product is None:
+            continue
+        products.append(product)
+        if len(products) >= num_results:
+            break
+    return products
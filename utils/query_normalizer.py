@@ -0,0 +1,154 @@
+import os
+import re
+import threading
+from .cache import LocalTTLCache, CACHE_TTL_SECONDS
+
+# --- Query Key Versioning ---
+# Bump when the canonicalization rules change so old entries are not reused
+QUERY_KEY_VERSION = int(os.getenv("QUERY_KEY_VERSION", 4))
+
+# Clothing types whose canonical form is plural (a pair / always plural in search)
+PLURAL_CLOTHING_TYPES = {"jeans", "trousers", "pants", "chinos", "shorts", "sneakers", "trainers", "shoes", "sandals",
+                         "heels", "flats", "boots", "loafers", "leggings", "jeggings", "joggers", "track pants",
+                         "sweatpants", "tights", "briefs", "boxers", "trunks", "overalls", "dungarees", "pyjamas",
+                         "capris", "palazzos", "glasses", "sunglasses", "socks", "accessories"}
+
+# Plural -> singular for countable clothing types. Words not listed are left as they are, since
+# stripping an "s" from an unknown word (tights, glasses) searches for a different product.
+PLURAL_TO_SINGULAR = {
+    "shirts": "shirt", "t-shirts": "t-shirt", "tshirts": "tshirt", "tops": "top", "tunics": "tunic",
+    "dresses": "dress", "skirts": "skirt", "kurtas": "kurta", "kurtis": "kurti", "sarees": "saree",
+    "lehengas": "lehenga", "dupattas": "dupatta", "jumpsuits": "jumpsuit", "playsuits": "playsuit",
+    "jackets": "jacket", "blazers": "blazer", "coats": "coat", "suits": "suit", "waistcoats": "waistcoat",
+    "sweaters": "sweater", "sweatshirts": "sweatshirt", "hoodies": "hoodie", "cardigans": "cardigan",
+    "shrugs": "shrug", "vests": "vest", "camisoles": "camisole", "bras": "bra",
+    "caps": "cap", "hats": "hat", "belts": "belt", "ties": "tie", "scarves": "scarf", "stoles": "stole",
+    "watches": "watch", "bags": "bag", "wallets": "wallet",
+}
+
+# Alternative spellings and singular forms -> canonical clothing type. Only variants of the same word
+# belong here: mapping e.g. hoodie -> sweatshirt would change which products are recommended.
+CLOTHING_TYPE_SYNONYMS = {
+    "tshirt": "t-shirt", "t shirt": "t-shirt", "tee shirt": "t-shirt",
+    "jean": "jeans", "trouser": "trousers", "pant": "pants", "chino": "chinos", "short": "shorts",
+    "sneaker": "sneakers", "trainer": "trainers",
+    "shoe": "shoes", "sandal": "sandals", "heel": "heels", "boot": "boots", "loafer": "loafers",
+    "legging": "leggings", "jogger": "joggers", "track pant": "track pants", "trackpants": "track pants",
+    "sock": "socks", "sunglass": "sunglasses",
+}
+
+# Alternative spellings -> canonical color
+COLOR_SYNONYMS = {
+    "gray": "grey", "off white": "off-white", "offwhite": "off-white",
+    "light gray": "light grey", "dark gray": "dark grey", "charcoal gray": "charcoal grey",
+    "multicolour": "multicolor", "multi color": "multicolor", "multi colour": "multicolor",
+}
+
+# Gender values -> canonical gender
+GENDER_SYNONYMS = {
+    "men": "men", "man": "men", "male": "men", "mens": "men", "men's": "men", "m": "men", "boy": "men", "boys": "men",
+    "women": "women", "woman": "women", "female": "women", "womens": "women", "women's": "women", "w": "women",
+    "f": "women", "girl": "women", "girls": "women", "ladies": "women",
+    "unisex": "unisex", "": "unisex", "none": "unisex",
+}
+
+_WHITESPACE = re.compile(r"\s+")
+_DASHES = re.compile(r"\s*[-\u2010-\u2015]\s*") # Hyphen, en/em dashes
+
+def normalize_text(value) -> str:
+    """Lowercases, unifies dashes and collapses whitespace."""
+    text = str(value or "").lower()
+    text = _DASHES.sub("-", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+def canonical_clothing_type(clothing_type) -> str:
+    """Canonical clothing type: synonyms resolved, known plurals singular unless the item is plural by nature."""
+    text = normalize_text(clothing_type)
+    text = CLOTHING_TYPE_SYNONYMS.get(text, text)
+    if text in PLURAL_CLOTHING_TYPES:
+        return text
+
+    # Normalize only the head noun: "formal shirts" -> "formal shirt"
+    *modifiers, head = text.split(" ") if text else [""]
+    head = CLOTHING_TYPE_SYNONYMS.get(head, head)
+    singular = PLURAL_TO_SINGULAR.get(head, head)
+    head = CLOTHING_TYPE_SYNONYMS.get(singular, singular)
+    text = " ".join(modifiers + [head])
+    return CLOTHING_TYPE_SYNONYMS.get(text, text)
+
+def canonical_color(color) -> str:
+    text = normalize_text(color)
+    return COLOR_SYNONYMS.get(text, text)
+
+def canonical_gender(gender) -> str:
+    text = normalize_text(gender)
+    return GENDER_SYNONYMS.get(text, text)
+
+def raw_search_query(clothing_type, color, gender) -> str:
+    """The search query as built before canonicalization (used for hit-rate comparison)."""
+    if color.lower() in clothing_type.lower():
+        return f"{clothing_type} for {gender}"
+    return f"{color} {clothing_type} for {gender}"
+
+def canonical_search_query(clothing_type, color, gender="unisex") -> str:
+    """
+    Canonical Myntra search query for a clothing type / color / gender combination.
+
+    "Navy Blue  T-Shirt", "navy blue t-shirt" and ("T-shirts", "Navy Blue") all
+    map to "navy blue t-shirt for men".
+    """
+    clothing_type = canonical_clothing_type(clothing_type)
+    color = canonical_color(color)
+    gender = canonical_gender(gender)
+    if not color or f" {color} " in f" {clothing_type} ":
+        return f"{clothing_type} for {gender}"
+    return f"{color} {clothing_type} for {gender}"
+
+def query_cache_key(search_query: str, num_results: int = 2) -> str:
+    """Versioned cache key that also covers the number of requested results."""
+    return f"myntra:v{QUERY_KEY_VERSION}:{num_results}:{search_query}"
+
+class NormalizationStats:
+    """
+    Estimates the cache hit rate with and without canonicalization.
+
+    For every lookup it checks whether the raw key and the canonical key were
+    already requested within the cache TTL, i.e. whether each keying scheme
+    would have produced a cache hit.
+    """
+
+    def __init__(self, window_seconds: int = CACHE_TTL_SECONDS, max_tracked: int = 10000):
+        self.window_seconds = window_seconds
+        self._raw_seen = LocalTTLCache(max_entries=max_tracked, max_bytes=max_tracked)
+        self._canonical_seen = LocalTTLCache(max_entries=max_tracked, max_bytes=max_tracked)
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.raw_hits = 0
+        self.canonical_hits = 0
+
+    def record(self, raw_query: str, canonical_query: str):
+        raw_hit = self._raw_seen.get(raw_query) is not None
+        canonical_hit = self._canonical_seen.get(canonical_query) is not None
+        self._raw_seen.set(raw_query, True, self.window_seconds, 1)
+        self._canonical_seen.set(canonical_query, True, self.window_seconds, 1)
+        with self._lock:
+            self.lookups += 1
+            self.raw_hits += raw_hit
+            self.canonical_hits += canonical_hit
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lookups, raw_hits, canonical_hits = self.lookups, self.raw_hits, self.canonical_hits
+        return {
+            "lookups": lookups,
+            "raw_hit_rate": round(raw_hits / lookups, 4) if lookups else 0.0,
+            "canonical_hit_rate": round(canonical_hits / lookups, 4) if lookups else 0.0,
+            "raw_distinct_keys": len(self._raw_seen),
+            "canonical_distinct_keys": len(self._canonical_seen),
+        }
+
+normalization_stats = NormalizationStats()
+
+def get_normalization_stats() -> dict:
+    """Estimated hit rates before (raw keys) and after (canonical keys) normalization."""
+    return normalization_stats.snapshot()
@@ -0,0 +1,200 @@
+import logging
+import os
+import random
+import threading
+import time
+import redis
+
+logger = logging.getLogger(__name__)
+
+# --- Rate Limiting Configuration (per target host) ---
+RATE_LIMIT_REQUESTS_PER_SECOND = float(os.getenv("RATE_LIMIT_REQUESTS_PER_SECOND", 5)) # Token refill rate
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", 10)) # Bucket size
+RATE_LIMIT_MAX_WAIT_SECONDS = float(os.getenv("RATE_LIMIT_MAX_WAIT_SECONDS", 10)) # Give up waiting for a token/slot after this
+RATE_LIMIT_REDIS_ENABLED = os.getenv("RATE_LIMIT_REDIS_ENABLED", "false").lower() == "true" # Share buckets across pods
+
+# --- Adaptive Concurrency (AIMD) ---
+ADAPTIVE_CONCURRENCY_INITIAL = int(os.getenv("ADAPTIVE_CONCURRENCY_INITIAL", os.getenv("SCRAPING_CONCURRENCY", 8)))
+ADAPTIVE_CONCURRENCY_MIN = int(os.getenv("ADAPTIVE_CONCURRENCY_MIN", 1))
+ADAPTIVE_CONCURRENCY_MAX = int(os.getenv("ADAPTIVE_CONCURRENCY_MAX", 16))
+ADAPTIVE_CONCURRENCY_DECREASE_FACTOR = float(os.getenv("ADAPTIVE_CONCURRENCY_DECREASE_FACTOR", 0.5))
+
+# --- Retry / Backoff ---
+SCRAPING_MAX_RETRIES = int(os.getenv("SCRAPING_MAX_RETRIES", 3))
+SCRAPING_RETRY_DELAY_MIN = float(os.getenv("SCRAPING_RETRY_DELAY_MIN", 0.5))
+SCRAPING_RETRY_DELAY_MAX = float(os.getenv("SCRAPING_RETRY_DELAY_MAX", 2))
+
+# Refills and takes one token atomically using the Redis server clock.
+# Returns 0 if a token was taken, otherwise the milliseconds until one is available.
+_TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('time')
+local now = tonumber(clock[1]) * 1000 + math.floor(tonumber(clock[2]) / 1000)
+local state = redis.call('hmget', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate / 1000)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) * 1000 / rate)
+end
+redis.call('hset', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('pexpire', KEYS[1], math.ceil(burst * 1000 / rate) + 1000)
+return wait
+"""
+
+def backoff_delay(attempt: int, min_delay: float = SCRAPING_RETRY_DELAY_MIN,
+                  max_delay: float = SCRAPING_RETRY_DELAY_MAX) -> float:
+    """Exponential backoff with full jitter for retry number `attempt` (1-based)."""
+    return random.uniform(min_delay, max(min_delay, min(max_delay, min_delay * 2 ** attempt)))
+
+class TokenBucket:
+    """Thread-safe in-process token bucket."""
+
+    def __init__(self, rate: float = RATE_LIMIT_REQUESTS_PER_SECOND, burst: int = RATE_LIMIT_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        """Takes a token if one is available. Returns 0, or the seconds to wait before retrying."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+class RedisTokenBucket:
+    """
+    Token bucket stored in Redis so every pod shares the same budget.
+
+    Falls back to an in-process bucket while Redis is unavailable.
+    """
+
+    def __init__(self, redis_client: redis.StrictRedis, key: str,
+                 rate: float = RATE_LIMIT_REQUESTS_PER_SECOND, burst: int = RATE_LIMIT_BURST):
+        self.key = key
+        self.rate = rate
+        self.burst = burst
+        self._script = redis_client.register_script(_TOKEN_BUCKET_SCRIPT)
+        self._fallback = TokenBucket(rate, burst)
+
+    def try_acquire(self) -> float:
+        try:
+            return self._script(keys=[self.key], args=[self.rate, self.burst]) / 1000
+        except redis.exceptions.RedisError as e:
+            logger.warning("Redis Error: Rate limiter '%s' falling back to local bucket - %s", self.key, e)
+            return self._fallback.try_acquire()
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Caps in-flight requests with an AIMD limit.
+
+    Every successful request raises the limit by 1/limit (about +1 per round of
+    requests); a throttling signal (429/403/captcha) multiplies it by
+    `decrease_factor`. Requests that started before the last decrease don't
+    shrink it again, so one burst of 429s only halves the limit once.
+    """
+
+    def __init__(self, initial: int = ADAPTIVE_CONCURRENCY_INITIAL, min_limit: int = ADAPTIVE_CONCURRENCY_MIN,
+                 max_limit: int = ADAPTIVE_CONCURRENCY_MAX, decrease_factor: float = ADAPTIVE_CONCURRENCY_DECREASE_FACTOR):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.decrease_factor = decrease_factor
+        self.limit = float(min(self.max_limit, max(self.min_limit, initial)))
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout: float) -> float | None:
+        """Waits for a free slot. Returns the start time to pass to release(), or None on timeout."""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self.in_flight < int(self.limit), timeout):
+                return None
+            self.in_flight += 1
+            return time.monotonic()
+
+    def release(self, started_at: float, throttled: bool = False):
+        with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                if started_at >= self._last_decrease:
+                    self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                    self._last_decrease = time.monotonic()
+                    logger.warning("Throttled: concurrency limit lowered to %s", int(self.limit))
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+class HostRateLimiter:
+    """Token bucket plus adaptive concurrency limit for one target host."""
+
+    def __init__(self, host: str, bucket, concurrency: AdaptiveConcurrencyLimiter):
+        self.host = host
+        self.bucket = bucket
+        self.concurrency = concurrency
+
+    def acquire(self, timeout: float = RATE_LIMIT_MAX_WAIT_SECONDS) -> float | None:
+        """
+        Waits for a concurrency slot and a token.
+
+        Returns a permit to pass to release(), or None if neither became
+        available within `timeout` seconds.
+        """
+        deadline = time.monotonic() + timeout
+        permit = self.concurrency.acquire(timeout)
+        if permit is None:
+            return None
+        while True:
+            wait = self.bucket.try_acquire()
+            if wait <= 0:
+                return permit
+            if time.monotonic() + wait > deadline:
+                self.concurrency.release(permit)
+                return None
+            time.sleep(wait)
+
+    def release(self, permit: float, throttled: bool = False):
+        self.concurrency.release(permit, throttled)
+
+    def snapshot(self) -> dict:
+        return {"concurrency_limit": int(self.concurrency.limit), "in_flight": self.concurrency.in_flight}
+
+class HostRateLimiters:
+    """Creates one HostRateLimiter per host, shared by every thread in the process."""
+
+    def __init__(self, redis_client: redis.StrictRedis | None = None):
+        self.redis_client = redis_client
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def set_redis_client(self, redis_client: redis.StrictRedis | None):
+        """Switches to Redis-backed buckets (only when RATE_LIMIT_REDIS_ENABLED)."""
+        with self._lock:
+            self.redis_client = redis_client if RATE_LIMIT_REDIS_ENABLED else None
+            self._limiters.clear()
+
+    def get(self, host: str) -> HostRateLimiter:
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                if self.redis_client:
+                    bucket = RedisTokenBucket(self.redis_client, f"ratelimit:{host}")
+                else:
+                    bucket = TokenBucket()
+                limiter = HostRateLimiter(host, bucket, AdaptiveConcurrencyLimiter())
+                self._limiters[host] = limiter
+            return limiter
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return {limiter.host: limiter.snapshot() for limiter in limiters}
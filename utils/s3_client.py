@@ -0,0 +1,118 @@
+import logging
+import os
+import threading
+from .sigv4 import SigV4Presigner
+
+logger = logging.getLogger(__name__)
+
+# --- Shared S3 Client Configuration ---
+S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", 20)) # botocore's default is 10
+S3_RETRY_MODE = os.getenv("S3_RETRY_MODE", "standard") # "legacy", "standard" or "adaptive"
+S3_MAX_ATTEMPTS = int(os.getenv("S3_MAX_ATTEMPTS", 3)) # Including the first attempt
+S3_CONNECT_TIMEOUT_SECONDS = float(os.getenv("S3_CONNECT_TIMEOUT_SECONDS", 5))
+S3_READ_TIMEOUT_SECONDS = float(os.getenv("S3_READ_TIMEOUT_SECONDS", 30))
+S3_CLIENT_EAGER_INIT = os.getenv("S3_CLIENT_EAGER_INIT", "false").lower() == "true" # Create in lifespan instead of on first use
+
+# One client (and one presigner) per process, created on first use or from the app lifespan.
+# boto3 itself is only imported then, which keeps it out of the import/startup path.
+_s3_client = None
+_s3_client_initialized = False # Creation is attempted once, so missing credentials are only reported once
+_presigner = None
+_s3_lock = threading.Lock()
+
+def get_aws_settings() -> dict:
+    """AWS credentials, region and bucket, read from the environment at call time."""
+    return {
+        "access_key_id": os.getenv("AWS_ACCESS_KEY_ID"),
+        "secret_access_key": os.getenv("AWS_SECRET_ACCESS_KEY"),
+        "session_token": os.getenv("AWS_SESSION_TOKEN"),
+        "region": os.getenv("AWS_REGION"),
+        "bucket_name": os.getenv("S3_BUCKET_NAME"),
+        # Local S3 stand-in (MinIO, moto server, ...); implies path-style addressing
+        "endpoint_url": os.getenv("S3_ENDPOINT_URL") or None,
+    }
+
+def get_bucket_name() -> str | None:
+    return os.getenv("S3_BUCKET_NAME")
+
+def _has_credentials(settings: dict) -> bool:
+    return all([settings["access_key_id"], settings["secret_access_key"], settings["region"]])
+
+def create_s3_client():
+    """Creates a pooled S3 client, or returns None if AWS credentials aren't configured."""
+    settings = get_aws_settings()
+    if not _has_credentials(settings):
+        logger.warning("AWS credentials not fully configured. S3 operations will fail.")
+        return None
+
+    import boto3
+    from botocore.config import Config
+
+    config = Config(
+        signature_version="s3v4",
+        max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+        retries={"mode": S3_RETRY_MODE, "total_max_attempts": S3_MAX_ATTEMPTS},
+        connect_timeout=S3_CONNECT_TIMEOUT_SECONDS,
+        read_timeout=S3_READ_TIMEOUT_SECONDS,
+        s3={"addressing_style": "path"} if settings["endpoint_url"] else None,
+    )
+    try:
+        client = boto3.client(
+            "s3",
+            aws_access_key_id=settings["access_key_id"],
+            aws_secret_access_key=settings["secret_access_key"],
+            aws_session_token=settings["session_token"],
+            region_name=settings["region"],
+            endpoint_url=settings["endpoint_url"],
+            config=config,
+        )
+    except Exception as e:
+        logger.error("Error creating S3 client: %s", e)
+        return None
+    logger.info("S3 client created (pool: %s connections, retry mode: %s, max attempts: %s)",
+                S3_MAX_POOL_CONNECTIONS, S3_RETRY_MODE, S3_MAX_ATTEMPTS)
+    return client
+
+def get_s3_client():
+    """Returns the shared S3 client, creating it on first use (None if S3 isn't configured)."""
+    global _s3_client, _s3_client_initialized
+    if not _s3_client_initialized:
+        with _s3_lock:
+            if not _s3_client_initialized:
+                _s3_client = create_s3_client()
+                _s3_client_initialized = True
+    return _s3_client
+
+def get_presigner() -> SigV4Presigner | None:
+    """Returns the shared local SigV4 presigner (None if AWS credentials aren't configured)."""
+    global _presigner
+    if _presigner is None:
+        with _s3_lock:
+            if _presigner is None:
+                settings = get_aws_settings()
+                if _has_credentials(settings):
+                    _presigner = SigV4Presigner(settings["access_key_id"], settings["secret_access_key"],
+                                                settings["region"], session_token=settings["session_token"],
+                                                endpoint_url=settings["endpoint_url"])
+    return _presigner
+
+def set_s3_client(client):
+    """Sets the shared S3 client (called from the app lifespan; None resets it)."""
+    global _s3_client, _s3_client_initialized, _presigner
+    with _s3_lock:
+        _s3_client = client
+        _s3_client_initialized = client is not None
+        if client is None:
+            _presigner = None
+
+def close_s3_client():
+    """Closes the shared client's pooled connections (called on app shutdown)."""
+    global _s3_client, _s3_client_initialized
+    with _s3_lock:
+        client, _s3_client = _s3_client, None
+        _s3_client_initialized = False
+    if client is not None:
+        try:
+            client.close()
+        except Exception as e:
+            logger.warning("Error closing S3 client: %s", e)
@@ -1,30 +1,10 @@
-import boto3
-import os
+import logging
 from typing import List, Literal, Optional, Dict
 from urllib.parse import urlparse
-from dotenv import load_dotenv
+from .s3_client import get_s3_client, get_presigner, get_bucket_name
+from .signed_url_cache import presigned_url_cache
 
-# Load environment variables
-load_dotenv()
-
-# Set up S3 client
-aws_access_key_id = os.getenv("AWS_ACCESS_KEY_ID")
-aws_secret_access_key = os.getenv("AWS_SECRET_ACCESS_KEY")
-aws_region = os.getenv("AWS_REGION")
-s3_bucket_name = os.getenv("S3_BUCKET_NAME")
-
-s3_client = None
-if all([aws_access_key_id, aws_secret_access_key, aws_region]):
-    try:
-        s3_client = boto3.client(
-            's3',
-            aws_access_key_id=aws_access_key_id,
-            aws_secret_access_key=aws_secret_access_key,
-            region_name=aws_region,
-            config=boto3.session.Config(signature_version='s3v4')
-        )
-    except Exception as e:
-        print(f"Error creating S3 client: {e}")
+logger = logging.getLogger(__name__)
 
 def extract_s3_object_key(url: str) -> Optional[Dict[str, str]]:
     """
@@ -64,6 +44,17 @@ def extract_s3_object_key(url: str) -> Optional[Dict[str, str]]:
         print(f"Error parsing S3 URL: {e}")
         return None
 
+def _cached_get_urls(targets: List[tuple], expiration: int) -> List[str]:
+    """Presigned GET URLs for (bucket, key) pairs, in order, from presigned_url_cache (one lookup per bucket)."""
+    keys_by_bucket = {}
+    for bucket, key in targets:
+        keys_by_bucket.setdefault(bucket, []).append(key)
+    urls_by_bucket = {
+        bucket: iter(presigned_url_cache.get_many(get_presigner(), "GET", bucket, keys, expiration))
+        for bucket, keys in keys_by_bucket.items()
+    }
+    return [next(urls_by_bucket[bucket]) for bucket, _ in targets]
+
 def generate_signed_urls(
     urls: List[str] = None, 
     object_keys: List[str] = None,
@@ -85,18 +76,36 @@ def generate_signed_urls(
         
     Returns:
         List of presigned URLs
+
+    GET URLs are signed locally and cached (see utils.signed_url_cache), so the
+    same object keeps the same URL for a while instead of being re-signed per call.
+    They stay valid for at least `expiration` seconds (at most a quarter longer).
     """
-    if not s3_client:
+    # The presigner exists exactly when AWS credentials are configured; GET URLs only need it
+    if not get_presigner():
         raise ValueError("S3 client is not configured due to missing environment variables")
     
     if not bucket_name:
-        bucket_name = s3_bucket_name
+        bucket_name = get_bucket_name()
         
     if not bucket_name:
         raise ValueError("S3 bucket name not provided or found in environment variables")
         
     result_urls = []
-    
+
+    if client_method == 'get_object':
+        if object_keys:
+            return _cached_get_urls([(bucket_name, key) for key in object_keys], expiration)
+        if urls:
+            s3_infos = [extract_s3_object_key(url) for url in urls]
+            signed = iter(_cached_get_urls([(info["bucket"], info["key"]) for info in s3_infos if info], expiration))
+            # Return original URL if not an S3 URL
+            return [next(signed) if info else url for url, info in zip(urls, s3_infos)]
+
+    s3_client = get_s3_client()
+    if not s3_client:
+        raise ValueError("S3 client is not configured due to missing environment variables")
+
     # If object_keys provided, use them directly
     if object_keys:
         for i, key in enumerate(object_keys):
@@ -152,4 +161,35 @@ def generate_signed_urls(
     else:
         raise ValueError("Either 'urls' or 'object_keys' must be provided")
         
-    return result_urls 
\ No newline at end of file
+    return result_urls 
+def upload_object(key: str, body: bytes, content_type: str, cache_control: Optional[str] = None,
+                  bucket_name: str = None) -> bool:
+    """Uploads bytes to S3 under `key`. Returns False (and logs) if S3 isn't configured or the upload fails."""
+    s3_client = get_s3_client()
+    bucket_name = bucket_name or get_bucket_name()
+    if not s3_client or not bucket_name:
+        logger.warning("Skipping upload of %s: S3 client or bucket not configured", key)
+        return False
+    params = {'Bucket': bucket_name, 'Key': key, 'Body': body, 'ContentType': content_type}
+    if cache_control:
+        params['CacheControl'] = cache_control
+    try:
+        s3_client.put_object(**params)
+        return True
+    except Exception as e:
+        logger.error("Error uploading %s to S3: %s", key, e)
+        return False
+
+def download_object(key: str, bucket_name: str = None) -> Optional[bytes]:
+    """Returns the object's bytes, or None if it doesn't exist, S3 isn't configured or the download fails."""
+    s3_client = get_s3_client()
+    bucket_name = bucket_name or get_bucket_name()
+    if not s3_client or not bucket_name:
+        return None
+    try:
+        return s3_client.get_object(Bucket=bucket_name, Key=key)['Body'].read()
+    except s3_client.exceptions.NoSuchKey:
+        return None
+    except Exception as e:
+        logger.error("Error downloading %s from S3: %s", key, e)
+        return None
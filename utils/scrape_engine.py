@@ -0,0 +1,174 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from . import background_tasks
+from .background_tasks import plan_recommendation_queries, build_recommendation_results, build_item_result
+from .background_tasks import cache_key_for, serve_cache_entry, cache_entry_batch
+from .cache import aget_cache_many, aset_cache_many
+from .cache_warmer import track_query_popularity
+
+logger = logging.getLogger(__name__)
+
+# --- Scraping Concurrency ---
+# Maximum number of Myntra search queries scraped at the same time for one payload
+SCRAPING_CONCURRENCY = int(os.getenv("SCRAPING_CONCURRENCY", 8))
+
+# Global variable to store the asyncio Redis client used by request handlers
+async_redis_client = None
+
+def set_async_redis_client(client):
+    """Set the asyncio Redis client for request handlers"""
+    global async_redis_client
+    async_redis_client = client
+
+async def get_cached_products_many(search_queries, num_results=2):
+    """
+    Looks up several search queries in one cache round trip. Returns only the hits.
+
+    Uses the asyncio Redis client when available (recording query popularity
+    for the cache warmer on the side); otherwise falls back to the sync client
+    in a worker thread.
+    """
+    if async_redis_client is None:
+        return await asyncio.to_thread(background_tasks.get_cached_products_many, search_queries, num_results)
+    track_query_popularity(async_redis_client, search_queries)
+    keys = {q: cache_key_for(q, num_results) for q in search_queries}
+    cached = await aget_cache_many(async_redis_client, list(keys.values()))
+    return {q: serve_cache_entry(q, cached[key], num_results) for q, key in keys.items() if key in cached}
+
+async def cache_entries_many(entries_by_query, num_results=2):
+    """Caches freshly scraped entries with one pipelined write, without blocking the event loop."""
+    if async_redis_client is None:
+        await asyncio.to_thread(background_tasks.cache_entries_many, entries_by_query, num_results)
+        return
+    values, ttls = cache_entry_batch(entries_by_query, num_results)
+    await aset_cache_many(async_redis_client, values, ttls=ttls)
+
+async def _scrape_misses(misses, num_results, concurrency):
+    """Yields (search_query, cache entry) for cache misses as their scrapes complete."""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(search_query):
+        async with semaphore:
+            try:
+                entry = await asyncio.to_thread(background_tasks.scrape_query, search_query, num_results, False)
+            except Exception as e:
+                logger.error("Error fetching products for '%s': %s", search_query, e)
+                entry = background_tasks.make_cache_entry([], background_tasks.FETCH_ERROR)
+            return search_query, entry
+
+    for next_done in asyncio.as_completed([run(q) for q in misses]):
+        yield await next_done
+
+async def fetch_products_for_queries(search_queries, num_results=2, concurrency=SCRAPING_CONCURRENCY):
+    """
+    Fetches products for several search queries concurrently.
+
+    Cache lookups for all queries happen in one batch up front; misses the
+    local catalog index can't answer are scraped in worker threads, bounded by a semaphore, so the event loop stays
+    free for other clients. New results are written back in one pipelined batch.
+    Returns a dict mapping each unique query to its list of products.
+    """
+    unique_queries = list(dict.fromkeys(search_queries))
+    products_by_query = await get_cached_products_many(unique_queries, num_results)
+    misses = [q for q in unique_queries if q not in products_by_query]
+    if misses:
+        products_by_query.update(await asyncio.to_thread(background_tasks.get_indexed_products_many, misses, num_results))
+        misses = [q for q in misses if q not in products_by_query]
+
+    scraped = {}
+    async for search_query, entry in _scrape_misses(misses, num_results, concurrency):
+        scraped[search_query] = entry
+
+    if scraped:
+        await cache_entries_many(scraped, num_results)
+    products_by_query.update({q: entry["products"] for q, entry in scraped.items()})
+    return products_by_query
+
+async def get_recommendations_data_async(recommendations_data, gender="unisex", concurrency=SCRAPING_CONCURRENCY):
+    """
+    Async version of get_recommendations_data.
+
+    Runs every search query of the payload concurrently (up to `concurrency`
+    at a time) and returns the same results[category] structure.
+    """
+    if not recommendations_data or 'recommendations' not in recommendations_data:
+        logger.info("No recommendations data found to process.")
+        return {}
+
+    plan = plan_recommendation_queries(recommendations_data, gender)
+    search_queries = [q for _, _, queries in plan for q in queries]
+    products_by_query = await fetch_products_for_queries(search_queries, num_results=2, concurrency=concurrency)
+    return build_recommendation_results(plan, products_by_query)
+
+async def iter_recommendation_results(recommendations_data, gender="unisex", concurrency=SCRAPING_CONCURRENCY):
+    """
+    Streaming version of get_recommendations_data_async.
+
+    Yields {"type": "item", "category", "item_result"} records as soon as all
+    search queries of an item are resolved: items fully served from cache or
+    the catalog index come first, scraped items follow in completion order. Items without products are
+    dropped like in the non-streaming response. Ends with a {"type": "summary"} record.
+    """
+    started = time.perf_counter()
+    plan = plan_recommendation_queries(recommendations_data, gender)
+    categories = {category: 0 for category, _, _ in plan}
+    items = [(category, item, queries) for category, item, queries in plan if item is not None and queries]
+    unique_queries = list(dict.fromkeys(q for _, _, queries in items for q in queries))
+
+    products_by_query = {}
+    pending_items = list(range(len(items)))
+
+    def take_ready_items():
+        ready = [i for i in pending_items if all(q in products_by_query for q in items[i][2])]
+        for i in ready:
+            pending_items.remove(i)
+            category, item, queries = items[i]
+            item_result = build_item_result(item, queries, products_by_query)
+            if item_result['products']:
+                categories[category] += 1
+                yield {"type": "item", "category": category, "item_result": item_result}
+
+    # Serve cache hits and catalog index matches immediately
+    products_by_query.update(await get_cached_products_many(unique_queries))
+    misses = [q for q in unique_queries if q not in products_by_query]
+    cache_hits = len(unique_queries) - len(misses)
+    if misses:
+        products_by_query.update(await asyncio.to_thread(background_tasks.get_indexed_products_many, misses, 2))
+        misses = [q for q in misses if q not in products_by_query]
+    index_hits = len(unique_queries) - cache_hits - len(misses)
+
+    for record in take_ready_items():
+        yield record
+
+    # Scrape the misses and stream each item once its last query lands
+    scraped = {}
+    async for search_query, entry in _scrape_misses(misses, 2, concurrency):
+        scraped[search_query] = entry
+        products_by_query[search_query] = entry["products"]
+        for record in take_ready_items():
+            yield record
+
+    if scraped:
+        await cache_entries_many(scraped)
+
+    yield {
+        "type": "summary",
+        "categories": categories,
+        "items": sum(categories.values()),
+        "queries": len(unique_queries),
+        "cache_hits": cache_hits,
+        "index_hits": index_hits,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1)
+    }
+
+async def stream_recommendation_results(recommendations_data, gender="unisex", media_type="application/x-ndjson"):
+    """Encodes iter_recommendation_results as NDJSON lines or Server-Sent Events."""
+    async for record in iter_recommendation_results(recommendations_data, gender):
+        payload = json.dumps(record)
+        if media_type == "text/event-stream":
+            yield f"event: {record['type']}\ndata: {payload}\n\n"
+        else:
+            yield payload + "\n"
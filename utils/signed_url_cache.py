@@ -0,0 +1,144 @@
+import datetime
+import logging
+import os
+import threading
+import time
+import redis
+from .cache import LocalTTLCache
+from .metrics import REDIS_DURATION
+from .sigv4 import SigV4Presigner, MAX_EXPIRES_IN
+
+logger = logging.getLogger(__name__)
+
+# --- Presigned GET URL Cache ---
+SIGNED_URL_BUCKET_SECONDS = int(os.getenv("SIGNED_URL_BUCKET_SECONDS", 900)) # Signing time is rounded down to this (at most)
+SIGNED_URL_MAX_EXTRA_LIFETIME = 0.25 # Windows are capped at this share of the requested lifetime
+SIGNED_URL_L1_MAX_ENTRIES = int(os.getenv("SIGNED_URL_L1_MAX_ENTRIES", 20000))
+SIGNED_URL_L1_MAX_BYTES = int(os.getenv("SIGNED_URL_L1_MAX_BYTES", 16 * 1024 * 1024)) # Default to 16 MiB
+
+class PresignedUrlCache:
+    """
+    Cache of presigned URLs keyed by method, bucket, object key and requested
+    lifetime (in-process L1, Redis L2).
+
+    Expiry bucketing: URLs are signed as of the start of the current window
+    and live expires_in + window seconds, so every URL handed out still has
+    at least the requested expires_in seconds left, and the same object gets
+    the exact same URL (on every pod) for a whole window. That keeps browser
+    and CDN caches keyed on the URL warm. Windows are SIGNED_URL_BUCKET_SECONDS
+    long, but never more than a quarter of the requested lifetime, so short
+    lifetimes aren't stretched much. Entries expire when the window ends.
+    """
+
+    def __init__(self, bucket_seconds: int = SIGNED_URL_BUCKET_SECONDS, redis_client: redis.StrictRedis | None = None):
+        self.bucket_seconds = max(1, bucket_seconds)
+        self.redis_client = redis_client
+        self._l1 = LocalTTLCache(SIGNED_URL_L1_MAX_ENTRIES, SIGNED_URL_L1_MAX_BYTES)
+        self._stats = {"l1_hits": 0, "l2_hits": 0, "signed": 0, "l2_errors": 0}
+        self._lock = threading.Lock()
+
+    def set_redis_client(self, redis_client: redis.StrictRedis | None):
+        self.redis_client = redis_client
+
+    @staticmethod
+    def cache_key(method: str, bucket: str, key: str, expires_in: int) -> str:
+        return f"presigned:{method}:{expires_in}:{bucket}:{key}"
+
+    def window_seconds(self, expires_in: int) -> int:
+        """Window length for a requested lifetime (0 if the URL can't be stretched at all)."""
+        return max(0, min(self.bucket_seconds, int(expires_in * SIGNED_URL_MAX_EXTRA_LIFETIME), MAX_EXPIRES_IN - expires_in))
+
+    def get_many(self, presigner: SigV4Presigner, method: str, bucket: str, keys: list[str], expires_in: int) -> list[str]:
+        """
+        Presigned URLs for `keys`, in order, valid for at least `expires_in` seconds:
+        L1, then one Redis MGET, then signing for the rest.
+
+        Raises ValueError if `expires_in` is outside 1..MAX_EXPIRES_IN.
+        """
+        if not 1 <= expires_in <= MAX_EXPIRES_IN:
+            raise ValueError(f"Expiration must be between 1 and {MAX_EXPIRES_IN} seconds.")
+        window = self.window_seconds(expires_in)
+        if not window:
+            # Too short (or too close to the limit) to share: sign as of now, uncached
+            with self._lock:
+                self._stats["signed"] += len(keys)
+            return [presigner.presign(method, bucket, key, expires_in) for key in keys]
+
+        now = time.time()
+        window_start = now - now % window
+        ttl = window_start + window - now # Until the next window re-signs
+        cache_keys = [self.cache_key(method, bucket, key, expires_in) for key in keys]
+
+        urls = {}
+        for cache_key in cache_keys:
+            url = self._l1.get(cache_key)
+            if url is not None:
+                urls[cache_key] = url
+        l1_hits = len(urls)
+
+        missing = [cache_key for cache_key in dict.fromkeys(cache_keys) if cache_key not in urls]
+        l2_hits = self._l2_get(missing, urls, ttl) if missing else 0
+
+        to_sign = {cache_key: key for cache_key, key in zip(cache_keys, keys) if cache_key not in urls}
+        if to_sign:
+            signed_at = datetime.datetime.fromtimestamp(window_start, datetime.timezone.utc)
+            signed = {
+                cache_key: presigner.presign(method, bucket, key, expires_in + window, now=signed_at)
+                for cache_key, key in to_sign.items()
+            }
+            for cache_key, url in signed.items():
+                self._l1.set(cache_key, url, ttl, len(url))
+            self._l2_set(signed, ttl)
+            urls.update(signed)
+
+        with self._lock:
+            self._stats["l1_hits"] += l1_hits
+            self._stats["l2_hits"] += l2_hits
+            self._stats["signed"] += len(to_sign)
+        return [urls[cache_key] for cache_key in cache_keys]
+
+    def _l2_get(self, cache_keys: list[str], urls: dict, ttl: float) -> int:
+        if not self.redis_client:
+            return 0
+        try:
+            with REDIS_DURATION.labels("get_many").time():
+                values = self.redis_client.mget(cache_keys)
+        except redis.exceptions.RedisError as e:
+            self._count_error()
+            logger.warning("Redis Error: Failed to get %s presigned URLs - %s", len(cache_keys), e)
+            return 0
+        hits = 0
+        for cache_key, value in zip(cache_keys, values):
+            if value:
+                url = value.decode("utf-8") if isinstance(value, bytes) else value
+                urls[cache_key] = url
+                self._l1.set(cache_key, url, ttl, len(url))
+                hits += 1
+        return hits
+
+    def _l2_set(self, signed: dict, ttl: float):
+        ttl_ms = int(ttl * 1000)
+        if not self.redis_client or ttl_ms <= 0:
+            return
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for cache_key, url in signed.items():
+                # NX: a URL another pod signed for this window is identical anyway
+                pipe.set(cache_key, url, px=ttl_ms, nx=True)
+            with REDIS_DURATION.labels("set_many").time():
+                pipe.execute()
+        except redis.exceptions.RedisError as e:
+            self._count_error()
+            logger.warning("Redis Error: Failed to cache %s presigned URLs - %s", len(signed), e)
+
+    def _count_error(self):
+        with self._lock:
+            self._stats["l2_errors"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["l1_entries"] = len(self._l1)
+        return stats
+
+presigned_url_cache = PresignedUrlCache()
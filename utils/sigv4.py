@@ -0,0 +1,165 @@
+import atexit
+import datetime
+import hashlib
+import hmac
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import quote
+
+# --- Local SigV4 Presigning ---
+SIGNING_POOL_WORKERS = int(os.getenv("SIGNING_POOL_WORKERS", max(1, min(4, (os.cpu_count() or 1))))) # Worker processes
+SIGNING_CHUNK_SIZE = int(os.getenv("SIGNING_CHUNK_SIZE", 500)) # URLs per worker task
+SIGNING_POOL_THRESHOLD = int(os.getenv("SIGNING_POOL_THRESHOLD", 1000)) # Smaller batches are signed inline
+
+ALGORITHM = "AWS4-HMAC-SHA256"
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+MAX_EXPIRES_IN = 7 * 24 * 3600 # SigV4 presigned URLs can't live longer than 7 days
+
+# Bucket names usable as a single DNS label in <bucket>.s3.amazonaws.com (no dots)
+_VIRTUAL_HOSTABLE_BUCKET = re.compile(r"^[a-z0-9][a-z0-9-]{1,61}[a-z0-9]$")
+
+def _hmac(key: bytes, message: str) -> bytes:
+    return hmac.new(key, message.encode("utf-8"), hashlib.sha256).digest()
+
+def _uri_encode(value: str, safe: str = "") -> str:
+    """RFC 3986 encoding as SigV4 expects it (unreserved characters kept as is)."""
+    return quote(value, safe="-_.~" + safe)
+
+class SigV4Presigner:
+    """
+    Presigns S3 URLs locally (query-string SigV4), without a boto3 call per URL.
+
+    The derived signing key only depends on the date, region and service, so it
+    is computed once per day and reused for every URL signed that day.
+    """
+
+    def __init__(self, access_key_id: str, secret_access_key: str, region: str,
+                 session_token: str | None = None, service: str = "s3", endpoint_url: str | None = None):
+        self.access_key_id = access_key_id
+        self.secret_access_key = secret_access_key
+        self.region = region
+        self.session_token = session_token
+        self.service = service
+        self.endpoint_url = endpoint_url.rstrip("/") if endpoint_url else None
+        self._signing_keys = {} # date stamp -> signing key
+
+    def __getstate__(self):
+        # Cached keys are cheap to rebuild; don't ship them to worker processes
+        return {**self.__dict__, "_signing_keys": {}}
+
+    def signing_key(self, date_stamp: str) -> bytes:
+        key = self._signing_keys.get(date_stamp)
+        if key is None:
+            key = _hmac(f"AWS4{self.secret_access_key}".encode("utf-8"), date_stamp)
+            for part in (self.region, self.service, "aws4_request"):
+                key = _hmac(key, part)
+            self._signing_keys = {date_stamp: key} # Only today's key is ever needed
+        return key
+
+    def _host_and_path(self, bucket: str, key: str) -> tuple[str, str, str]:
+        """
+        (scheme://host, Host header, canonical URI) using virtual-hosted style, or
+        path style with an endpoint or a bucket name that can't be a DNS label.
+        """
+        encoded_key = _uri_encode(key, safe="/")
+        if self.endpoint_url:
+            scheme, _, host = self.endpoint_url.partition("://")
+            return f"{scheme}://{host}", host, f"/{_uri_encode(bucket)}/{encoded_key}"
+        if not _VIRTUAL_HOSTABLE_BUCKET.match(bucket):
+            # Dotted (or non-DNS) bucket names break the *.s3.amazonaws.com TLS certificate; boto3
+            # falls back to path style on the regional endpoint for these, and so do we
+            host = "s3.amazonaws.com" if self.region in (None, "us-east-1") else f"s3.{self.region}.amazonaws.com"
+            return f"https://{host}", host, f"/{_uri_encode(bucket)}/{encoded_key}"
+        host = f"{bucket}.s3.amazonaws.com" # Same global virtual-hosted endpoint boto3 presigns against
+        return f"https://{host}", host, f"/{encoded_key}"
+
+    def presign(self, method: str, bucket: str, key: str, expires_in: int = 3600,
+                content_type: str | None = None, now: datetime.datetime | None = None,
+                params: dict | None = None) -> str:
+        """
+        Returns a presigned URL for `method` (GET or PUT) on bucket/key.
+
+        With a content_type the Content-Type header is signed, so uploads must send exactly that type.
+        `params` are extra query parameters to sign, e.g. partNumber and uploadId for upload_part.
+        """
+        if not 1 <= expires_in <= MAX_EXPIRES_IN:
+            raise ValueError(f"expires_in must be between 1 and {MAX_EXPIRES_IN} seconds")
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        date_stamp = amz_date[:8]
+        scope = f"{date_stamp}/{self.region}/{self.service}/aws4_request"
+        base_url, host, canonical_uri = self._host_and_path(bucket, key)
+
+        if content_type:
+            signed_headers = "content-type;host"
+            canonical_headers = f"content-type:{content_type.strip()}\nhost:{host}\n"
+        else:
+            signed_headers = "host"
+            canonical_headers = f"host:{host}\n"
+
+        query = {
+            **(params or {}),
+            "X-Amz-Algorithm": ALGORITHM,
+            "X-Amz-Credential": f"{self.access_key_id}/{scope}",
+            "X-Amz-Date": amz_date,
+            "X-Amz-Expires": str(expires_in),
+            "X-Amz-SignedHeaders": signed_headers,
+        }
+        if self.session_token:
+            query["X-Amz-Security-Token"] = self.session_token
+        canonical_query = "&".join(f"{_uri_encode(k)}={_uri_encode(str(v))}" for k, v in sorted(query.items()))
+
+        canonical_request = "\n".join(
+            (method, canonical_uri, canonical_query, canonical_headers, signed_headers, UNSIGNED_PAYLOAD)
+        )
+        string_to_sign = "\n".join(
+            (ALGORITHM, amz_date, scope, hashlib.sha256(canonical_request.encode("utf-8")).hexdigest())
+        )
+        signature = hmac.new(self.signing_key(date_stamp), string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+        return f"{base_url}{canonical_uri}?{canonical_query}&X-Amz-Signature={signature}"
+
+def _presign_chunk(presigner: SigV4Presigner, method: str, bucket: str, items: list[tuple[str, str | None]],
+                   expires_in: int, now: datetime.datetime) -> list[str]:
+    return [presigner.presign(method, bucket, key, expires_in, content_type, now) for key, content_type in items]
+
+_signing_pool = None
+_signing_pool_lock = threading.Lock()
+
+def _get_signing_pool() -> ProcessPoolExecutor:
+    global _signing_pool
+    with _signing_pool_lock:
+        if _signing_pool is None:
+            # Not fork: copying this multithreaded server (httpx, Redis, logging locks) can deadlock the workers
+            start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _signing_pool = ProcessPoolExecutor(max_workers=SIGNING_POOL_WORKERS, mp_context=multiprocessing.get_context(start_method))
+        return _signing_pool
+
+def shutdown_signing_pool():
+    """Stops the signing worker processes (called on app shutdown)."""
+    global _signing_pool
+    with _signing_pool_lock:
+        if _signing_pool is not None:
+            _signing_pool.shutdown(wait=False, cancel_futures=True)
+            _signing_pool = None
+
+atexit.register(shutdown_signing_pool)
+
+def presign_many(presigner: SigV4Presigner, method: str, bucket: str, items: list[tuple[str, str | None]],
+                 expires_in: int = 3600) -> list[str]:
+    """
+    Presigns many (key, content_type) pairs, in order, all with the same timestamp.
+
+    Batches of SIGNING_POOL_THRESHOLD or more are split into chunks signed in a
+    process pool; smaller ones are signed inline (cheaper than the IPC round trip).
+    """
+    now = datetime.datetime.now(datetime.timezone.utc)
+    if len(items) < SIGNING_POOL_THRESHOLD or SIGNING_POOL_WORKERS <= 1:
+        return _presign_chunk(presigner, method, bucket, items, expires_in, now)
+
+    chunks = [items[i:i + SIGNING_CHUNK_SIZE] for i in range(0, len(items), SIGNING_CHUNK_SIZE)]
+    pool = _get_signing_pool()
+    futures = [pool.submit(_presign_chunk, presigner, method, bucket, chunk, expires_in, now) for chunk in chunks]
+    return [url for future in futures for url in future.result()]
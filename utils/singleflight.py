@@ -0,0 +1,131 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+import redis
+
+logger = logging.getLogger(__name__)
+
+# --- Single-flight Configuration ---
+# Coalesce identical fetches across workers/pods with a Redis lock (in-process coalescing is always on)
+SINGLEFLIGHT_REDIS_ENABLED = os.getenv("SINGLEFLIGHT_REDIS_ENABLED", "false").lower() == "true"
+SINGLEFLIGHT_LOCK_TTL_MS = int(os.getenv("SINGLEFLIGHT_LOCK_TTL_MS", 15000))
+SINGLEFLIGHT_WAIT_TIMEOUT_SECONDS = float(os.getenv("SINGLEFLIGHT_WAIT_TIMEOUT_SECONDS", 15))
+SINGLEFLIGHT_POLL_INTERVAL_SECONDS = float(os.getenv("SINGLEFLIGHT_POLL_INTERVAL_SECONDS", 0.1))
+
+# Deletes the lock only if we still own it (the token matches)
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+class SingleFlight:
+    """
+    In-process request coalescing.
+
+    Only one call per key runs at a time; threads that ask for the same key
+    while it is in flight wait for it and share its result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[str, Future] = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        """Runs fn(*args, **kwargs) once per in-flight key and returns its result to every caller."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def in_flight(self) -> int:
+        """Number of keys currently being fetched."""
+        with self._lock:
+            return len(self._calls)
+
+class RedisSingleFlight:
+    """
+    Cross-process request coalescing backed by a Redis lock.
+
+    The caller that wins `SET NX PX` on the lock key runs the fetch (which is
+    expected to write its result to the cache). Everyone else polls `load_result`
+    until the result shows up, the lock is released, or the wait times out, and
+    only then falls back to fetching themselves.
+    """
+
+    def __init__(self, redis_client: redis.StrictRedis,
+                 lock_ttl_ms: int = SINGLEFLIGHT_LOCK_TTL_MS,
+                 wait_timeout: float = SINGLEFLIGHT_WAIT_TIMEOUT_SECONDS,
+                 poll_interval: float = SINGLEFLIGHT_POLL_INTERVAL_SECONDS):
+        self.redis_client = redis_client
+        self.lock_ttl_ms = lock_ttl_ms
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self._release = redis_client.register_script(_RELEASE_LOCK_SCRIPT)
+
+    def do(self, key, fn, load_result):
+        """
+        Runs fn() under a distributed lock for `key`.
+
+        Args:
+            key: Key being fetched (the lock is stored at 'lock:{key}')
+            fn: Fetch function; should store its result where load_result can find it
+            load_result: Returns the shared result, or None if it isn't available yet
+
+        Returns:
+            The result of fn(), or the result published by another worker
+        """
+        lock_key = f"lock:{key}"
+        token = uuid.uuid4().hex
+
+        try:
+            acquired = self.redis_client.set(lock_key, token, nx=True, px=self.lock_ttl_ms)
+        except redis.exceptions.RedisError as e:
+            logger.warning("Redis Error: Could not acquire single-flight lock '%s' - %s", lock_key, e)
+            return fn()
+
+        if acquired:
+            try:
+                return fn()
+            finally:
+                try:
+                    self._release(keys=[lock_key], args=[token])
+                except redis.exceptions.RedisError as e:
+                    logger.warning("Redis Error: Could not release single-flight lock '%s' - %s", lock_key, e)
+
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            result = load_result()
+            if result is not None:
+                return result
+            try:
+                if not self.redis_client.exists(lock_key):
+                    break
+            except redis.exceptions.RedisError:
+                break
+
+        # The leader finished without publishing a result (or took too long) - fetch ourselves
+        result = load_result()
+        return result if result is not None else fn()
@@ -0,0 +1,85 @@
+import atexit
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+# --- Thumbnail Configuration ---
+THUMBNAIL_WIDTHS = tuple(sorted(int(w) for w in os.getenv("THUMBNAIL_WIDTHS", "160,320,640").split(",") if w.strip()))
+THUMBNAIL_WEBP_QUALITY = int(os.getenv("THUMBNAIL_WEBP_QUALITY", 75))
+THUMBNAIL_AVIF_QUALITY = int(os.getenv("THUMBNAIL_AVIF_QUALITY", 55))
+THUMBNAIL_MAX_SOURCE_BYTES = int(os.getenv("THUMBNAIL_MAX_SOURCE_BYTES", 10 * 1024 * 1024))
+THUMBNAIL_MAX_SOURCE_PIXELS = int(os.getenv("THUMBNAIL_MAX_SOURCE_PIXELS", 40_000_000)) # Larger images are rejected
+THUMBNAIL_POOL_WORKERS = int(os.getenv("THUMBNAIL_POOL_WORKERS", max(1, min(4, (os.cpu_count() or 1)))))
+THUMBNAIL_RENDER_TIMEOUT_SECONDS = float(os.getenv("THUMBNAIL_RENDER_TIMEOUT_SECONDS", 20))
+
+# Output format -> (Pillow format name, content type); AVIF only if this Pillow build can encode it
+THUMBNAIL_FORMATS = {"webp": ("WEBP", "image/webp")}
+if features.check("avif"):
+    THUMBNAIL_FORMATS["avif"] = ("AVIF", "image/avif")
+
+def _encode(image: Image.Image, fmt: str) -> bytes:
+    buffer = io.BytesIO()
+    if fmt == "webp":
+        image.save(buffer, "WEBP", quality=THUMBNAIL_WEBP_QUALITY, method=4)
+    else:
+        image.save(buffer, THUMBNAIL_FORMATS[fmt][0], quality=THUMBNAIL_AVIF_QUALITY)
+    return buffer.getvalue()
+
+def render_thumbnails(source: bytes, widths: tuple = THUMBNAIL_WIDTHS,
+                      formats: tuple = tuple(THUMBNAIL_FORMATS)) -> dict:
+    """
+    Decodes `source` once and encodes it at every width in every format.
+
+    Returns {(width, format): bytes}. Images are never upscaled: widths larger
+    than the source are encoded at the source width. Runs in a worker process.
+    """
+    Image.MAX_IMAGE_PIXELS = THUMBNAIL_MAX_SOURCE_PIXELS # Decompression-bomb guard (raises instead of warning above 2x)
+    with Image.open(io.BytesIO(source)) as opened:
+        if opened.width * opened.height > THUMBNAIL_MAX_SOURCE_PIXELS:
+            raise ValueError("Source image is too large")
+        # JPEG: let the decoder downscale by a power of two while decoding, for the largest width needed
+        opened.draft("RGB", (max(widths), max(widths) * opened.height // max(1, opened.width)))
+        image = ImageOps.exif_transpose(opened)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+
+    thumbnails = {}
+    for width in sorted(widths, reverse=True):
+        if width < image.width:
+            # Resize from the previous (larger) step: same quality with LANCZOS, much less work
+            image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+        for fmt in formats:
+            thumbnails[(width, fmt)] = _encode(image, fmt)
+    return thumbnails
+
+_thumbnail_pool = None
+_thumbnail_pool_lock = threading.Lock()
+
+def _get_thumbnail_pool() -> ProcessPoolExecutor:
+    global _thumbnail_pool
+    with _thumbnail_pool_lock:
+        if _thumbnail_pool is None:
+            # Not fork: copying this multithreaded server (httpx, Redis, logging locks) can deadlock the workers
+            start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _thumbnail_pool = ProcessPoolExecutor(max_workers=THUMBNAIL_POOL_WORKERS, mp_context=multiprocessing.get_context(start_method))
+        return _thumbnail_pool
+
+def shutdown_thumbnail_pool():
+    """Stops the resize worker processes (called on app shutdown)."""
+    global _thumbnail_pool
+    with _thumbnail_pool_lock:
+        if _thumbnail_pool is not None:
+            _thumbnail_pool.shutdown(wait=False, cancel_futures=True)
+            _thumbnail_pool = None
+
+atexit.register(shutdown_thumbnail_pool)
+
+def render_thumbnails_in_pool(source: bytes) -> dict:
+    """render_thumbnails in the worker pool; blocks the calling thread (never call it on the event loop)."""
+    future = _get_thumbnail_pool().submit(render_thumbnails, source)
+    return future.result(timeout=THUMBNAIL_RENDER_TIMEOUT_SECONDS)